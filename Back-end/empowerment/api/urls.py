@@ -4,6 +4,7 @@ from empowerment_app.views import *
 from empowerment_app.view_auth import *
 from empowerment_app.view_auth import UserViewSet  
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from empowerment_app import async_views
 
 
 router = DefaultRouter()
@@ -19,6 +20,11 @@ router.register(r'auth', AuthViewSet, basename='auth')
 router.register(r'loan-applications', LoanApplicationViewSet, basename='loan-application')
 router.register(r'loan-types', LoanTypeViewSet, basename='loan-type')
 router.register(r'loan-review', LoanReviewViewSet)
+router.register(r'admin-stats', AdminStatsViewSet, basename='admin-stats')
+router.register(r'search', SearchViewSet, basename='search')
+router.register(r'analytics', AnalyticsViewSet, basename='analytics')
+router.register(r'map/businesses', BusinessMapViewSet, basename='business-map')
+router.register(r'_perf', PerfViewSet, basename='perf')
 
 
 urlpatterns = [
@@ -27,6 +33,13 @@ urlpatterns = [
     # Auth endpoints (login/register)
     path('login/', CustomLoginView.as_view(), name='custom_login'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+
+    # Async (ASGI) versions of the sheha notification endpoints
+    path('async/notifications/', async_views.notifications, name='async_notifications'),
+    path('async/notifications/<int:pk>/verify/', async_views.verify_notification, name='async_notification_verify'),
+
+    # Transition event feed (long-poll with ?wait=)
+    path('events/', async_views.event_feed, name='event_feed'),
     # path('register/', RegisterView.as_view(), name='register'),
     
     
@@ -0,0 +1,121 @@
+import csv
+import time
+from datetime import date
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+
+from .models import MockBankLoan
+
+BANK_DB = 'bankdb'
+CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+UPDATE_FIELDS = [
+    'applicant_name', 'has_active_loan', 'loan_amount',
+    'loan_status', 'balance_remaining', 'last_payment_date',
+]
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f', ''}
+
+
+def _decimal(value, field):
+    value = (value or '').strip()
+    if not value:
+        return Decimal('0')
+    # The model field's own checks (finite, max_digits, decimal_places), so
+    # a row that would make the chunk's INSERT fail is rejected here instead
+    try:
+        return MockBankLoan._meta.get_field(field).clean(value, None)
+    except ValidationError as e:
+        raise ValueError(f"{field}: {' '.join(e.messages)}")
+
+
+def parse_row(row):
+    """Turn one CSV row into an unsaved MockBankLoan, or raise ValueError."""
+    bank_no = (row.get('bank_no') or '').strip()
+    if not bank_no:
+        raise ValueError("bank_no is required")
+    if len(bank_no) > 20:
+        raise ValueError("bank_no is longer than 20 characters")
+
+    active = (row.get('has_active_loan') or '').strip().lower()
+    if active not in TRUE_VALUES | FALSE_VALUES:
+        raise ValueError(f"has_active_loan: '{active}' is not a boolean")
+
+    last_payment = (row.get('last_payment_date') or '').strip()
+    try:
+        last_payment = date.fromisoformat(last_payment) if last_payment else None
+    except ValueError:
+        raise ValueError(f"last_payment_date: '{last_payment}' is not YYYY-MM-DD")
+
+    return MockBankLoan(
+        bank_no=bank_no,
+        applicant_name=(row.get('applicant_name') or '').strip()[:100],
+        has_active_loan=active in TRUE_VALUES,
+        loan_amount=_decimal(row.get('loan_amount'), 'loan_amount'),
+        loan_status=(row.get('loan_status') or 'N/A').strip()[:20],
+        balance_remaining=_decimal(row.get('balance_remaining'), 'balance_remaining'),
+        last_payment_date=last_payment,
+    )
+
+
+def _upsert(loans):
+    # Postgres refuses to touch the same row twice in one ON CONFLICT
+    # statement, so the last occurrence of a bank_no in a chunk wins.
+    unique = list({loan.bank_no: loan for loan in loans}.values())
+    MockBankLoan.objects.using(BANK_DB).bulk_create(
+        unique,
+        update_conflicts=True,
+        unique_fields=['bank_no'],
+        update_fields=UPDATE_FIELDS,
+    )
+    return len(unique)
+
+
+def import_bank_loans(fileobj, chunk_size=CHUNK_SIZE, on_chunk=None):
+    """
+    Stream a bank snapshot CSV into bankdb, upserting on bank_no.
+
+    Expected header: bank_no, applicant_name, has_active_loan, loan_amount,
+    loan_status, balance_remaining, last_payment_date. Bad lines are
+    skipped and reported by line number; good lines are written in
+    chunks of `chunk_size` with one INSERT ... ON CONFLICT per chunk.
+    """
+    started = time.monotonic()
+    reader = csv.DictReader(fileobj)
+    rows = imported = 0
+    errors = []
+    error_count = 0
+    chunk = []
+
+    for row in reader:
+        rows += 1
+        try:
+            chunk.append(parse_row(row))
+        except ValueError as e:
+            error_count += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({'line': reader.line_num, 'error': str(e)})
+            continue
+
+        if len(chunk) >= chunk_size:
+            imported += _upsert(chunk)
+            chunk = []
+            if on_chunk:
+                on_chunk(rows, imported)
+
+    if chunk:
+        imported += _upsert(chunk)
+        if on_chunk:
+            on_chunk(rows, imported)
+
+    seconds = time.monotonic() - started
+    return {
+        'rows': rows,
+        'imported': imported,
+        'error_count': error_count,
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(rows / seconds) if seconds else rows,
+    }
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from bank_app.importer import CHUNK_SIZE, import_bank_loans
+
+
+class Command(BaseCommand):
+    help = "Import a bank snapshot CSV into bankdb, upserting MockBankLoan rows on bank_no."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        def progress(rows, imported):
+            self.stdout.write(f"{rows} rows read, {imported} upserted")
+
+        with open(options['path'], newline='', encoding='utf-8-sig') as f:
+            result = import_bank_loans(f, chunk_size=options['chunk_size'], on_chunk=progress)
+
+        for error in result['errors']:
+            self.stderr.write(f"line {error['line']}: {error['error']}")
+        if result['error_count'] > len(result['errors']):
+            self.stderr.write(f"... {result['error_count'] - len(result['errors'])} more errors")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['imported']} of {result['rows']} rows in {result['seconds']}s "
+            f"({result['rows_per_second']} rows/s, {result['error_count']} errors)."
+        ))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:21
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def drop_duplicate_bank_nos(apps, schema_editor):
+    # Keep the newest row per bank_no so the unique constraint can be added
+    MockBankLoan = apps.get_model('bank_app', 'MockBankLoan')
+    db = schema_editor.connection.alias
+    keep = (
+        MockBankLoan.objects.using(db)
+        .values('bank_no')
+        .annotate(last_id=Max('id'))
+        .values_list('last_id', flat=True)
+    )
+    MockBankLoan.objects.using(db).exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_app', '0002_alter_mockbankloan_bank_no'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_bank_nos, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='mockbankloan',
+            name='bank_no',
+            field=models.CharField(max_length=20, unique=True),
+        ),
+    ]
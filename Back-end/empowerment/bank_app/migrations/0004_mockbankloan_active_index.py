@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank_app', '0003_mockbankloan_bank_no_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mockbankloan',
+            index=models.Index(condition=models.Q(('has_active_loan', True)), fields=['bank_no'], name='bankloan_active_idx'),
+        ),
+    ]
@@ -1,7 +1,7 @@
 from django.db import models
 
 class MockBankLoan(models.Model):
-    bank_no = models.CharField(max_length=20)
+    bank_no = models.CharField(max_length=20, unique=True)
     applicant_name = models.CharField(max_length=100)
     has_active_loan = models.BooleanField(default=False)
     loan_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
@@ -14,4 +14,9 @@ class MockBankLoan(models.Model):
 
     class Meta:
         app_label = 'bank_app'
+        indexes = [
+            # bank verification only asks about accounts with an active loan
+            models.Index(fields=['bank_no'], name='bankloan_active_idx',
+                         condition=models.Q(has_active_loan=True)),
+        ]
 
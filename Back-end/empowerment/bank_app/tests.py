@@ -1,3 +1,116 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from empowerment_app.models import CustomUser
+
+from .importer import import_bank_loans, parse_row
+from .models import MockBankLoan
+
+HEADER = 'bank_no,applicant_name,has_active_loan,loan_amount,loan_status,balance_remaining,last_payment_date\n'
+
+
+def row(**overrides):
+    fields = {
+        'bank_no': 'ACC000001', 'applicant_name': 'Asha', 'has_active_loan': 'yes',
+        'loan_amount': '1500000.00', 'loan_status': 'Active', 'balance_remaining': '250000.50',
+        'last_payment_date': '2026-03-01',
+    }
+    fields.update(overrides)
+    return fields
+
+
+class ParseRowTests(SimpleTestCase):
+    def test_valid_row(self):
+        loan = parse_row(row())
+        self.assertEqual(loan.bank_no, 'ACC000001')
+        self.assertTrue(loan.has_active_loan)
+        self.assertEqual(loan.loan_amount, Decimal('1500000.00'))
+        self.assertEqual(loan.balance_remaining, Decimal('250000.50'))
+        self.assertEqual(loan.last_payment_date, date(2026, 3, 1))
+
+    def test_blank_amounts_and_date(self):
+        loan = parse_row(row(loan_amount='', balance_remaining=' ', last_payment_date='', has_active_loan=''))
+        self.assertEqual(loan.loan_amount, Decimal('0'))
+        self.assertIsNone(loan.last_payment_date)
+        self.assertFalse(loan.has_active_loan)
+
+    def test_invalid_rows(self):
+        cases = {
+            'bank_no': row(bank_no=''),
+            'longer than 20': row(bank_no='A' * 21),
+            'has_active_loan': row(has_active_loan='maybe'),
+            'last_payment_date': row(last_payment_date='01/03/2026'),
+        }
+        for message, fields in cases.items():
+            with self.subTest(message), self.assertRaisesMessage(ValueError, message):
+                parse_row(fields)
+
+    def test_amounts_the_column_cannot_store(self):
+        for value in ['abc', 'NaN', 'Infinity', '-Infinity', '1.234', '12345678901']:
+            with self.subTest(value), self.assertRaisesMessage(ValueError, 'loan_amount'):
+                parse_row(row(loan_amount=value))
+
+
+class ImportBankLoansTests(TestCase):
+    databases = {'default', 'bankdb'}
+
+    def csv(self, *rows):
+        lines = [','.join(r.values()) for r in rows]
+        return StringIO(HEADER + '\n'.join(lines) + '\n')
+
+    def test_bad_lines_are_reported_and_the_rest_imported(self):
+        result = import_bank_loans(self.csv(
+            row(bank_no='ACC1'),
+            row(bank_no='ACC2', loan_amount='NaN'),
+            row(bank_no='ACC3', balance_remaining='99999999999.99'),
+            row(bank_no='ACC4'),
+        ), chunk_size=2)
+
+        self.assertEqual(result['rows'], 4)
+        self.assertEqual(result['imported'], 2)
+        self.assertEqual(result['error_count'], 2)
+        self.assertEqual([e['line'] for e in result['errors']], [3, 4])
+        self.assertEqual(
+            set(MockBankLoan.objects.using('bankdb').values_list('bank_no', flat=True)), {'ACC1', 'ACC4'},
+        )
+
+    def test_upserts_on_bank_no(self):
+        MockBankLoan.objects.using('bankdb').create(bank_no='ACC1', applicant_name='Old', loan_amount=1)
+        chunks = []
+        result = import_bank_loans(
+            self.csv(row(bank_no='ACC1', loan_amount='10'), row(bank_no='ACC1', loan_amount='20'), row(bank_no='ACC2')),
+            on_chunk=lambda rows, imported: chunks.append((rows, imported)),
+        )
+
+        # The last occurrence of a bank_no in a chunk wins
+        self.assertEqual(result['imported'], 2)
+        self.assertEqual(chunks, [(3, 2)])
+        loan = MockBankLoan.objects.using('bankdb').get(bank_no='ACC1')
+        self.assertEqual((loan.applicant_name, loan.loan_amount), ('Asha', Decimal('20.00')))
+
+
+class ImportViewTests(TestCase):
+    databases = {'default', 'bankdb'}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create_user(username='admin', password='secret', name='admin', is_staff=True))
+
+    def upload(self, content):
+        return self.client.post('/api/bank-loans/import/', {
+            'file': SimpleUploadedFile('loans.csv', content, content_type='text/csv'),
+        }, format='multipart')
+
+    def test_import(self):
+        response = self.upload((HEADER + ','.join(row().values()) + '\n').encode())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['imported'], 1)
+
+    def test_file_that_is_not_utf8(self):
+        response = self.upload(HEADER.encode() + b'ACC1,Asha \xff\xfe,yes,1,Active,0,\n')
+        self.assertEqual(response.status_code, 400)
@@ -1,9 +1,30 @@
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
+import io
+
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from .importer import import_bank_loans
 from .models import MockBankLoan
 from .serializers import MockBankLoanSerializer
 
 class MockBankLoanViewSet(viewsets.ModelViewSet):
     queryset = MockBankLoan.objects.all()
     serializer_class = MockBankLoanSerializer
-    permission_classes = [IsAuthenticated]
\ No newline at end of file
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=False, methods=['post'], url_path='import',
+            parser_classes=[MultiPartParser], permission_classes=[IsAdminUser])
+    def import_csv(self, request):
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({"detail": "Upload a CSV file in the 'file' field."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Read the upload as a text stream, never fully in memory
+        text = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        try:
+            result = import_bank_loans(text)
+        except UnicodeDecodeError:
+            return Response({"detail": "The file is not UTF-8 encoded CSV."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
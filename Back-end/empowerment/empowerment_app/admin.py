@@ -6,6 +6,7 @@ from empowerment_app.models import CustomUser as User
 from .models import Applicant, Loan
 from django.utils.html import format_html
 from leaflet.admin import LeafletGeoAdmin
+from empowerment_app.utils.images import SMALL_THUMBNAIL, thumbnail_urls
 
 # Register custom user and other models
 admin.site.register(CustomUser, UserAdmin)
@@ -56,7 +57,8 @@ class ApplicantAdmin(admin.ModelAdmin):
         'id', 'name', 'age', 'gender', 'marital_status',
         'phone', 'region', 'district', 'ward', 'village'
     )
-    search_fields = ('name', 'region', 'district', 'phone')
+    # Every field here has a trigram index; region/district are list filters
+    search_fields = ('name', 'village', 'ward', 'phone')
     list_filter = ('gender', 'marital_status', 'region', 'district')
 
 @admin.register(Business)
@@ -89,10 +91,14 @@ class NotificationAdmin(admin.ModelAdmin):
     list_filter = ('is_read', 'is_verified_by_sheha', 'sheha__ward')  
     search_fields = ('name', 'village', 'sheha__user__username', 'applicant__name') 
     readonly_fields = ('image_tag', 'created_at')
+    list_select_related = ('sheha', 'applicant')
 
     def image_tag(self, obj):
-        if obj.passport_size:
-            return format_html('<img src="{}" width="100" height="100" style="object-fit:cover;" />', obj.passport_size.url)
+        photo = obj.applicant.passport_size
+        if photo:
+            thumbnails = thumbnail_urls(photo, obj.applicant.passport_thumbnails_ready)
+            src = thumbnails[SMALL_THUMBNAIL] if thumbnails else photo.url
+            return format_html('<img src="{}" width="100" height="100" style="object-fit:cover;" />', src)
         return "-"
     image_tag.short_description = 'Passport Photo'
 
@@ -105,4 +111,21 @@ class LoanApplicationAdmin(admin.ModelAdmin):
 
 @admin.register(LoanExpenseItem)
 class LoanExpenseItemAdmin(admin.ModelAdmin):
-    list_display = ('loan_application', 'item', 'amount')
\ No newline at end of file
+    list_display = ('loan_application', 'item', 'amount')
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('subject', 'to')
+
+@admin.register(TransitionEvent)
+class TransitionEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'topic', 'object_id', 'kind', 'old_value', 'new_value', 'actor', 'created_at')
+    list_filter = ('topic', 'kind')
+
+    # Append-only
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -5,7 +5,7 @@ class EmpowermentAppConfig(AppConfig):
     name = 'empowerment_app'
 
     def ready(self):
-        pass
+        import empowerment_app.signals
 
 
 
@@ -0,0 +1,188 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework_simplejwt.settings import api_settings
+
+from empowerment_app.models import Applicant, CustomUser, Notification
+from empowerment_app.pagination import MAX_PAGE_SIZE
+from empowerment_app.principal import aget_principal, bearer_token
+from empowerment_app.serializer import NotificationSerializer, TransitionEventSerializer
+from empowerment_app.utils import events
+from empowerment_app.utils.bank_verification import averify_applicant
+from empowerment_app.utils.mail_queue import aqueue_email
+from empowerment_app.utils.realtime import anotify_user
+from empowerment_app.views import BANK_STATUS_MESSAGES
+
+# Same page size limits as the DRF endpoints
+DEFAULT_LIMIT = settings.REST_FRAMEWORK.get('PAGE_SIZE', 10)
+MAX_LIMIT = MAX_PAGE_SIZE
+# /events/?wait=<seconds> long-polls for at most this long
+EVENTS_MAX_WAIT = getattr(settings, 'EVENTS_MAX_WAIT', 25)
+EVENTS_POLL_INTERVAL = getattr(settings, 'EVENTS_POLL_INTERVAL', 1)
+
+# Async counterparts of NotificationViewSet's list and verify. DRF views are
+# sync only, so under ASGI every DRF request holds a worker thread while it
+# waits on the database, bankdb and the channel layer; these views run on
+# the event loop instead. Their ORM calls still go one at a time through
+# Django's single thread-sensitive executor, so they are awaited in turn;
+# only the channel layer is truly concurrent with them.
+
+
+async def _principal(request):
+    """The Principal from the Bearer token, or None."""
+    token = bearer_token(request)
+    if token is None:
+        return None
+    user = await CustomUser.objects.filter(pk=token[api_settings.USER_ID_CLAIM], is_active=True).afirst()
+    if user is None:
+        return None
+    return await aget_principal(user, token)
+
+
+def _unauthorized():
+    return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+
+def _forbidden():
+    return JsonResponse({'detail': 'You do not have permission to perform this action.'}, status=403)
+
+
+def _int_param(request, name, default):
+    try:
+        return max(int(request.GET.get(name, default)), 0)
+    except ValueError:
+        return default
+
+
+@csrf_exempt
+@require_GET
+async def notifications(request):
+    principal = await _principal(request)
+    if principal is None:
+        return _unauthorized()
+    if not principal.is_sheha:
+        return _forbidden()
+
+    limit = min(_int_param(request, 'limit', DEFAULT_LIMIT), MAX_LIMIT)
+    offset = _int_param(request, 'offset', 0)
+    queryset = Notification.objects.select_related('applicant').filter(
+        sheha_id=principal.sheha_id,
+        is_verified_by_sheha=False,
+        status='pending',
+    ).order_by('-created_at')
+
+    results = await _as_list(queryset[offset:offset + limit])
+    count = await queryset.acount()
+    data = NotificationSerializer(results, many=True, context={'request': request}).data
+    return JsonResponse({'count': count, 'results': data})
+
+
+async def _as_list(queryset):
+    return [obj async for obj in queryset]
+
+
+def _mark_verified(notification, user_id):
+    """
+    Move a pending notification to verified; False if a concurrent verify
+    or bulk-reject got there first. The pending check is part of the
+    UPDATE, so only one request can win.
+    """
+    # There is no async atomic(); the flags and their event need one
+    with transaction.atomic():
+        updated = Notification.objects.filter(pk=notification.pk, status='pending').update(
+            is_read=True, is_verified_by_sheha=True, status='verified',
+        )
+        if not updated:
+            return False
+        Applicant.objects.filter(pk=notification.applicant_id).update(
+            is_verified_by_sheha=True, is_verified=True,
+        )
+        events.record(events.sheha_verified(notification.applicant_id, user_id, notification.pk))
+    return True
+
+
+@csrf_exempt
+@require_POST
+async def verify_notification(request, pk):
+    principal = await _principal(request)
+    if principal is None:
+        return _unauthorized()
+    if not principal.is_sheha:
+        return _forbidden()
+
+    notification = await Notification.objects.select_related('applicant__user').filter(
+        pk=pk,
+        sheha_id=principal.sheha_id,
+        is_verified_by_sheha=False,
+        status='pending',
+    ).afirst()
+    if notification is None:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    applicant = notification.applicant
+
+    if not await sync_to_async(_mark_verified)(notification, principal.user_id):
+        return JsonResponse({'detail': 'This notification has already been handled.'}, status=409)
+    bank_status = await averify_applicant(applicant.pk)
+
+    msg = BANK_STATUS_MESSAGES.get(bank_status, 'status unknown')
+    pending = [anotify_user(applicant.user_id, {
+        'event': 'sheha_verified',
+        'applicant_id': applicant.pk,
+        'bank_status': bank_status,
+    })]
+    if applicant.user.email:
+        pending.append(aqueue_email(
+            subject='Application Status',
+            message=f'Dear {applicant.name}, your application was approved by the Sheha. Bank verification: {msg}.',
+            from_email='noreply@yourdomain.com',
+            recipient_list=[applicant.user.email],
+        ))
+    # The channel layer send overlaps the email insert
+    await asyncio.gather(*pending)
+
+    return JsonResponse({
+        'status': 'Sheha verification complete.',
+        'bank_status': bank_status,
+    })
+
+
+@csrf_exempt
+@require_GET
+async def event_feed(request):
+    """
+    Transition events after the ?since=<cursor> (0 for the start), in
+    commit order, for admins and loan officers. With ?wait=<seconds> an
+    empty result is held open until an event arrives or the wait runs
+    out; pass the returned `next` as the following `since`.
+    """
+    principal = await _principal(request)
+    if principal is None:
+        return _unauthorized()
+    if principal.role not in ('admin', 'loan_officer'):
+        return _forbidden()
+
+    since = request.GET.get('since', events.START)
+    try:
+        events.parse_cursor(since)
+    except ValueError:
+        return JsonResponse({'detail': "'since' must be a cursor returned as 'next'."}, status=400)
+    limit = _int_param(request, 'limit', events.DEFAULT_LIMIT) or events.DEFAULT_LIMIT
+    topics = [t for t in request.GET.get('topic', '').split(',') if t]
+    deadline = time.monotonic() + min(_int_param(request, 'wait', 0), EVENTS_MAX_WAIT)
+
+    while True:
+        results = await _as_list(events.feed(since, limit, topics))
+        if results or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(EVENTS_POLL_INTERVAL)
+
+    return JsonResponse({
+        'next': events.cursor(results[-1]) if results else since,
+        'results': TransitionEventSerializer(results, many=True).data,
+    })
@@ -1,13 +1,41 @@
 import json
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from .models import Sheha
+
+
+def user_group(user_id):
+    return f"user_{user_id}"
+
+def sheha_group(sheha_id):
+    return f"sheha_{sheha_id}"
+
+
+@database_sync_to_async
+def get_sheha_id(user):
+    return Sheha.objects.filter(user=user).values_list('id', flat=True).first()
+
 
 class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
-        await self.channel_layer.group_add("notifications", self.channel_name)
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated:
+            await self.close()
+            return
+
+        # Each socket only joins its own groups, never a global broadcast one
+        self.groups_joined = [user_group(user.id)]
+        sheha_id = await get_sheha_id(user)
+        if sheha_id:
+            self.groups_joined.append(sheha_group(sheha_id))
+
+        for group in self.groups_joined:
+            await self.channel_layer.group_add(group, self.channel_name)
         await self.accept()
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard("notifications", self.channel_name)
+        for group in getattr(self, 'groups_joined', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
 
     async def receive(self, text_data):
         # You can handle incoming messages if needed
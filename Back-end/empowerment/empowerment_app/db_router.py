@@ -0,0 +1,29 @@
+from empowerment_app.replicas import REPLICAS, read_alias
+
+PRIMARY = 'default'
+
+
+class ReplicaRouter:
+    """
+    Sends reads of the `default` models to the replica that
+    ReplicaRoutingMiddleware picked for the current request. Writes,
+    management commands and pinned users stay on the primary. Goes after
+    BankDBRouter, which keeps bank_app on bankdb.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_alias()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {PRIMARY, *REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in REPLICAS:
+            return False
+        return None
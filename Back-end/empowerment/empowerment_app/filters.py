@@ -1,5 +1,5 @@
 from django_filters import rest_framework as filters
-from .models import Applicant
+from .models import Applicant, LoanApplication, Repayment
 
 class ApplicantFilter(filters.FilterSet):
     name = filters.CharFilter(lookup_expr='icontains')
@@ -7,3 +7,21 @@ class ApplicantFilter(filters.FilterSet):
     class Meta:
         model = Applicant
         fields = ['name']
+
+class LoanApplicationFilter(filters.FilterSet):
+    ward = filters.CharFilter(field_name='applicant__ward')
+    region = filters.CharFilter(field_name='applicant__region')
+    created_after = filters.DateFilter(field_name='created_at', lookup_expr='date__gte')
+    created_before = filters.DateFilter(field_name='created_at', lookup_expr='date__lte')
+
+    class Meta:
+        model = LoanApplication
+        fields = ['decision', 'loan_type', 'ward', 'region', 'created_after', 'created_before']
+
+class RepaymentFilter(filters.FilterSet):
+    date_after = filters.DateFilter(field_name='date', lookup_expr='gte')
+    date_before = filters.DateFilter(field_name='date', lookup_expr='lte')
+
+    class Meta:
+        model = Repayment
+        fields = ['business', 'date_after', 'date_before']
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from empowerment_app.models import Applicant
+from empowerment_app.utils import http_cache
+from empowerment_app.utils.images import build_applicant_thumbnails, is_normalised, normalise
+
+
+class Command(BaseCommand):
+    help = (
+        "Normalise passport photos uploaded before the image pipeline existed "
+        "and build any thumbnails that are still missing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete-originals', action='store_true',
+            help="Remove a legacy file once its normalised copy is stored.",
+        )
+
+    def handle(self, *args, **options):
+        applicants = (
+            Applicant.objects
+            .exclude(Q(passport_size='') | Q(passport_size__isnull=True))
+            .only('id', 'passport_size', 'passport_thumbnails_ready')
+            .order_by('id')
+        )
+        rewritten = built = failed = 0
+        for applicant in applicants.iterator(chunk_size=500):
+            photo = applicant.passport_size
+            try:
+                if not is_normalised(photo.name):
+                    old_name = photo.name
+                    with photo.open('rb') as source:
+                        content = normalise(source)
+                    photo.save(content.name, content, save=False)
+                    # Queryset update: the save signals would normalise again
+                    Applicant.objects.filter(pk=applicant.pk).update(
+                        passport_size=photo.name, passport_thumbnails_ready=False,
+                    )
+                    applicant.passport_thumbnails_ready = False
+                    http_cache.bump(f"applicant:{applicant.pk}")
+                    rewritten += 1
+                    if options['delete_originals'] and not Applicant.objects.filter(passport_size=old_name).exists():
+                        photo.storage.delete(old_name)
+
+                if not applicant.passport_thumbnails_ready and build_applicant_thumbnails(applicant.pk):
+                    built += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"Applicant {applicant.pk}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{rewritten} photos normalised, {built} thumbnail sets built, {failed} failed."
+        ))
@@ -0,0 +1,116 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from bank_app.models import MockBankLoan
+from empowerment_app.models import (
+    Applicant, Business, LoanApplication, LoanOfficer, Notification, OutgoingEmail, Sheha,
+)
+from empowerment_app.utils import geo
+from empowerment_app.utils.search import search_applicants, search_businesses
+
+
+def hot_queries():
+    """
+    The queries behind views.py, utils/bank_verification.py,
+    utils/search.py, utils/geo.py and principal.py (role lookup), as
+    (label, database alias, queryset or raw (sql, params)).
+    """
+    return [
+        ('bank verification: active loans', 'bankdb',
+         MockBankLoan.objects.using('bankdb').filter(bank_no__in=['X1', 'X2'], has_active_loan=True)),
+        ('bank verification: businesses', 'default',
+         Business.objects.filter(applicant_id__in=[1, 2])),
+        ('sheha notifications', 'default',
+         Notification.objects.filter(sheha_id=1, is_verified_by_sheha=False).order_by('-created_at')[:10]),
+        ('sheha by ward', 'default',
+         Sheha.objects.filter(ward='x')),
+        ('role: sheha', 'default', Sheha.objects.filter(user_id=1)),
+        ('role: loan officer', 'default', LoanOfficer.objects.filter(user_id=1)),
+        ('role: applicant', 'default', Applicant.objects.filter(user_id=1).order_by('id')[:1]),
+        ('applicants by ward', 'default', Applicant.objects.filter(ward='x')),
+        ('sheha-verified applicants', 'default',
+         Applicant.objects.filter(is_verified_by_sheha=True, id__gt=0).order_by('id')[:1000]),
+        ('loan applications by decision', 'default',
+         LoanApplication.objects.filter(decision='pending').order_by('-created_at')[:10]),
+        ('email outbox', 'default',
+         OutgoingEmail.objects.filter(status='pending', next_attempt_at__lte=timezone.now())
+         .order_by('next_attempt_at')[:50]),
+        # Each OR branch needs its GIN index (tsvector or trigram), or
+        # the whole search becomes a Seq Scan
+        ('search applicants', 'default', search_applicants('user 4217')),
+        ('search applicants in a ward', 'default',
+         search_applicants('user 4217', Applicant.objects.filter(sheha_id=1))),
+        ('search businesses', 'default', search_businesses('PLAN004217')),
+        # The map endpoints' own SQL, not an ORM look-alike of it
+        ('businesses in bbox', 'default', geo.bbox_query((39.1, -6.3, 39.4, -6.0))),
+        ('businesses in a ward in bbox', 'default', geo.bbox_query((39.1, -6.3, 39.4, -6.0), sheha_id=1)),
+        ('businesses nearby', 'default', geo.near_query(-6.16, 39.19, 5000)),
+    ]
+
+
+def seq_scans(plan):
+    """Relation names of every Seq Scan node in an EXPLAIN (FORMAT JSON) plan."""
+    found = []
+    if plan.get('Node Type') == 'Seq Scan':
+        found.append(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def plan_seq_scans(alias, queryset, enable_seqscan=True):
+    """Seq Scan relations in the plan PostgreSQL picks for `queryset`."""
+    with transaction.atomic(using=alias):
+        if not enable_seqscan:
+            with connections[alias].cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        if isinstance(queryset, tuple):
+            sql, params = queryset
+            with connections[alias].cursor() as cursor:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                explained = cursor.fetchone()[0]
+        else:
+            explained = queryset.explain(format='json')
+    # psycopg already decodes a json column; explain() returns text
+    if isinstance(explained, str):
+        explained = json.loads(explained)
+    # Django may hand back the JSON already unwrapped from its list
+    if isinstance(explained, list):
+        explained = explained[0]
+    return seq_scans(explained['Plan'])
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the hot-path queries and fail if any of them falls back to a "
+        "sequential scan. Run it against a realistically sized, ANALYZEd "
+        "database (see seed_benchmark_data); tests.py runs the same check on "
+        "seeded test data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--index-only', action='store_true',
+            help="Turn enable_seqscan off, so only a query no index can serve fails. "
+                 "For near-empty databases, where a seq scan is the honest plan.",
+        )
+
+    def handle(self, *args, **options):
+        failures = []
+        for label, alias, queryset in hot_queries():
+            if connections[alias].vendor != 'postgresql':
+                raise CommandError(f"'{alias}' is not PostgreSQL; query plans cannot be checked.")
+
+            scans = plan_seq_scans(alias, queryset, enable_seqscan=not options['index_only'])
+            if scans:
+                failures.append(label)
+                self.stdout.write(self.style.ERROR(f"SEQ SCAN  {label}: {', '.join(scans)}"))
+            else:
+                self.stdout.write(f"ok        {label}")
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot queries fall back to a sequential scan.")
+        self.stdout.write(self.style.SUCCESS("All hot queries use an index."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from empowerment_app.replicas import MAX_LAG_SECONDS, REPLICAS, check_replica
+
+
+class Command(BaseCommand):
+    help = "Report reachability and replication lag of each read replica in DATABASE_REPLICAS."
+
+    def handle(self, *args, **options):
+        if not REPLICAS:
+            self.stdout.write("No replicas configured (REPLICA_HOSTS is empty).")
+            return
+
+        unhealthy = 0
+        for alias in REPLICAS:
+            healthy, lag = check_replica(alias)
+            lag_text = 'n/a' if lag is None else f"{lag:.1f}s"
+            if healthy:
+                self.stdout.write(f"ok         {alias}  lag {lag_text}")
+            else:
+                unhealthy += 1
+                self.stdout.write(self.style.ERROR(f"excluded   {alias}  lag {lag_text} (max {MAX_LAG_SECONDS}s)"))
+        if unhealthy:
+            raise CommandError(f"{unhealthy} of {len(REPLICAS)} replicas are excluded from reads.")
@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from empowerment_app.models import Loan, RepaymentSchedule
+from empowerment_app.utils.schedule import DEFAULT_ANNUAL_RATE, DEFAULT_METHOD, build_schedules
+
+
+class Command(BaseCommand):
+    help = "Generate repayment schedules for approved loans that do not have one yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--method', choices=['flat', 'declining'], default=DEFAULT_METHOD)
+        parser.add_argument('--annual-rate', type=Decimal, default=DEFAULT_ANNUAL_RATE)
+        parser.add_argument('--grace-months', type=int, default=0)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        loans = (
+            Loan.objects
+            .filter(status__iexact='approved', schedule__isnull=True)
+            .only('id', 'amount', 'duration', 'approval_date')
+            .order_by('id')
+        )
+        created = skipped = 0
+        last_id = 0
+        while True:
+            chunk = list(loans.filter(id__gt=last_id)[:options['chunk_size']])
+            if not chunk:
+                break
+            built = build_schedules(
+                chunk,
+                method=options['method'],
+                annual_rate=options['annual_rate'],
+                grace_months=options['grace_months'],
+            )
+            RepaymentSchedule.objects.bulk_create(built)
+            created += len(built)
+            skipped += len(chunk) - len(built)
+            last_id = chunk[-1].id
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {created} schedules ({skipped} loans skipped: duration has no month count)."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from empowerment_app.utils.admin_stats import rebuild_admin_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the admin dashboard counters from LoanApplication."
+
+    def handle(self, *args, **options):
+        rows = rebuild_admin_stats()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} stat rows."))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+# Order matters: the rollup is built from the loan summary
+VIEWS = ('portfolio_loan_summary', 'portfolio_rollup')
+
+
+class Command(BaseCommand):
+    help = "Refresh the portfolio analytics materialized views without blocking readers."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--blocking', action='store_true',
+            help="Plain REFRESH (faster, but locks out readers while it runs).",
+        )
+
+    def handle(self, *args, **options):
+        mode = '' if options['blocking'] else 'CONCURRENTLY '
+        with connection.cursor() as cursor:
+            for view in VIEWS:
+                started = time.monotonic()
+                cursor.execute(f"REFRESH MATERIALIZED VIEW {mode}{view}")
+                self.stdout.write(f"{view} refreshed in {time.monotonic() - started:.2f}s")
+        self.stdout.write(self.style.SUCCESS("Portfolio analytics are up to date."))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from empowerment_app.models import LoanApplication
+from empowerment_app.utils.scoring import rescore
+
+
+class Command(BaseCommand):
+    help = "Recompute LoanApplication.score (and pending system_comment) with the current scoring rules."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--pending-only', action='store_true', help="Only rescore undecided applications.")
+
+    def handle(self, *args, **options):
+        queryset = LoanApplication.objects.all()
+        if options['pending_only']:
+            queryset = queryset.filter(decision='pending')
+
+        started = time.monotonic()
+        done = rescore(
+            queryset,
+            chunk_size=options['chunk_size'],
+            on_chunk=lambda n: self.stdout.write(f"{n} applications scored"),
+        )
+        seconds = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Rescored {done} applications in {seconds:.1f}s."))
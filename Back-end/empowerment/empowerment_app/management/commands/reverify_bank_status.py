@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from empowerment_app.models import Applicant
+from empowerment_app.utils.bank_verification import CHUNK_SIZE, verify_applicants
+
+
+class Command(BaseCommand):
+    help = "Re-run bank verification for every sheha-verified applicant, in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        queryset = (
+            Applicant.objects
+            .filter(is_verified_by_sheha=True)
+            .only('id', 'is_verified_by_bank', 'bank_status')
+            .order_by('id')
+        )
+
+        totals = {}
+        last_id = 0
+        while True:
+            # Keyset on id so each chunk is an index range scan
+            chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            for bank_status in verify_applicants(chunk, chunk_size=chunk_size).values():
+                totals[bank_status] = totals.get(bank_status, 0) + 1
+            last_id = chunk[-1].id
+            self.stdout.write(f"Verified up to applicant {last_id}")
+
+        summary = ', '.join(f"{k}: {v}" for k, v in sorted(totals.items())) or 'nothing to do'
+        self.stdout.write(self.style.SUCCESS(f"Bank re-verification done ({summary})."))
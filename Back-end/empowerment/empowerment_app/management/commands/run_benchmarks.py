@@ -0,0 +1,75 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from empowerment_app.utils import benchmark
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the core API flows (registration, sheha verification, loan submission, "
+        "review listing) against seeded data and report latency, throughput and query "
+        "counts. Every write is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--only', nargs='+', choices=[s.name for s in benchmark.SCENARIOS])
+        parser.add_argument('--host', default='localhost', help="Host header; must be in ALLOWED_HOSTS.")
+        parser.add_argument('--output', help="Also write the results as JSON to this file.")
+        parser.add_argument('--baseline', default=str(settings.BENCHMARK_BASELINE),
+                            help="Baseline to compare against (default: BENCHMARK_BASELINE).")
+        parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline.")
+        parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed p95 slowdown (0.2 = 20%%).")
+
+    def handle(self, *args, **options):
+        results = None
+        try:
+            # One outer transaction per database keeps runs repeatable;
+            # on_commit work (emails, pushes, thumbnails) is therefore skipped
+            with transaction.atomic(), transaction.atomic(using=benchmark.BANK_DB):
+                results = benchmark.run(
+                    iterations=options['iterations'], warmup=options['warmup'], seed=options['seed'],
+                    only=options['only'], host=options['host'],
+                )
+                raise Rollback
+        except Rollback:
+            pass
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{'scenario':<24} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>7} {'queries':>8} {'errors':>6}")
+        for name, r in results['scenarios'].items():
+            self.stdout.write(
+                f"{name:<24} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} "
+                f"{r['throughput_rps']:>7} {r['queries_mean']:>8} {r['errors']:>6}"
+            )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+
+        baseline_path = Path(options['baseline'])
+        if options['save_baseline']:
+            benchmark.save_baseline(results, baseline_path)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {baseline_path}."))
+            return
+
+        if not baseline_path.exists():
+            self.stdout.write(f"No baseline at {baseline_path}; run with --save-baseline to create one.")
+            return
+        regressions = benchmark.compare(results, benchmark.load_baseline(baseline_path), options['tolerance'])
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(line))
+            raise CommandError(f"{len(regressions)} regressions against {baseline_path}.")
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from empowerment_app.utils import benchmark
+
+
+class Command(BaseCommand):
+    help = "Generate deterministic benchmark data (applicants, businesses, loans, notifications, bank loans)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1, help="Multiplier on the base volumes (5000 applicants).")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help="Remove previously generated data first.")
+        parser.add_argument('--clear-only', action='store_true', help="Remove generated data and stop.")
+
+    def handle(self, *args, **options):
+        if options['clear'] or options['clear_only']:
+            benchmark.clear()
+            self.stdout.write("Cleared benchmark data.")
+            if options['clear_only']:
+                return
+
+        started = time.monotonic()
+        with transaction.atomic(), transaction.atomic(using=benchmark.BANK_DB):
+            counts = benchmark.seed(options['scale'], options['seed'], on_step=self.stdout.write)
+        seconds = time.monotonic() - started
+        summary = ', '.join(f"{n} {name}" for name, n in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {summary} in {seconds:.1f}s."))
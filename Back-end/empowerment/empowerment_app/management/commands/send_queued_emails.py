@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from empowerment_app.utils.mail_queue import BATCH_SIZE, dispatch_pending
+
+
+class Command(BaseCommand):
+    help = "Deliver emails from the OutgoingEmail outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help="Keep polling instead of exiting when the queue is empty.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep between polls in --loop mode.")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = dispatch_pending(batch_size=options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}")
+                # More may be waiting, go again straight away
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
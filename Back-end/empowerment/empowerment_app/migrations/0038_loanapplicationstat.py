@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empowerment_app', '0037_alter_business_location'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanApplicationStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('loan_type', 'Loan type'), ('region', 'Region'), ('ward', 'Ward'), ('month', 'Month')], max_length=20)),
+                ('key', models.CharField(blank=True, max_length=100)),
+                ('decision', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('dimension', 'key', 'decision')},
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:20
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empowerment_app', '0040_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.AddIndex(
+            model_name='applicant',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='applicant_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='applicant',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('village'), name='gin_trgm_ops'), name='applicant_village_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='applicant',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('ward'), name='gin_trgm_ops'), name='applicant_ward_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='applicant',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('phone'), name='gin_trgm_ops'), name='applicant_phone_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='applicant',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('name', 'village', 'ward', 'phone', config='simple'), name='applicant_search_vector'),
+        ),
+        migrations.AddIndex(
+            model_name='business',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='business_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='business',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('bank_no'), name='gin_trgm_ops'), name='business_bank_no_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='business',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('name', 'bank_no', config='simple'), name='business_search_vector'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='gin_trgm_ops'), name='notification_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('village'), name='gin_trgm_ops'), name='notification_village_trgm'),
+        ),
+    ]
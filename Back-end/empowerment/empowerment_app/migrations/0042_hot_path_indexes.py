@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empowerment_app', '0041_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='applicant',
+            index=models.Index(fields=['ward'], name='applicant_ward_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='applicant',
+            index=models.Index(condition=models.Q(('is_verified_by_sheha', True)), fields=['id'], name='applicant_sheha_verified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loanapplication',
+            index=models.Index(fields=['decision', '-created_at'], name='loanapp_decision_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_verified_by_sheha', False)), fields=['sheha', '-created_at'], name='notification_pending_idx'),
+        ),
+    ]
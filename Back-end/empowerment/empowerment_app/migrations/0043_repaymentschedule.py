@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:23
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empowerment_app', '0042_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepaymentSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(choices=[('flat', 'Flat rate'), ('declining', 'Declining balance')], default='declining', max_length=20)),
+                ('annual_rate', models.DecimalField(decimal_places=2, help_text='Percent per year', max_digits=5)),
+                ('term_months', models.PositiveIntegerField()),
+                ('grace_months', models.PositiveIntegerField(default=0, help_text='Interest-only months at the start')),
+                ('start_date', models.DateField()),
+                ('installments', django.contrib.postgres.fields.ArrayField(base_field=models.DecimalField(decimal_places=2, max_digits=12), size=None)),
+                ('cumulative_due', django.contrib.postgres.fields.ArrayField(base_field=models.DecimalField(decimal_places=2, max_digits=12), size=None)),
+                ('total_due', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('loan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='schedule', to='empowerment_app.loan')),
+            ],
+        ),
+    ]
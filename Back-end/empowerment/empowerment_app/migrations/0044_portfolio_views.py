@@ -0,0 +1,102 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:25
+
+from django.db import migrations, models
+
+# One row per active loan: where it is, what is still owed and how late it is.
+# Repayments are recorded per business, so they are matched to loans through
+# the business; the loan type comes from the business's latest approved
+# application.
+LOAN_SUMMARY_SQL = """
+CREATE MATERIALIZED VIEW portfolio_loan_summary AS
+WITH paid AS (
+    SELECT business_id, SUM(amount) AS paid
+    FROM empowerment_app_repayment
+    GROUP BY business_id
+)
+SELECT
+    l.id AS loan_id,
+    a.region,
+    a.ward,
+    a.gender,
+    COALESCE((
+        SELECT lt.name
+        FROM empowerment_app_loanapplication la
+        JOIN empowerment_app_loantype lt ON lt.id = la.loan_type_id
+        WHERE la.business_id = l.business_id AND la.decision = 'approved'
+        ORDER BY la.created_at DESC
+        LIMIT 1
+    ), 'Unspecified') AS loan_type,
+    l.amount AS disbursed,
+    GREATEST(COALESCE(s.total_due, l.amount) - COALESCE(p.paid, 0), 0) AS outstanding,
+    COALESCE((
+        SELECT GREATEST(CURRENT_DATE - (s.start_date + make_interval(months => i))::date, 0)
+        FROM generate_subscripts(s.cumulative_due, 1) AS i
+        WHERE s.cumulative_due[i] > COALESCE(p.paid, 0)
+        ORDER BY i
+        LIMIT 1
+    ), 0) AS days_overdue
+FROM empowerment_app_loan l
+JOIN empowerment_app_business b ON b.id = l.business_id
+JOIN empowerment_app_applicant a ON a.id = b.applicant_id
+LEFT JOIN empowerment_app_repaymentschedule s ON s.loan_id = l.id
+LEFT JOIN paid p ON p.business_id = l.business_id
+WHERE lower(l.status) NOT IN ('rejected', 'pending', 'cancelled');
+
+CREATE UNIQUE INDEX portfolio_loan_summary_loan_id ON portfolio_loan_summary (loan_id);
+"""
+
+# Pre-grouped totals the dashboard reads directly; the unique index is
+# what allows REFRESH MATERIALIZED VIEW CONCURRENTLY.
+ROLLUP_SQL = """
+CREATE MATERIALIZED VIEW portfolio_rollup AS
+SELECT
+    row_number() OVER () AS id,
+    CASE
+        WHEN GROUPING(region) = 0 THEN 'region'
+        WHEN GROUPING(ward) = 0 THEN 'ward'
+        WHEN GROUPING(loan_type) = 0 THEN 'loan_type'
+        WHEN GROUPING(gender) = 0 THEN 'gender'
+        ELSE 'total'
+    END AS dimension,
+    COALESCE(region, ward, loan_type, gender, '') AS key,
+    COUNT(*)::int AS loans,
+    COALESCE(SUM(disbursed), 0) AS disbursed,
+    COALESCE(SUM(outstanding), 0) AS outstanding,
+    COALESCE(SUM(outstanding) FILTER (WHERE days_overdue > 30), 0) AS outstanding_at_risk_30,
+    (COUNT(*) FILTER (WHERE days_overdue > 30))::int AS loans_at_risk_30,
+    now() AS refreshed_at
+FROM portfolio_loan_summary
+GROUP BY GROUPING SETS ((region), (ward), (loan_type), (gender), ());
+
+CREATE UNIQUE INDEX portfolio_rollup_dimension_key ON portfolio_rollup (dimension, key);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empowerment_app', '0043_repaymentschedule'),
+    ]
+
+    operations = [
+        migrations.RunSQL(LOAN_SUMMARY_SQL, "DROP MATERIALIZED VIEW IF EXISTS portfolio_loan_summary;"),
+        migrations.RunSQL(ROLLUP_SQL, "DROP MATERIALIZED VIEW IF EXISTS portfolio_rollup;"),
+        migrations.CreateModel(
+            name='PortfolioRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('key', models.CharField(max_length=100)),
+                ('loans', models.IntegerField()),
+                ('disbursed', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('outstanding', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('outstanding_at_risk_30', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('loans_at_risk_30', models.IntegerField()),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'portfolio_rollup',
+                'managed': False,
+            },
+        ),
+    ]
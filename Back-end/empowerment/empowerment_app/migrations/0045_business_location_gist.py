@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    0037 turned location from a CharField into a geography PointField;
+    make sure the GiST index the map queries rely on exists whichever
+    Django version applied it. Named like Django's own spatial index, so
+    this is a no-op where the schema editor already created it.
+    """
+
+    dependencies = [
+        ('empowerment_app', '0044_portfolio_views'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS empowerment_app_business_location_id "
+            "ON empowerment_app_business USING GIST (location);",
+            migrations.RunSQL.noop,
+        ),
+    ]
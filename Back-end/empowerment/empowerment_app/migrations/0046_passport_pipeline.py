@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:29
+
+import empowerment_app.utils.images
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empowerment_app', '0045_business_location_gist'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='notification',
+            name='passport_size',
+        ),
+        migrations.AddField(
+            model_name='applicant',
+            name='passport_thumbnails_ready',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='applicant',
+            name='passport_size',
+            field=models.ImageField(blank=True, null=True, storage=empowerment_app.utils.images.get_passport_storage, upload_to=empowerment_app.utils.images.passport_upload_to),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empowerment_app', '0046_passport_pipeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransitionEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('topic', models.CharField(choices=[('applicant', 'Applicant'), ('loan_application', 'Loan application')], max_length=30)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('kind', models.CharField(max_length=30)),
+                ('old_value', models.CharField(blank=True, max_length=50)),
+                ('new_value', models.CharField(blank=True, max_length=50)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['topic', 'id'], name='transition_topic_id_idx'), models.Index(fields=['topic', 'object_id', 'id'], name='transition_object_idx')],
+            },
+        ),
+    ]
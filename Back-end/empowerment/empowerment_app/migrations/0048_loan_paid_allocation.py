@@ -0,0 +1,90 @@
+from importlib import import_module
+
+from django.db import migrations
+
+portfolio_views = import_module('empowerment_app.migrations.0044_portfolio_views')
+
+# Repayments are recorded per business, not per loan. loan_paid() is the one
+# definition of how much of them belongs to a loan: they settle the
+# business's active loans oldest first (by approval date, then id), each up
+# to what it owes (its schedule's total_due, else the amount lent). The
+# portfolio views and utils/schedule.with_arrears() both use it.
+LOAN_PAID_SQL = """
+CREATE OR REPLACE FUNCTION loan_paid(p_loan_id bigint, p_as_of date) RETURNS numeric
+LANGUAGE sql STABLE AS $$
+    SELECT GREATEST(LEAST(
+        COALESCE((
+            SELECT SUM(r.amount)
+            FROM empowerment_app_repayment r
+            WHERE r.business_id = l.business_id AND r.date <= p_as_of
+        ), 0)
+        - COALESCE((
+            SELECT SUM(COALESCE(s2.total_due, l2.amount))
+            FROM empowerment_app_loan l2
+            LEFT JOIN empowerment_app_repaymentschedule s2 ON s2.loan_id = l2.id
+            WHERE l2.business_id = l.business_id
+              AND lower(l2.status) NOT IN ('rejected', 'pending', 'cancelled')
+              AND (l2.approval_date, l2.id) < (l.approval_date, l.id)
+        ), 0),
+        COALESCE(s.total_due, l.amount)
+    ), 0)
+    FROM empowerment_app_loan l
+    LEFT JOIN empowerment_app_repaymentschedule s ON s.loan_id = l.id
+    WHERE l.id = p_loan_id
+$$;
+"""
+
+# As in 0044, but with each loan's own share of the repayments
+LOAN_SUMMARY_SQL = """
+CREATE MATERIALIZED VIEW portfolio_loan_summary AS
+SELECT
+    l.id AS loan_id,
+    a.region,
+    a.ward,
+    a.gender,
+    COALESCE((
+        SELECT lt.name
+        FROM empowerment_app_loanapplication la
+        JOIN empowerment_app_loantype lt ON lt.id = la.loan_type_id
+        WHERE la.business_id = l.business_id AND la.decision = 'approved'
+        ORDER BY la.created_at DESC
+        LIMIT 1
+    ), 'Unspecified') AS loan_type,
+    l.amount AS disbursed,
+    GREATEST(COALESCE(s.total_due, l.amount) - p.paid, 0) AS outstanding,
+    COALESCE((
+        SELECT GREATEST(CURRENT_DATE - (s.start_date + make_interval(months => i))::date, 0)
+        FROM generate_subscripts(s.cumulative_due, 1) AS i
+        WHERE s.cumulative_due[i] > p.paid
+        ORDER BY i
+        LIMIT 1
+    ), 0) AS days_overdue
+FROM empowerment_app_loan l
+JOIN empowerment_app_business b ON b.id = l.business_id
+JOIN empowerment_app_applicant a ON a.id = b.applicant_id
+LEFT JOIN empowerment_app_repaymentschedule s ON s.loan_id = l.id
+CROSS JOIN LATERAL (SELECT loan_paid(l.id, CURRENT_DATE) AS paid) p
+WHERE lower(l.status) NOT IN ('rejected', 'pending', 'cancelled');
+
+CREATE UNIQUE INDEX portfolio_loan_summary_loan_id ON portfolio_loan_summary (loan_id);
+"""
+
+DROP_VIEWS_SQL = """
+DROP MATERIALIZED VIEW IF EXISTS portfolio_rollup;
+DROP MATERIALIZED VIEW IF EXISTS portfolio_loan_summary;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empowerment_app', '0047_transition_event'),
+    ]
+
+    operations = [
+        migrations.RunSQL(LOAN_PAID_SQL, "DROP FUNCTION IF EXISTS loan_paid(bigint, date);"),
+        migrations.RunSQL(
+            DROP_VIEWS_SQL + LOAN_SUMMARY_SQL + portfolio_views.ROLLUP_SQL,
+            DROP_VIEWS_SQL + portfolio_views.LOAN_SUMMARY_SQL + portfolio_views.ROLLUP_SQL,
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empowerment_app', '0048_loan_paid_allocation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='roles_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-18 21:01
+
+import empowerment_app.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empowerment_app', '0049_customuser_roles_version'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='transitionevent',
+            name='transition_topic_id_idx',
+        ),
+        migrations.AddField(
+            model_name='transitionevent',
+            name='txid',
+            field=models.BigIntegerField(db_default=empowerment_app.models.CurrentTransactionId(), editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='transitionevent',
+            index=models.Index(fields=['txid', 'id'], name='transition_txid_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transitionevent',
+            index=models.Index(fields=['topic', 'txid', 'id'], name='transition_topic_txid_idx'),
+        ),
+    ]
@@ -0,0 +1,93 @@
+from importlib import import_module
+
+from django.db import migrations
+
+loan_paid_allocation = import_module('empowerment_app.migrations.0048_loan_paid_allocation')
+
+# Filling the oldest loan up to its full total_due before the next loan got
+# anything could leave a newer loan in arrears while the business was ahead
+# overall. Repayments now cover the installments fallen due by p_as_of
+# first, across all of the business's active loans, earliest due date first
+# (ties by approval date, then id). What is left over settles what is not
+# yet due, oldest loan first; loans without a schedule only take part in
+# that second step, up to the amount lent. The count of installments due is
+# the one utils/schedule.with_arrears() reads cumulative_due by.
+LOAN_PAID_SQL = """
+CREATE OR REPLACE FUNCTION loan_paid(p_loan_id bigint, p_as_of date) RETURNS numeric
+LANGUAGE sql STABLE AS $$
+    WITH loans AS (
+        SELECT
+            l.id,
+            l.approval_date,
+            s.start_date,
+            s.installments,
+            COALESCE(s.total_due, l.amount) AS total,
+            COALESCE(LEAST(GREATEST((
+                EXTRACT(YEAR FROM age(p_as_of, s.start_date)) * 12
+                + EXTRACT(MONTH FROM age(p_as_of, s.start_date)))::int, 0),
+            s.term_months), 0) AS n_due
+        FROM empowerment_app_loan l
+        LEFT JOIN empowerment_app_repaymentschedule s ON s.loan_id = l.id
+        WHERE l.business_id = (SELECT business_id FROM empowerment_app_loan WHERE id = p_loan_id)
+          AND lower(l.status) NOT IN ('rejected', 'pending', 'cancelled')
+    ),
+    due AS (
+        SELECT
+            l.id AS loan_id,
+            l.installments[i] AS amount,
+            SUM(l.installments[i]) OVER (
+                ORDER BY l.start_date + make_interval(months => i), l.approval_date, l.id, i
+            ) - l.installments[i] AS before
+        FROM loans l
+        CROSS JOIN LATERAL generate_series(1, l.n_due) AS i
+    ),
+    paid AS (
+        SELECT COALESCE(SUM(r.amount), 0) AS amount
+        FROM empowerment_app_repayment r
+        WHERE r.business_id = (SELECT business_id FROM empowerment_app_loan WHERE id = p_loan_id)
+          AND r.date <= p_as_of
+    ),
+    ahead AS (
+        SELECT GREATEST(p.amount - COALESCE((SELECT SUM(amount) FROM due), 0), 0) AS amount
+        FROM paid p
+    ),
+    not_yet_due AS (
+        SELECT id, amount, SUM(amount) OVER (ORDER BY approval_date, id) - amount AS before
+        FROM (
+            SELECT l.id, l.approval_date,
+                   l.total - COALESCE((SELECT SUM(d.amount) FROM due d WHERE d.loan_id = l.id), 0) AS amount
+            FROM loans l
+        ) remaining
+    )
+    SELECT
+        COALESCE((
+            SELECT SUM(GREATEST(LEAST(p.amount - d.before, d.amount), 0))
+            FROM due d, paid p
+            WHERE d.loan_id = p_loan_id
+        ), 0)
+        + COALESCE((
+            SELECT GREATEST(LEAST(a.amount - n.before, n.amount), 0)
+            FROM not_yet_due n, ahead a
+            WHERE n.id = p_loan_id
+        ), 0)
+$$;
+"""
+
+REFRESH_SQL = """
+REFRESH MATERIALIZED VIEW portfolio_loan_summary;
+REFRESH MATERIALIZED VIEW portfolio_rollup;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empowerment_app', '0050_transition_event_txid'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            LOAN_PAID_SQL + REFRESH_SQL,
+            loan_paid_allocation.LOAN_PAID_SQL + REFRESH_SQL,
+        ),
+    ]
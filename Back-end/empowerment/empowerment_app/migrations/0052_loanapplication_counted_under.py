@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 21:06
+
+from django.db import migrations, models
+
+# Existing applications: the keys the counters would count them under now
+FILL_COUNTED_UNDER_SQL = """
+UPDATE empowerment_app_loanapplication la
+SET counted_under = jsonb_build_array(
+    jsonb_build_array('total', ''),
+    jsonb_build_array('loan_type', COALESCE(la.loan_type_id::text, '')),
+    jsonb_build_array('region', a.region),
+    jsonb_build_array('ward', a.ward),
+    jsonb_build_array('month', COALESCE(to_char(la.created_at, 'YYYY-MM'), ''))
+)
+FROM empowerment_app_applicant a
+WHERE a.id = la.applicant_id AND la.counted_under = '[]'::jsonb
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empowerment_app', '0051_loan_paid_by_installment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loanapplication',
+            name='counted_under',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.RunSQL(FILL_COUNTED_UNDER_SQL, migrations.RunSQL.noop),
+    ]
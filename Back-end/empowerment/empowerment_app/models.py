@@ -1,13 +1,22 @@
 from django.db import models
 from django.contrib.auth.models import *
 from django.core.validators import RegexValidator
+from django.utils import timezone
 from women_youth_empowerment import settings
 from django.contrib.gis.db import models as geomodels
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+from django.db.models.functions import Upper
+from empowerment_app.utils.images import get_passport_storage, passport_upload_to
 
 # Custom user model extending AbstractUser
 class CustomUser(AbstractUser):
     name = models.CharField(max_length=100)  
     email = models.EmailField(unique=False)  
+    # Bumped when a Sheha/LoanOfficer/Applicant row is added or removed;
+    # access tokens carrying an older value are re-resolved (principal.py)
+    roles_version = models.PositiveIntegerField(default=0)
 
     groups = models.ManyToManyField(
         Group,
@@ -53,8 +62,11 @@ class Applicant(models.Model):
     ward = models.CharField(max_length=100)
     village = models.CharField(max_length=100)
     phone = models.CharField(validators=[phone_validator], max_length=15)
-    passport_size = models.ImageField(upload_to='passport_photos/')
-    passport_size = models.ImageField(upload_to='passport_photos/', blank=True, null=True)
+    # Stored normalised and content-addressed, see utils/images.py
+    passport_size = models.ImageField(
+        upload_to=passport_upload_to, storage=get_passport_storage, blank=True, null=True,
+    )
+    passport_thumbnails_ready = models.BooleanField(default=False)
     sheha = models.ForeignKey(Sheha, on_delete=models.SET_NULL, null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -63,6 +75,25 @@ class Applicant(models.Model):
     bank_status = models.CharField(default='pending', max_length=20)
     is_verified = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            # icontains runs UPPER(col) LIKE UPPER('%x%'), so the trigram
+            # indexes are on UPPER(col) to serve filters and admin search
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='applicant_name_trgm'),
+            GinIndex(OpClass(Upper('village'), name='gin_trgm_ops'), name='applicant_village_trgm'),
+            GinIndex(OpClass(Upper('ward'), name='gin_trgm_ops'), name='applicant_ward_trgm'),
+            GinIndex(OpClass(Upper('phone'), name='gin_trgm_ops'), name='applicant_phone_trgm'),
+            GinIndex(
+                SearchVector('name', 'village', 'ward', 'phone', config='simple'),
+                name='applicant_search_vector',
+            ),
+            # ward equality filters (loan application ward filter, sheha lookups)
+            models.Index(fields=['ward'], name='applicant_ward_idx'),
+            # reverify_bank_status walks sheha-verified applicants by id
+            models.Index(fields=['id'], name='applicant_sheha_verified_idx',
+                         condition=models.Q(is_verified_by_sheha=True)),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -78,6 +109,11 @@ class Business(models.Model):
 
     class Meta:
         unique_together = ('applicant', 'bank_no')
+        indexes = [
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='business_name_trgm'),
+            GinIndex(OpClass(Upper('bank_no'), name='gin_trgm_ops'), name='business_bank_no_trgm'),
+            GinIndex(SearchVector('name', 'bank_no', config='simple'), name='business_search_vector'),
+        ]
     def __str__(self):
         return self.name
 
@@ -105,6 +141,30 @@ class Loan(models.Model):
     def __str__(self):
         return f"Loan {self.Loan_ID} - {self.status}"
 
+class RepaymentSchedule(models.Model):
+    """
+    Installment plan for a Loan. Amounts are stored as arrays (one entry
+    per month, first due one month after start_date) so a schedule is a
+    single row; cumulative_due lets SQL read "owed so far" by index.
+    """
+    METHOD_CHOICES = [
+        ('flat', 'Flat rate'),
+        ('declining', 'Declining balance'),
+    ]
+    loan = models.OneToOneField(Loan, on_delete=models.CASCADE, related_name='schedule')
+    method = models.CharField(max_length=20, choices=METHOD_CHOICES, default='declining')
+    annual_rate = models.DecimalField(max_digits=5, decimal_places=2, help_text="Percent per year")
+    term_months = models.PositiveIntegerField()
+    grace_months = models.PositiveIntegerField(default=0, help_text="Interest-only months at the start")
+    start_date = models.DateField()
+    installments = ArrayField(models.DecimalField(max_digits=12, decimal_places=2))
+    cumulative_due = ArrayField(models.DecimalField(max_digits=12, decimal_places=2))
+    total_due = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Schedule for loan {self.loan_id} ({self.method}, {self.term_months} months)"
+
 class Repayment(models.Model):
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     time = models.CharField(max_length=50)
@@ -129,11 +189,21 @@ class Notification(models.Model):
      applicant = models.ForeignKey(Applicant, on_delete=models.CASCADE)
      name = models.CharField(max_length=100)
      village = models.CharField(max_length=100)
-     passport_size = models.ImageField(upload_to='notification_passports/')
      is_read = models.BooleanField(default=False)
      is_verified_by_sheha = models.BooleanField(default=False)
      created_at = models.DateTimeField(auto_now_add=True)
 
+     class Meta:
+         indexes = [
+             # keyset pagination order
+             models.Index(fields=['-created_at', '-id'], name='notification_created_id_idx'),
+             # NotificationViewSet: a sheha's unverified notifications, newest first
+             models.Index(fields=['sheha', '-created_at'], name='notification_pending_idx',
+                          condition=models.Q(is_verified_by_sheha=False)),
+             GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='notification_name_trgm'),
+             GinIndex(OpClass(Upper('village'), name='gin_trgm_ops'), name='notification_village_trgm'),
+         ]
+
 
     # =======LOANS=========
 class LoanType(models.Model):
@@ -171,9 +241,146 @@ class LoanApplication(models.Model):
     reviewed_at = models.DateTimeField(null=True, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # The LoanApplicationStat (dimension, key) pairs this application was
+    # counted under, so later changes decrement those even if the
+    # applicant's region or ward has changed since
+    counted_under = models.JSONField(default=list, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # keyset pagination order
+            models.Index(fields=['-created_at', '-id'], name='loanapp_created_id_idx'),
+            # review screens and stats filter by decision, newest first
+            models.Index(fields=['decision', '-created_at'], name='loanapp_decision_created_idx'),
+        ]
 
 class LoanExpenseItem(models.Model):
     loan_application = models.ForeignKey(LoanApplication, on_delete=models.CASCADE, related_name='expenses')
     item = models.CharField(max_length=100)
     description = models.TextField()
     amount = models.DecimalField(max_digits=12, decimal_places=2)
+
+# ========================
+# Admin dashboard counters
+# ========================
+class LoanApplicationStat(models.Model):
+    """
+    Pre-aggregated LoanApplication counts, kept up to date by signals
+    (see utils/admin_stats.py) so the admin dashboard never scans the
+    applications table.
+    """
+    DIMENSION_CHOICES = [
+        ('total', 'Total'),
+        ('loan_type', 'Loan type'),
+        ('region', 'Region'),
+        ('ward', 'Ward'),
+        ('month', 'Month'),
+    ]
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=100, blank=True)
+    decision = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('dimension', 'key', 'decision')
+
+    def __str__(self):
+        return f"{self.dimension}:{self.key} {self.decision} = {self.count}"
+
+# ============
+# Email outbox
+# ============
+class OutgoingEmail(models.Model):
+    """
+    Emails queued by request handlers and delivered by the
+    `send_queued_emails` worker (see utils/mail_queue.py).
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    from_email = models.CharField(max_length=255)
+    to = models.TextField(help_text="One recipient per line.")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
+
+# ==============
+# Transition log
+# ==============
+class CurrentTransactionId(models.Func):
+    """The writing transaction's id (PostgreSQL 13+), as a bigint."""
+    template = 'pg_current_xact_id()::text::bigint'
+    output_field = models.BigIntegerField()
+
+
+class TransitionEvent(models.Model):
+    """
+    Append-only log of applicant and loan application state changes,
+    written in the same transaction as the change (see utils/events.py)
+    and read incrementally from /api/events/?since=<cursor>, in
+    (txid, id) order.
+    """
+    TOPIC_CHOICES = [
+        ('applicant', 'Applicant'),
+        ('loan_application', 'Loan application'),
+    ]
+    id = models.BigAutoField(primary_key=True)
+    topic = models.CharField(max_length=30, choices=TOPIC_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    kind = models.CharField(max_length=30)
+    old_value = models.CharField(max_length=50, blank=True)
+    new_value = models.CharField(max_length=50, blank=True)
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set by the database; the feed only shows events whose transaction is
+    # older than every one still running (see utils/events.feed)
+    txid = models.BigIntegerField(db_default=CurrentTransactionId(), editable=False)
+
+    class Meta:
+        indexes = [
+            # the feed, unfiltered and by topic
+            models.Index(fields=['txid', 'id'], name='transition_txid_id_idx'),
+            models.Index(fields=['topic', 'txid', 'id'], name='transition_topic_txid_idx'),
+            # history of one applicant / application
+            models.Index(fields=['topic', 'object_id', 'id'], name='transition_object_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic}:{self.object_id} {self.kind} {self.old_value} -> {self.new_value}"
+
+# ===================
+# Portfolio analytics
+# ===================
+class PortfolioRollup(models.Model):
+    """
+    Read-only view of the `portfolio_rollup` materialized view (migrations
+    0044, 0048 and 0051). Refresh with `python manage.py refresh_portfolio`.
+    """
+    dimension = models.CharField(max_length=20)
+    key = models.CharField(max_length=100)
+    loans = models.IntegerField()
+    disbursed = models.DecimalField(max_digits=14, decimal_places=2)
+    outstanding = models.DecimalField(max_digits=14, decimal_places=2)
+    outstanding_at_risk_30 = models.DecimalField(max_digits=14, decimal_places=2)
+    loans_at_risk_30 = models.IntegerField()
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'portfolio_rollup'
@@ -0,0 +1,81 @@
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+MAX_PAGE_SIZE = 100
+# Below this pg_class.reltuples is too rough, just count
+ESTIMATE_THRESHOLD = 10000
+
+
+class StandardPagination(PageNumberPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination on (created_at, id): no COUNT(*) and no OFFSET scan,
+    so deep pages cost the same as the first one.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = MAX_PAGE_SIZE
+
+    def __init__(self, ordering=None):
+        if ordering:
+            self.ordering = ordering
+
+
+class EstimatedCountPaginator(DjangoPaginator):
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if isinstance(qs, QuerySet) and not qs.query.where:
+            connection = connections[qs.db]
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                        [qs.model._meta.db_table],
+                    )
+                    row = cursor.fetchone()
+                if row and row[0] >= ESTIMATE_THRESHOLD:
+                    return row[0]
+        return super().count
+
+
+class EstimatedCountPagination(StandardPagination):
+    """Page numbers with the planner's row estimate instead of COUNT(*)."""
+    django_paginator_class = EstimatedCountPaginator
+
+
+class FlexiblePaginationMixin:
+    """
+    Lets a list endpoint opt in to other pagination modes:
+
+    * `?pagination=cursor` (or any `?cursor=`) switches to keyset pagination
+      ordered by `keyset_ordering`.
+    * `estimated_count = True` gives staff users estimated page counts on
+      unfiltered lists.
+
+    Without either the default page-number pagination is used.
+    """
+    keyset_ordering = ('-created_at', '-id')
+    estimated_count = False
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            user = self.request.user
+            if 'cursor' in params or params.get('pagination') == 'cursor':
+                self._paginator = KeysetPagination(ordering=self.keyset_ordering)
+            elif self.estimated_count and user and user.is_staff:
+                self._paginator = EstimatedCountPagination()
+            elif self.pagination_class is None:
+                self._paginator = None
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
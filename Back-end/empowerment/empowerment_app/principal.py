@@ -0,0 +1,140 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import F, OuterRef, Subquery
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from empowerment_app.models import Applicant, CustomUser, LoanOfficer, Sheha
+
+ROLE_CLAIMS = ('role', 'sheha_id', 'applicant_id', 'loan_officer_id')
+ROLES_CACHE_TIMEOUT = 60 * 60
+
+
+def bearer_token(request):
+    """
+    The AccessToken from the Authorization header, or None if it is
+    missing, invalid or has no user id. Only decodes the token: the user
+    is not loaded or checked.
+    """
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+    try:
+        token = AccessToken(header.split(' ', 1)[1])
+        token[api_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+    return token
+
+
+# The version lives on the user row, which JWT authentication loads anyway,
+# so every worker sees a change at once even with a per-process cache; the
+# cached roles are keyed by it and simply stop being read.
+def _roles_key(user):
+    return f"user_roles:{user.pk}:{user.roles_version}"
+
+
+def invalidate_roles(user_id):
+    """Called when a Sheha/LoanOfficer/Applicant row is created or deleted."""
+    CustomUser.objects.filter(pk=user_id).update(roles_version=F('roles_version') + 1)
+
+
+def resolve_roles(user):
+    """
+    Role and profile ids for a user, from cache or a single query.
+    """
+    key = _roles_key(user)
+    roles = cache.get(key)
+    if roles is not None:
+        return roles
+
+    ids = CustomUser.objects.filter(pk=user.pk).annotate(
+        sheha_id=Subquery(Sheha.objects.filter(user=OuterRef('pk')).values('id')[:1]),
+        loan_officer_id=Subquery(LoanOfficer.objects.filter(user=OuterRef('pk')).values('id')[:1]),
+        applicant_id=Subquery(Applicant.objects.filter(user=OuterRef('pk')).order_by('id').values('id')[:1]),
+    ).values('sheha_id', 'loan_officer_id', 'applicant_id').first() or {}
+
+    if ids.get('sheha_id'):
+        role = 'sheha'
+    elif ids.get('loan_officer_id'):
+        role = 'loan_officer'
+    elif user.is_staff or user.is_superuser:
+        role = 'admin'
+    else:
+        role = 'user'
+
+    roles = {
+        'role': role,
+        'sheha_id': ids.get('sheha_id'),
+        'applicant_id': ids.get('applicant_id'),
+        'loan_officer_id': ids.get('loan_officer_id'),
+    }
+    cache.set(key, roles, ROLES_CACHE_TIMEOUT)
+    return roles
+
+
+class RoleRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry the user's role claims."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        roles = resolve_roles(user)
+        for claim in ROLE_CLAIMS:
+            token[claim] = roles[claim]
+        token['roles_version'] = user.roles_version
+        return token
+
+
+class Principal:
+    """Who is making the request, read from the access token claims."""
+
+    def __init__(self, user_id, role, sheha_id=None, applicant_id=None, loan_officer_id=None):
+        self.user_id = user_id
+        self.role = role
+        self.sheha_id = sheha_id
+        self.applicant_id = applicant_id
+        self.loan_officer_id = loan_officer_id
+
+    @property
+    def is_sheha(self):
+        return self.role == 'sheha'
+
+    @property
+    def is_loan_officer(self):
+        return self.role == 'loan_officer'
+
+
+def get_principal(request):
+    """
+    Request-scoped Principal. Uses the token claims when they are present
+    and still current, otherwise falls back to resolve_roles().
+    """
+    principal = getattr(request, '_principal', None)
+    if principal is not None:
+        return principal
+
+    user = request.user
+    token = request.auth
+    claims = None
+    if token is not None and 'role' in token:
+        if token.get('roles_version') == user.roles_version:
+            claims = {claim: token.get(claim) for claim in ROLE_CLAIMS}
+    if claims is None:
+        claims = resolve_roles(user)
+
+    principal = Principal(user.pk, **claims)
+    request._principal = principal
+    return principal
+
+
+async def aget_principal(user, token):
+    """get_principal() for async views, given the user and access token."""
+    claims = None
+    if token is not None and 'role' in token:
+        if token.get('roles_version') == user.roles_version:
+            claims = {claim: token.get(claim) for claim in ROLE_CLAIMS}
+    if claims is None:
+        claims = await sync_to_async(resolve_roles)(user)
+    return Principal(user.pk, **claims)
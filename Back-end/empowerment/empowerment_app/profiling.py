@@ -0,0 +1,251 @@
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+import numpy as np
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# PERF_PROFILING turns the middleware on; PERF_SAMPLE_RATE is the share of
+# requests measured (unsampled ones cost one random() call)
+SAMPLE_RATE = getattr(settings, 'PERF_SAMPLE_RATE', 1.0)
+RING_SIZE = getattr(settings, 'PERF_RING_SIZE', 1000)
+# Upper bounds (ms) of the latency histogram buckets
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# view_ms is time in the view outside SQL: for DRF views, mostly serialization
+METRICS = ('total_ms', 'sql_count', 'sql_ms', 'view_ms', 'render_ms', 'bytes')
+
+_current = ContextVar('perf_profile', default=None)
+
+
+class Profile:
+    __slots__ = ('started', 'sql_count', 'sql_ms', 'view_started', 'view_sql_ms', 'view_ms', 'render_started', 'render_ms')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.view_started = None
+        self.view_sql_ms = 0.0
+        self.view_ms = None
+        self.render_started = None
+        self.render_ms = 0.0
+
+    def view_returned(self):
+        if self.view_started is not None and self.view_ms is None:
+            elapsed = (time.perf_counter() - self.view_started) * 1000
+            self.view_ms = max(elapsed - (self.sql_ms - self.view_sql_ms), 0.0)
+
+
+def _profile_sql(execute, sql, params, many, context):
+    # Installed on every connection; only counts inside a sampled request.
+    # The profile is a ContextVar, so sync_to_async threads see it too.
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.sql_count += 1
+        profile.sql_ms += (time.perf_counter() - start) * 1000
+
+
+def _install_sql_wrapper(connection, **kwargs):
+    # Outermost, so an execute_wrapper() block open when a connection is
+    # made still pops its own wrapper
+    if _profile_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _profile_sql)
+
+
+class RouteStats:
+    def __init__(self):
+        self.count = 0
+        self.sums = dict.fromkeys(METRICS, 0.0)
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.samples = deque(maxlen=RING_SIZE)
+
+    def add(self, sample):
+        self.count += 1
+        for name, value in zip(METRICS, sample):
+            self.sums[name] += value
+        for i, bound in enumerate(BUCKETS_MS):
+            if sample[0] <= bound:
+                self.buckets[i] += 1
+        self.samples.append(sample)
+
+
+class PerfRegistry:
+    """Per-process aggregates keyed by (method, route)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, method, route, sample):
+        with self._lock:
+            stats = self._routes.get((method, route))
+            if stats is None:
+                stats = self._routes[(method, route)] = RouteStats()
+            stats.add(sample)
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+    def _copy(self):
+        with self._lock:
+            return [
+                (key, stats.count, dict(stats.sums), list(stats.buckets), list(stats.samples))
+                for key, stats in sorted(self._routes.items())
+            ]
+
+    def summary(self):
+        """Per route: totals plus p50/p95/p99 of each metric over the ring buffer."""
+        routes = []
+        for (method, route), count, sums, buckets, samples in self._copy():
+            recent = np.array(samples, dtype=float).reshape(-1, len(METRICS))
+            percentiles = np.percentile(recent, [50, 95, 99], axis=0) if len(recent) else np.zeros((3, len(METRICS)))
+            routes.append({
+                'method': method,
+                'route': route,
+                'count': count,
+                'recent': len(recent),
+                'mean': {name: round(sums[name] / count, 2) for name in METRICS},
+                **{
+                    label: {name: round(float(v), 2) for name, v in zip(METRICS, row)}
+                    for label, row in zip(('p50', 'p95', 'p99'), percentiles)
+                },
+                'histogram_ms': dict(zip([str(b) for b in BUCKETS_MS] + ['+Inf'], buckets + [count])),
+            })
+        return routes
+
+    def prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = [
+            '# HELP empowerment_request_duration_seconds Request latency by route.',
+            '# TYPE empowerment_request_duration_seconds histogram',
+        ]
+        totals = []
+        for (method, route), count, sums, buckets, _ in self._copy():
+            labels = f'method="{method}",route="{_escape(route)}"'
+            for bound, value in zip(BUCKETS_MS, buckets):
+                lines.append(f'empowerment_request_duration_seconds_bucket{{{labels},le="{bound / 1000}"}} {value}')
+            lines.append(f'empowerment_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'empowerment_request_duration_seconds_sum{{{labels}}} {sums["total_ms"] / 1000}')
+            lines.append(f'empowerment_request_duration_seconds_count{{{labels}}} {count}')
+            totals.append((labels, sums))
+
+        for name, source, scale, help_text in (
+            ('sql_queries', 'sql_count', 1, 'SQL queries executed.'),
+            ('sql_seconds', 'sql_ms', 1000, 'Time spent in SQL.'),
+            ('view_seconds', 'view_ms', 1000, 'Time spent in views outside SQL (mostly serialization).'),
+            ('render_seconds', 'render_ms', 1000, 'Time spent rendering responses.'),
+            ('response_bytes', 'bytes', 1, 'Response body size.'),
+        ):
+            metric = f'empowerment_{name}_total'
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} counter')
+            for labels, sums in totals:
+                lines.append(f'{metric}{{{labels}}} {sums[source] / scale}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+registry = PerfRegistry()
+
+
+def _sampled():
+    # Unsampled requests cost one random() call
+    return SAMPLE_RATE >= 1 or random.random() < SAMPLE_RATE
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return '/' + match.route.replace('^', '').replace('$', '') if match.route else match.view_name
+
+
+class ProfilingMiddleware:
+    """
+    Opt-in request profiler (PERF_PROFILING). For a sampled request it
+    records total time, SQL count and time on every database alias, time
+    in the view outside SQL, render time and response size into
+    `registry`. Works in sync and async chains alike.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PERF_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(_install_sql_wrapper, dispatch_uid='perf_profile_sql')
+        for connection in connections.all(initialized_only=True):
+            _install_sql_wrapper(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not _sampled():
+            return self.get_response(request)
+        profile = Profile()
+        token = _current.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, profile)
+
+    async def __acall__(self, request):
+        if not _sampled():
+            return await self.get_response(request)
+        profile = Profile()
+        token = _current.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.record(request, response, profile)
+
+    def record(self, request, response, profile):
+        # Responses that are not rendered later return straight from the view
+        profile.view_returned()
+        total_ms = (time.perf_counter() - profile.started) * 1000
+        size = 0 if response.streaming else len(response.content)
+        registry.record(request.method, _route(request), (
+            total_ms, profile.sql_count, profile.sql_ms, profile.view_ms or 0.0, profile.render_ms, size,
+        ))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = _current.get()
+        if profile is not None:
+            profile.view_started = time.perf_counter()
+            profile.view_sql_ms = profile.sql_ms
+        return None
+
+    def process_template_response(self, request, response):
+        # DRF responses render after the view returns; time that step too
+        profile = _current.get()
+        if profile is not None:
+            profile.view_returned()
+            profile.render_started = time.perf_counter()
+
+            def rendered(response):
+                profile.render_ms += (time.perf_counter() - profile.render_started) * 1000
+
+            response.add_post_render_callback(rendered)
+        return response
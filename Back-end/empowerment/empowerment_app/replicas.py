@@ -0,0 +1,146 @@
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework_simplejwt.settings import api_settings
+
+from empowerment_app.principal import bearer_token
+
+logger = logging.getLogger(__name__)
+
+REPLICAS = list(getattr(settings, 'DATABASE_REPLICAS', []))
+# A replica further behind than this is skipped; after a write the user
+# stays on the primary for PIN_SECONDS, which must outlast the allowed lag
+MAX_LAG_SECONDS = getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5)
+PIN_SECONDS = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+HEALTH_TTL = getattr(settings, 'REPLICA_HEALTH_TTL', 5)
+PIN_COOKIE = 'db_pin'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Replica chosen for the current request; None means the primary
+_read_alias = ContextVar('read_alias', default=None)
+
+# alias -> (checked_at, healthy, lag_seconds), per process
+_health = {}
+
+LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN NULL
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+def check_replica(alias):
+    """(healthy, lag in seconds or None) for one replica, measured now."""
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute(LAG_SQL)
+            lag = cursor.fetchone()[0]
+    except Exception as e:
+        logger.warning("Replica %s is unreachable: %s", alias, e)
+        return False, None
+    lag = float(lag) if lag is not None else None
+    if lag is not None and lag > MAX_LAG_SECONDS:
+        logger.warning("Replica %s is %.1fs behind; reading from the primary", alias, lag)
+        return False, lag
+    return True, lag
+
+
+def replica_status(alias):
+    checked_at, healthy, lag = _health.get(alias, (None, False, None))
+    if checked_at is None or time.monotonic() - checked_at > HEALTH_TTL:
+        healthy, lag = check_replica(alias)
+        _health[alias] = (time.monotonic(), healthy, lag)
+    return healthy, lag
+
+
+def healthy_replicas():
+    return [alias for alias in REPLICAS if replica_status(alias)[0]]
+
+
+def read_alias():
+    """The alias reads go to inside the current request, if not the primary."""
+    return _read_alias.get()
+
+
+def _pin_key(user_id):
+    return f"db_pin:{user_id}"
+
+
+def _token_user_id(request):
+    # The access token is only decoded here, DRF still authenticates it
+    token = bearer_token(request)
+    return token[api_settings.USER_ID_CLAIM] if token is not None else None
+
+
+def _is_pinned(request, user_id):
+    if request.COOKIES.get(PIN_COOKIE):
+        return True
+    if user_id is not None:
+        return bool(cache.get(_pin_key(user_id)))
+    return False
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets safe-method requests read from a healthy replica (see
+    ReplicaRouter). A write pins the user to the primary for
+    PIN_SECONDS, both with a cookie and a per-user cache entry keyed by
+    the JWT user id, so they always read their own writes. Runs in both
+    sync and async chains, so the async views keep the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        user_id, alias = self.route(request)
+        token = _read_alias.set(alias)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        return self.pin(request, response, user_id)
+
+    async def __acall__(self, request):
+        # Health checks and the pin lookup hit the database and the cache
+        user_id, alias = await sync_to_async(self.route)(request)
+        token = _read_alias.set(alias)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+        return await sync_to_async(self.pin)(request, response, user_id)
+
+    def route(self, request):
+        """(JWT user id, replica alias or None) for this request."""
+        user_id = _token_user_id(request)
+        alias = None
+        if request.method in SAFE_METHODS and not _is_pinned(request, user_id):
+            replicas = healthy_replicas()
+            alias = random.choice(replicas) if replicas else None
+        return user_id, alias
+
+    def pin(self, request, response, user_id):
+        if request.method not in SAFE_METHODS:
+            if user_id is not None:
+                cache.set(_pin_key(user_id), True, PIN_SECONDS)
+            response.set_cookie(PIN_COOKIE, '1', max_age=PIN_SECONDS, httponly=True, samesite='Lax')
+        return response
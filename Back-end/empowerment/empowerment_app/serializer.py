@@ -1,9 +1,13 @@
 from decimal import Decimal
+from django.db import transaction
 from rest_framework import serializers
 from .models import *
 from .models import CustomUser
 from django.contrib.gis.geos import Point
 from empowerment_app.models import CustomUser as User
+from empowerment_app.principal import get_principal
+from empowerment_app.utils.scoring import score_instances
+from empowerment_app.utils.images import SMALL_THUMBNAIL, thumbnail_urls
 
 # ================
 # User serializer
@@ -23,18 +27,30 @@ class CustomUserCreateSerializer(serializers.ModelSerializer):
 #         fields = '__all__'
 
 
+def _absolute(serializer, urls):
+    # Same absolute URLs the ImageField itself returns
+    request = serializer.context.get('request')
+    if not urls or request is None:
+        return urls
+    return {size: request.build_absolute_uri(url) for size, url in urls.items()}
+
+
 class ApplicantSerializer(serializers.ModelSerializer):
+    passport_thumbnails = serializers.SerializerMethodField()
     
     class Meta:
         model = Applicant
         fields = '__all__'  
-        read_only_fields = ['user','sheha'] 
+        read_only_fields = ['user','sheha','passport_thumbnails_ready'] 
 
         extra_kwargs = {
             'sheha': {'required': False, 'allow_null': True},
             'passport_photo': {'required': False, 'allow_null': True},
         }
 
+    def get_passport_thumbnails(self, obj):
+        return _absolute(self, thumbnail_urls(obj.passport_size, obj.passport_thumbnails_ready))
+
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
@@ -107,11 +123,10 @@ class BusinessSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        user = self.context['request'].user
-        applicant = Applicant.objects.filter(user=user).first()
-        if not applicant:
+        applicant_id = get_principal(self.context['request']).applicant_id
+        if not applicant_id:
             raise serializers.ValidationError("No applicant profile linked to current user.")
-        validated_data['applicant'] = applicant
+        validated_data['applicant_id'] = applicant_id
         return super().create(validated_data)
 
     def update(self, instance, validated_data):
@@ -131,13 +146,12 @@ class BusinessSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
     def validate_bank_no(self, value):
-        user = self.context['request'].user
-        applicant = Applicant.objects.filter(user=user).first()
-        if not applicant:
+        applicant_id = get_principal(self.context['request']).applicant_id
+        if not applicant_id:
             raise serializers.ValidationError("Applicant profile not found.")
 
         if self.instance is None or self.instance.bank_no != value:
-            if Business.objects.filter(applicant=applicant, bank_no=value).exists():
+            if Business.objects.filter(applicant_id=applicant_id, bank_no=value).exists():
                 raise serializers.ValidationError("You have already registered a business with this bank number.")
         return value
 
@@ -233,6 +247,14 @@ class LoanSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Amount must be greater than zero.")
         return value
 
+class ScheduleRequestSerializer(serializers.Serializer):
+    # Every field is optional; defaults come from the loan and settings
+    method = serializers.ChoiceField(choices=RepaymentSchedule.METHOD_CHOICES, required=False)
+    annual_rate = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0, required=False)
+    term_months = serializers.IntegerField(min_value=1, max_value=360, required=False)
+    grace_months = serializers.IntegerField(min_value=0, required=False)
+    start_date = serializers.DateField(required=False)
+
 class RepaymentSerializer(serializers.ModelSerializer):
     business_name = serializers.CharField(source='business.name', read_only=True)
 
@@ -244,13 +266,32 @@ class RepaymentSerializer(serializers.ModelSerializer):
 # ===================
 # Sheha Notification
 # ===================
+class BulkNotificationSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=500)
+    reason = serializers.CharField(required=False, allow_blank=True)
+
+
 class NotificationSerializer(serializers.ModelSerializer):
+    # The applicant's own photo; notifications no longer keep a copy
+    passport_size = serializers.ImageField(source='applicant.passport_size', read_only=True)
+    passport_thumbnail = serializers.SerializerMethodField()
+
     class Meta:
         model = Notification
-        fields = ['id', 'sheha', 'applicant', 'name', 'village', 'passport_size', 'is_read', 'is_verified_by_sheha', 'created_at']
+        fields = ['id', 'sheha', 'applicant', 'name', 'village', 'passport_size', 'passport_thumbnail', 'is_read', 'is_verified_by_sheha', 'created_at']
+
+    def get_passport_thumbnail(self, obj):
+        thumbnails = _absolute(self, thumbnail_urls(obj.applicant.passport_size, obj.applicant.passport_thumbnails_ready))
+        return thumbnails and thumbnails[SMALL_THUMBNAIL]
+
 
 
 
+class TransitionEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TransitionEvent
+        fields = ['id', 'topic', 'object_id', 'kind', 'old_value', 'new_value', 'actor', 'data', 'created_at']
+
 
 # =====LOANS===========
 
@@ -278,38 +319,58 @@ class LoanApplicationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = LoanApplication
-        fields = '__all__'
+        exclude = ['counted_under']
         read_only_fields = ['applicant']
 
     def validate(self, data):
-        business = data.get('business')
         requested = data.get('amount_requested')
+        loan_type = data.get('loan_type')
+        expenses = data.get('expenses', [])
 
-        if business and requested:
-            max_allowed = business.anual_income * Decimal('0.7')
-            if requested > max_allowed:
+        if requested is not None:
+            if loan_type and requested > loan_type.max_amount:
+                raise serializers.ValidationError({
+                    'amount_requested': f"Requested amount exceeds the {loan_type.name} maximum ({loan_type.max_amount})."
+                })
+            total = sum((e['amount'] for e in expenses), Decimal('0'))
+            if total > requested:
                 raise serializers.ValidationError({
-                    'amount_requested': f"Requested amount exceeds 70% of business income ({max_allowed})."
+                    'expenses': f"Total expenses ({total}) exceed the requested amount ({requested})."
                 })
         return data
+
+    @transaction.atomic
     def create(self, validated_data):
-        request = self.context['request']
-        user = request.user
-        
-        # 🔍 Find the applicant for the current user
-        applicant = Applicant.objects.filter(user=user).first()
-        if not applicant:
+        principal = get_principal(self.context['request'])
+        if not principal.applicant_id:
             raise serializers.ValidationError("Hakuna profaili ya mwombaji inayohusishwa na mtumiaji huyu.")
-        
-        # 🔍 Find the business for this applicant
-        business = Business.objects.filter(applicant=applicant).first()
+
+        # Applicant (and the sheha the response shows) come with the business
+        business = (
+            Business.objects.select_related('applicant__sheha')
+            .filter(applicant_id=principal.applicant_id)
+            .order_by('id')
+            .first()
+        )
         if not business:
             raise serializers.ValidationError("Hakuna biashara iliyosajiliwa kwa mwombaji huyu.")
-        validated_data['applicant'] = applicant
+
+        requested = validated_data['amount_requested']
+        max_allowed = business.anual_income * Decimal('0.7')
+        if requested > max_allowed:
+            raise serializers.ValidationError({
+                'amount_requested': f"Requested amount exceeds 70% of business income ({max_allowed})."
+            })
+
+        validated_data['applicant'] = business.applicant
         validated_data['business'] = business
-        
+
         expenses_data = validated_data.pop('expenses', [])
-        application = LoanApplication.objects.create(**validated_data)
-        for exp in expenses_data:
-            LoanExpenseItem.objects.create(loan_application=application, **exp)
-            return application
+        application = LoanApplication(**validated_data)
+        # Automatic score and system_comment, no extra query
+        score_instances([application])
+        application.save()
+        LoanExpenseItem.objects.bulk_create(
+            [LoanExpenseItem(loan_application=application, **exp) for exp in expenses_data]
+        )
+        return application
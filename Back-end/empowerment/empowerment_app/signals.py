@@ -17,3 +17,140 @@
 #         except Business.DoesNotExist:
 #             # Hakuna business iliyosajiliwa kwa applicant huyu
 #             pass
+
+
+# =======================
+# Admin dashboard counters
+# =======================
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from .models import LoanApplication
+from .utils.admin_stats import bump, counted_under, stat_keys
+from .utils.events import event, record
+
+
+@receiver(post_init, sender=LoanApplication)
+def remember_loan_decision(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred `decision` is not loaded here
+    instance._stat_decision = instance.__dict__.get('decision')
+
+
+# Before count_loan_application, which moves _stat_decision on
+@receiver(post_save, sender=LoanApplication)
+def log_loan_decision(sender, instance, created, **kwargs):
+    previous = instance._stat_decision
+    if created:
+        record(event('loan_application', instance.pk, 'submitted', instance.decision, actor=instance.applicant.user_id))
+    elif previous is not None and previous != instance.decision:
+        record(event(
+            'loan_application', instance.pk, 'decision', instance.decision, previous, instance.reviewed_by_id,
+            score=instance.score,
+        ))
+
+
+@receiver(post_save, sender=LoanApplication)
+def count_loan_application(sender, instance, created, **kwargs):
+    previous = instance._stat_decision
+    if created:
+        keys = stat_keys(instance)
+        # Queryset update: no second round of save signals
+        LoanApplication.objects.filter(pk=instance.pk).update(counted_under=keys)
+        instance.counted_under = [list(pair) for pair in keys]
+        bump(keys, (instance.decision, 1))
+    elif previous is not None and previous != instance.decision:
+        bump(counted_under(instance), (previous, -1), (instance.decision, 1))
+    instance._stat_decision = instance.decision
+
+
+@receiver(post_delete, sender=LoanApplication)
+def uncount_loan_application(sender, instance, **kwargs):
+    bump(counted_under(instance), (instance._stat_decision or instance.decision, -1))
+
+
+# ==========================
+# Role claim cache invalidation
+# ==========================
+from .models import Applicant, LoanOfficer, Sheha
+from .principal import invalidate_roles
+
+
+@receiver(post_save, sender=Sheha)
+@receiver(post_save, sender=LoanOfficer)
+@receiver(post_save, sender=Applicant)
+def role_row_saved(sender, instance, created, **kwargs):
+    if created:
+        invalidate_roles(instance.user_id)
+
+
+@receiver(post_delete, sender=Sheha)
+@receiver(post_delete, sender=LoanOfficer)
+@receiver(post_delete, sender=Applicant)
+def role_row_deleted(sender, instance, **kwargs):
+    invalidate_roles(instance.user_id)
+
+
+# ==========================
+# Passport photos
+# ==========================
+from django.db import transaction
+from django.db.models.signals import pre_save
+from .utils.images import normalise, schedule_thumbnails
+
+
+@receiver(pre_save, sender=Applicant)
+def normalise_passport(sender, instance, **kwargs):
+    # A new upload is still uncommitted here; swap it for the stripped,
+    # recompressed, hash-named version before the field stores it
+    photo = instance.passport_size
+    if photo and not photo._committed:
+        instance.passport_size = normalise(photo)
+        instance.passport_thumbnails_ready = False
+
+
+def _passport_name(photo):
+    # A FieldFile once the attribute has been read, the stored name before
+    return getattr(photo, 'name', photo) or ''
+
+
+@receiver(post_init, sender=Applicant)
+def remember_passport(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred `passport_size` is not loaded here
+    instance._passport_name = _passport_name(instance.__dict__.get('passport_size'))
+
+
+@receiver(post_save, sender=Applicant)
+def queue_passport_thumbnails(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and 'passport_size' not in update_fields:
+        return
+    name = _passport_name(instance.passport_size)
+    changed = created or name != instance._passport_name
+    instance._passport_name = name
+    # A full save() of a row whose thumbnails are still pending leaves
+    # them to build_passport_images rather than queueing a job per save
+    if name and changed and not instance.passport_thumbnails_ready:
+        transaction.on_commit(lambda: schedule_thumbnails(instance.pk))
+
+
+# ==========================
+# HTTP cache versions
+# ==========================
+from .models import LoanType
+from .utils import http_cache
+
+
+@receiver(post_save, sender=LoanType)
+@receiver(post_delete, sender=LoanType)
+def loan_types_changed(sender, **kwargs):
+    http_cache.bump('loan_types')
+
+
+@receiver(post_save, sender=Sheha)
+@receiver(post_delete, sender=Sheha)
+def shehas_changed(sender, **kwargs):
+    http_cache.bump('shehas')
+
+
+@receiver(post_save, sender=Applicant)
+@receiver(post_delete, sender=Applicant)
+def applicant_changed(sender, instance, **kwargs):
+    http_cache.bump(f"applicant:{instance.pk}")
@@ -1,3 +1,1498 @@
-from django.test import TestCase
+import hashlib
+import json
+import math
+import os
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.gis.geos import Point
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+import numpy as np
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test.utils import CaptureQueriesContext
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from bank_app.models import MockBankLoan
+from empowerment_app import async_views, profiling, replicas
+from empowerment_app.management.commands.check_query_plans import hot_queries, plan_seq_scans
+from empowerment_app.models import (
+    Applicant, Business, CustomUser, Loan, LoanApplication, LoanApplicationStat, LoanOfficer, LoanType, Notification,
+    OutgoingEmail, PortfolioRollup, Repayment, RepaymentSchedule, Sheha, TransitionEvent,
+)
+from empowerment_app.pagination import EstimatedCountPaginator, KeysetPagination, StandardPagination
+from empowerment_app.principal import RoleRefreshToken, bearer_token, resolve_roles
+from empowerment_app.utils import admin_stats, benchmark, events, geo, images, schedule as schedules, scoring
+from empowerment_app.utils.bank_verification import verify_applicants
+from empowerment_app.utils.mail_queue import BACKOFF_BASE, dispatch_pending, queue_email
+from empowerment_app.utils.query_budget import assert_max_queries
+from empowerment_app.views import LoanApplicationViewSet
+
+
+# === Fixtures ===
+def make_user(username, **extra):
+    return CustomUser.objects.create_user(username=username, password='secret', name=username, **extra)
+
+
+def make_sheha(ward='Kikwajuni'):
+    return Sheha.objects.create(
+        user=make_user(f"sheha_{ward}"), name=f"Sheha {ward}", age=50, gender='Male',
+        phone='+255700000001', ward=ward, email='sheha@example.com',
+    )
+
+
+def make_loan_officer(username='officer'):
+    return LoanOfficer.objects.create(
+        user=make_user(username), name='Loan Officer', gender='Female', age=40,
+        office='HQ', email='officer@example.com', phone='+255700000003',
+    )
+
+
+def make_applicant(username, sheha=None, **extra):
+    fields = {
+        'name': username, 'age': 30, 'gender': 'Female', 'marital_status': 'Single',
+        'region': 'Mjini Magharibi', 'district': 'Mjini', 'ward': sheha.ward if sheha else 'Kikwajuni',
+        'village': 'Mwembeladu', 'phone': '+255700000002', 'sheha': sheha,
+    }
+    fields.update(extra)
+    return Applicant.objects.create(user=make_user(username, email=f"{username}@example.com"), **fields)
+
+
+def make_business(applicant, bank_no=None, income=Decimal('10000000')):
+    return Business.objects.create(
+        applicant=applicant, name=f"{applicant.name} shop", type='Retail',
+        anual_income=income, bank_no=bank_no or f"ACC{applicant.pk:06d}",
+    )
+
+
+def make_loan_type(max_amount=Decimal('5000000')):
+    return LoanType.objects.create(name='Small business', max_amount=max_amount)
+
+
+def make_application(business, loan_type, **extra):
+    fields = {
+        'amount_requested': Decimal('1000000'), 'purpose': 'Stock', 'repayment_period': 12,
+        'monthly_sales': Decimal('800000'), 'monthly_expenses': Decimal('500000'),
+    }
+    fields.update(extra)
+    return LoanApplication.objects.create(
+        applicant=business.applicant, business=business, loan_type=loan_type, **fields,
+    )
+
+
+def make_loan(business, amount, approval_date, officer, duration='12 months'):
+    return Loan.objects.create(
+        business=business, loan_officer=officer, amount=amount, duration=duration, status='Active',
+        application_date=approval_date, approval_date=approval_date,
+    )
+
+
+def make_repayment(business, amount, on):
+    return Repayment.objects.create(business=business, amount=amount, time='10:00', day=on.strftime('%A'), date=on)
+
+
+def api_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {RoleRefreshToken.for_user(user).access_token}")
+    return client
+
+
+# === Query budgets ===
+class LoanApplicationQueryBudgetTests(TestCase):
+    """The list/retrieve budgets hold whatever the page size."""
+
+    def setUp(self):
+        cache.clear()
+        self.loan_type = make_loan_type()
+        self.client = api_client(make_loan_officer().user)
+        self.seeded = 0
+
+    def seed(self, count):
+        for _ in range(count):
+            self.seeded += 1
+            make_application(make_business(make_applicant(f"applicant_{self.seeded}")), self.loan_type)
+
+    def list_queries(self, page_size, client=None):
+        with assert_max_queries(LoanApplicationViewSet.query_budget['list']) as ctx:
+            response = (client or self.client).get('/api/loan-applications/', {'page_size': page_size})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), page_size)
+        return len(ctx)
+
+    def test_list_is_constant_in_page_size(self):
+        self.seed(2)
+        small = self.list_queries(2)
+        self.seed(18)
+        large = self.list_queries(20)
+        self.assertEqual(small, large)
+
+    def test_staff_list_with_estimated_count(self):
+        self.seed(20)
+        self.list_queries(20, client=api_client(make_user('admin', is_staff=True)))
+
+    def test_retrieve(self):
+        self.seed(1)
+        application = LoanApplication.objects.get()
+        with assert_max_queries(LoanApplicationViewSet.query_budget['retrieve']):
+            response = self.client.get(f'/api/loan-applications/{application.pk}/')
+        self.assertEqual(response.status_code, 200)
+
+
+class LoanApplicationCreateBudgetTests(TransactionTestCase):
+    """
+    Not a TestCase: outside its wrapping transaction the create's own
+    atomic() opens a transaction instead of adding SAVEPOINT queries.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.loan_type = make_loan_type()
+        self.applicant = make_applicant('borrower')
+        make_business(self.applicant)
+        self.client = api_client(self.applicant.user)
+
+    def create(self):
+        return self.client.post('/api/loan-applications/', {
+            'loan_type': self.loan_type.pk,
+            'amount_requested': '1000000',
+            'purpose': 'Stock',
+            'repayment_period': 12,
+            'monthly_sales': '800000',
+            'monthly_expenses': '500000',
+            'expenses': [
+                {'item': 'Rent', 'description': 'Shop rent', 'amount': '200000'},
+                {'item': 'Stock', 'description': 'Goods', 'amount': '300000'},
+            ],
+        }, format='json')
+
+    def test_create(self):
+        # Holds for the very first application too: stat counters are upserted
+        with assert_max_queries(LoanApplicationViewSet.query_budget['create']):
+            response = self.create()
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(response.data['expenses']), 2)
+
+
+# === Query plans ===
+class QueryPlanTests(TestCase):
+    """
+    EXPLAIN every hot_queries() entry on seeded, ANALYZEd tables with
+    enable_seqscan left on: the plan PostgreSQL would really pick must
+    not contain a Seq Scan.
+    """
+    databases = {'default', 'bankdb'}
+    ROWS = 5000
+
+    @classmethod
+    def setUpTestData(cls):
+        n = cls.ROWS
+        users = CustomUser.objects.bulk_create(
+            [CustomUser(username=f"plan_{i}", name=f"user {i}", password='!') for i in range(3 * n)]
+        )
+        sheha_users, officer_users, applicant_users = users[:n], users[n:2 * n], users[2 * n:]
+        shehas = Sheha.objects.bulk_create([
+            Sheha(user=u, name=u.name, age=50, gender='Male', phone='+255700000001', ward=f"ward {i}",
+                  email='sheha@example.com')
+            for i, u in enumerate(sheha_users)
+        ])
+        LoanOfficer.objects.bulk_create([
+            LoanOfficer(user=u, name=u.name, gender='Female', age=40, office='HQ',
+                        email='officer@example.com', phone='+255700000003')
+            for u in officer_users
+        ])
+        applicants = Applicant.objects.bulk_create([
+            Applicant(user=u, name=u.name, age=30, gender='Female', marital_status='Single',
+                      region='Mjini Magharibi', district='Mjini', ward=sheha.ward, village='Mwembeladu',
+                      phone='+255700000002', sheha=sheha, is_verified_by_sheha=i % 10 == 0)
+            for i, (u, sheha) in enumerate(zip(applicant_users, shehas))
+        ])
+        # Spread over East Africa so the checked bbox is a small slice
+        businesses = Business.objects.bulk_create([
+            Business(applicant=a, name=f"shop {i}", type='Retail', anual_income=Decimal('10000000'),
+                     bank_no=f"PLAN{i:06d}", location=Point(29 + (i % 100) * 0.11, -11 + (i // 100) * 0.2, srid=4326))
+            for i, a in enumerate(applicants)
+        ])
+        Notification.objects.bulk_create([
+            Notification(sheha_id=a.sheha_id, applicant=a, name=a.name, village=a.village,
+                          is_verified_by_sheha=i % 10 != 0)
+            for i, a in enumerate(applicants)
+        ])
+        loan_type = make_loan_type()
+        LoanApplication.objects.bulk_create([
+            LoanApplication(applicant=b.applicant, business=b, loan_type=loan_type,
+                            amount_requested=Decimal('1000000'), purpose='Stock', repayment_period=12,
+                            decision=('approved', 'rejected', 'pending')[i % 3])
+            for i, b in enumerate(businesses)
+        ])
+        OutgoingEmail.objects.bulk_create([
+            OutgoingEmail(subject='s', message='m', from_email='a@example.com', to='b@example.com',
+                          status='pending' if i % 50 == 0 else 'sent')
+            for i in range(n)
+        ])
+        MockBankLoan.objects.using('bankdb').bulk_create([
+            MockBankLoan(bank_no=f"PLAN{i:06d}", applicant_name=f"shop {i}", has_active_loan=i % 3 == 0)
+            for i in range(n)
+        ])
+        for alias in cls.databases:
+            if connections[alias].vendor == 'postgresql':
+                with connections[alias].cursor() as cursor:
+                    cursor.execute("ANALYZE")
+
+    def test_hot_queries_use_an_index(self):
+        for label, alias, queryset in hot_queries():
+            with self.subTest(label):
+                if connections[alias].vendor != 'postgresql':
+                    self.skipTest(f"'{alias}' is not PostgreSQL")
+                self.assertEqual(plan_seq_scans(alias, queryset), [])
+
+    def test_map_queries_use_the_location_gist_index(self):
+        def index_names(plan):
+            yield plan.get('Index Name')
+            for child in plan.get('Plans', []):
+                yield from index_names(child)
+
+        for label, (sql, params) in [
+            ('bbox', geo.bbox_query((39.1, -6.3, 39.4, -6.0))),
+            ('nearby', geo.near_query(-6.16, 39.19, 5000)),
+        ]:
+            with self.subTest(label), connections['default'].cursor() as cursor:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                self.assertIn('empowerment_app_business_location_id', set(index_names(plan[0]['Plan'])))
+
+
+# === Portfolio analytics ===
+class PortfolioRollupTests(TestCase):
+    def test_repayments_are_split_between_a_business_loans(self):
+        officer = make_loan_officer()
+        business = make_business(make_applicant('borrower'))
+        make_loan(business, Decimal('1000000'), date(2025, 1, 1), officer)
+        make_loan(business, Decimal('500000'), date(2025, 6, 1), officer)
+        make_repayment(business, Decimal('700000'), date(2025, 3, 1))
+        make_repayment(business, Decimal('500000'), date(2025, 8, 1))
+
+        call_command('refresh_portfolio', '--blocking', stdout=StringIO())
+
+        # 1.2M paid: the first loan is settled, 200k goes to the second
+        total = PortfolioRollup.objects.get(dimension='total')
+        self.assertEqual(total.loans, 2)
+        self.assertEqual(total.disbursed, Decimal('1500000'))
+        self.assertEqual(total.outstanding, Decimal('300000'))
+
+
+# === Repayment schedules ===
+class ComputeInstallmentsTests(SimpleTestCase):
+    def installments(self, principal, rate, term, grace=0, declining=False):
+        return list(schedules.compute_installments([principal], [rate], [term], [grace], [declining])[0])
+
+    def test_flat(self):
+        # 100 principal + 12 interest on the original amount, every month
+        self.assertEqual(self.installments(1200, 12, 12), [112.0] * 12)
+
+    def test_declining(self):
+        rows = self.installments(1000, 12, 12, declining=True)
+        self.assertEqual(rows[:11], [88.85] * 11)
+        self.assertAlmostEqual(sum(rows), 1066.19, places=2)
+
+    def test_grace_months_are_interest_only(self):
+        rows = self.installments(1200, 12, 12, grace=2)
+        self.assertEqual(rows[:2], [12.0, 12.0])
+        # The principal is then repaid over the remaining 10 months
+        self.assertEqual(rows[2:], [132.0] * 10)
+
+    def test_rounding_adds_up_to_the_loan(self):
+        self.assertEqual(self.installments(1000, 0, 3), [333.33, 333.33, 333.34])
+        schedule = schedules.build_schedules(
+            [Loan(amount=Decimal('1000'), duration='3 months', approval_date=date(2025, 1, 1))],
+            method='flat', annual_rate=Decimal('0'),
+        )[0]
+        self.assertEqual(schedule.total_due, Decimal('1000.00'))
+        self.assertEqual(sum(schedule.installments), Decimal('1000.00'))
+
+    def test_rows_are_padded_to_the_longest_term(self):
+        grid = schedules.compute_installments([300, 200], [0, 0], [3, 2], [0, 0], [False, False])
+        self.assertEqual(grid.tolist(), [[100.0, 100.0, 100.0], [100.0, 100.0, 0.0]])
+
+
+class ArrearsTests(TestCase):
+    def setUp(self):
+        officer = make_loan_officer()
+        self.business = make_business(make_applicant('borrower'))
+        self.first = make_loan(self.business, Decimal('1200000'), date(2025, 1, 1), officer, duration='12 months')
+        self.second = make_loan(self.business, Decimal('600000'), date(2025, 1, 1), officer, duration='6 months')
+        RepaymentSchedule.objects.bulk_create(
+            schedules.build_schedules([self.first, self.second], method='flat', annual_rate=Decimal('0'))
+        )
+
+    def rows(self, as_of):
+        return {s.loan_id: s for s in schedules.with_arrears(as_of=as_of)}
+
+    def test_repayments_cover_installments_due_first(self):
+        make_repayment(self.business, Decimal('900000'), date(2025, 6, 15))
+
+        rows = self.rows(date(2025, 7, 1))
+        # Six 100k installments due on each loan, 1.2M in all; the 900k
+        # covers them by due date, so the business is 300k behind overall
+        self.assertEqual(rows[self.first.pk].due_to_date, Decimal('600000'))
+        self.assertEqual(rows[self.first.pk].paid, Decimal('500000'))
+        self.assertEqual(rows[self.first.pk].arrears, Decimal('100000'))
+        self.assertEqual(rows[self.second.pk].due_to_date, Decimal('600000'))
+        self.assertEqual(rows[self.second.pk].paid, Decimal('400000'))
+        self.assertEqual(rows[self.second.pk].arrears, Decimal('200000'))
+
+        response = api_client(make_user('admin', is_staff=True)).get('/api/loans/arrears/')
+        self.assertEqual(sum(Decimal(str(r['arrears'])) for r in response.data['results']), Decimal('300000'))
+
+    def test_payment_ahead_of_schedule_goes_to_the_oldest_loan(self):
+        make_repayment(self.business, Decimal('1500000'), date(2025, 6, 15))
+
+        rows = self.rows(date(2025, 7, 1))
+        # 1.2M covers everything due; the other 300k settles the first
+        # loan's later installments
+        self.assertEqual(rows[self.first.pk].paid, Decimal('900000'))
+        self.assertEqual(rows[self.second.pk].paid, Decimal('600000'))
+        self.assertEqual(rows[self.second.pk].arrears, Decimal('0'))
+
+
+# === Async sheha verification ===
+class AsyncVerifyTests(TestCase):
+    databases = {'default', 'bankdb'}
+
+    def setUp(self):
+        cache.clear()
+        self.sheha = make_sheha()
+        applicant = make_applicant('borrower', sheha=self.sheha)
+        make_business(applicant)
+        self.notification = Notification.objects.create(
+            sheha=self.sheha, applicant=applicant, name=applicant.name, village=applicant.village,
+        )
+
+    def verify(self):
+        return api_client(self.sheha.user).post(f'/api/async/notifications/{self.notification.pk}/verify/')
+
+    def test_verify(self):
+        response = self.verify()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['bank_status'], 'verified')
+        self.notification.refresh_from_db()
+        self.assertEqual(self.notification.status, 'verified')
+        self.assertEqual(self.verify().status_code, 404)
+
+    def test_only_one_concurrent_verify_wins(self):
+        # Both requests passed the pending check before either updated
+        self.assertTrue(async_views._mark_verified(self.notification, self.sheha.user_id))
+        self.assertFalse(async_views._mark_verified(self.notification, self.sheha.user_id))
+        self.assertEqual(TransitionEvent.objects.filter(kind='sheha_verified').count(), 1)
+
+
+# === Email outbox ===
+class RejectingBackend(LocmemBackend):
+    def send_messages(self, messages):
+        raise ConnectionError("550 mailbox unavailable")
+
+
+class UnreachableBackend(LocmemBackend):
+    def open(self):
+        raise ConnectionRefusedError("SMTP server unreachable")
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class MailQueueTests(TestCase):
+    def setUp(self):
+        self.email = queue_email('Subject', 'Body', ['a@example.com', 'b@example.com'], 'noreply@example.com')
+
+    def make_due(self):
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+
+    def test_sends_pending_emails(self):
+        self.assertEqual(dispatch_pending(), (1, 0))
+        self.email.refresh_from_db()
+        self.assertEqual((self.email.status, self.email.attempts, self.email.last_error), ('sent', 1, ''))
+        self.assertIsNotNone(self.email.sent_at)
+        self.assertEqual(mail.outbox[0].to, ['a@example.com', 'b@example.com'])
+        # Nothing left to send
+        self.assertEqual(dispatch_pending(), (0, 0))
+
+    @override_settings(EMAIL_BACKEND='empowerment_app.tests.RejectingBackend')
+    def test_failure_backs_off_exponentially(self):
+        for attempt in (1, 2, 3):
+            before = timezone.now()
+            self.assertEqual(dispatch_pending(), (0, 1))
+            self.email.refresh_from_db()
+            self.assertEqual(self.email.status, 'pending')
+            self.assertEqual(self.email.attempts, attempt)
+            self.assertIn('550', self.email.last_error)
+            delay = timedelta(seconds=BACKOFF_BASE * 2 ** (attempt - 1))
+            self.assertGreaterEqual(self.email.next_attempt_at, before + delay)
+            self.assertLessEqual(self.email.next_attempt_at, timezone.now() + delay)
+            # Not due again until the backoff has passed
+            self.assertEqual(dispatch_pending(), (0, 0))
+            self.make_due()
+
+    @override_settings(EMAIL_BACKEND='empowerment_app.tests.RejectingBackend')
+    def test_gives_up_after_max_attempts(self):
+        for _ in range(3):
+            dispatch_pending(max_attempts=3)
+            self.make_due()
+        self.email.refresh_from_db()
+        self.assertEqual((self.email.status, self.email.attempts), ('failed', 3))
+        self.assertEqual(dispatch_pending(max_attempts=3), (0, 0))
+
+    @override_settings(EMAIL_BACKEND='empowerment_app.tests.UnreachableBackend')
+    def test_unreachable_server_keeps_the_batch(self):
+        queue_email('Second', 'Body', ['c@example.com'])
+        self.assertEqual(dispatch_pending(), (0, 2))
+        for email in OutgoingEmail.objects.all():
+            self.assertEqual((email.status, email.attempts), ('pending', 1))
+            self.assertIn('unreachable', email.last_error)
+            self.assertGreater(email.next_attempt_at, timezone.now())
+
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+            self.make_due()
+            self.assertEqual(dispatch_pending(), (2, 0))
+        self.assertEqual(len(mail.outbox), 2)
+
+
+# === Read replicas ===
+REPLICA = 'replica_test'
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Routing through a test mirror of `default`: the same database under
+    another connection, so replica reads see the committed fixtures.
+    """
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings[REPLICA] = {**connections['default'].settings_dict, 'TEST': {'MIRROR': 'default'}}
+        cls.addClassCleanup(cls.remove_replica)
+        cls.enterClassContext(mock.patch.object(replicas, 'REPLICAS', [REPLICA]))
+        cls.enterClassContext(mock.patch('empowerment_app.db_router.REPLICAS', [REPLICA]))
+        super().setUpClass()
+
+    @classmethod
+    def remove_replica(cls):
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.settings[REPLICA]
+
+    def setUp(self):
+        cache.clear()
+        replicas._health.clear()
+        officer = make_loan_officer()
+        self.application = make_application(make_business(make_applicant('borrower')), make_loan_type())
+        # A new client per test, so the middleware is built with REPLICAS set
+        self.client = api_client(officer.user)
+
+    def queries_on(self, alias, path):
+        with CaptureQueriesContext(connections[alias]) as ctx:
+            self.assertEqual(self.client.get(path).status_code, 200)
+        return [q['sql'] for q in ctx.captured_queries if 'empowerment_app_loanapplication' in q['sql']]
+
+    def test_reads_go_to_the_replica(self):
+        self.assertTrue(self.queries_on(REPLICA, '/api/loan-applications/'))
+        self.assertFalse(self.queries_on('default', '/api/loan-applications/'))
+
+    def test_write_pins_reads_to_the_primary(self):
+        response = self.client.post(f'/api/loan-applications/{self.application.pk}/approve/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+        self.assertTrue(self.queries_on('default', '/api/loan-applications/'))
+
+        # Without the cookie (another device) the per-user cache pin holds
+        self.client.cookies.clear()
+        self.assertTrue(self.queries_on('default', '/api/loan-applications/'))
+        self.assertFalse(self.queries_on(REPLICA, '/api/loan-applications/'))
+
+    def test_lagging_replica_is_skipped(self):
+        lag = replicas.MAX_LAG_SECONDS + 1
+        with mock.patch.object(replicas, 'LAG_SQL', f"SELECT {lag}"):
+            self.assertEqual(replicas.check_replica(REPLICA), (False, lag))
+            self.assertTrue(self.queries_on('default', '/api/loan-applications/'))
+            self.assertFalse(self.queries_on(REPLICA, '/api/loan-applications/'))
+
+    async def test_async_chain_stays_async(self):
+        seen = []
+
+        async def view(request):
+            seen.append(replicas.read_alias())
+            return HttpResponse()
+
+        middleware = replicas.ReplicaRoutingMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        factory = RequestFactory()
+        await middleware(factory.get('/api/events/'))
+        response = await middleware(factory.post('/api/events/'))
+        self.assertEqual(seen, [REPLICA, None])
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+
+
+# === Role claims ===
+class BearerTokenTests(SimpleTestCase):
+    def request(self, header=None):
+        return RequestFactory().get('/', **({'HTTP_AUTHORIZATION': header} if header else {}))
+
+    def test_bearer_token(self):
+        token = AccessToken()
+        token['user_id'] = 5
+        self.assertEqual(bearer_token(self.request(f"Bearer {token}"))['user_id'], 5)
+        # What the async views and the replica middleware both turn away
+        self.assertIsNone(bearer_token(self.request()))
+        self.assertIsNone(bearer_token(self.request(f"Token {token}")))
+        self.assertIsNone(bearer_token(self.request('Bearer not-a-token')))
+        self.assertIsNone(bearer_token(self.request(f"Bearer {AccessToken()}")))
+
+
+class RoleClaimTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_token_issued_before_a_role_change_is_re_resolved(self):
+        user = make_user('new_sheha')
+        client = api_client(user)
+        # Roles cached as this worker last saw them
+        self.assertEqual(resolve_roles(user)['role'], 'user')
+        self.assertEqual(client.get('/api/notifications/').data['count'], 0)
+
+        # Becoming a sheha bumps the version on the user row, not just in
+        # this process's cache
+        sheha = Sheha.objects.create(
+            user=user, name='Sheha', age=50, gender='Male', phone='+255700000001',
+            ward='Kikwajuni', email='sheha@example.com',
+        )
+        user.refresh_from_db()
+        self.assertEqual(user.roles_version, 1)
+        applicant = make_applicant('borrower', sheha=sheha)
+        Notification.objects.create(sheha=sheha, applicant=applicant, name=applicant.name, village=applicant.village)
+
+        # The old token's claims are stale, so its roles are looked up again
+        response = client.get('/api/notifications/')
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(resolve_roles(user)['role'], 'sheha')
+
+
+# === Benchmarks ===
+class ConnectionOverheadTests(TransactionTestCase):
+    databases = {'default', 'bankdb'}
+
+    def test_leaves_the_notifications_pending(self):
+        sheha = make_sheha(f"{benchmark.PREFIX}ward")
+        for i in range(2):
+            applicant = make_applicant(f"borrower_{i}", sheha=sheha)
+            make_business(applicant)
+            Notification.objects.create(sheha=sheha, applicant=applicant, name=applicant.name, village=applicant.village)
+
+        result = benchmark.connection_overhead(iterations=2, host='testserver')
+
+        self.assertEqual(set(result['modes']), {'reconnect', 'reuse'})
+        self.assertEqual(Notification.objects.filter(status='pending').count(), 2)
+        self.assertFalse(Applicant.objects.filter(is_verified=True).exists())
+        self.assertFalse(TransitionEvent.objects.exists())
+
+
+# === Filtering ===
+class FilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        loan_type = make_loan_type()
+        self.businesses = [make_business(make_applicant(f"applicant_{i}")) for i in range(2)]
+        make_application(self.businesses[0], loan_type, decision='approved')
+        make_application(self.businesses[1], loan_type)
+        make_repayment(self.businesses[0], Decimal('100000'), date(2026, 1, 5))
+        make_repayment(self.businesses[1], Decimal('100000'), date(2026, 3, 5))
+        self.client = api_client(make_user('admin', is_staff=True))
+
+    def test_loan_application_list_and_export_are_filtered(self):
+        response = self.client.get('/api/loan-applications/', {'decision': 'approved'})
+        self.assertEqual(response.data['count'], 1)
+        response = self.client.get('/api/loan-applications/export/', {'decision': 'approved'})
+        rows = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(rows), 2)
+
+    def test_repayment_list_is_filtered(self):
+        response = self.client.get('/api/repayments/', {'date_after': '2026-02-01'})
+        self.assertEqual(response.data['count'], 1)
+
+
+# === HTTP cache ===
+class ConditionalCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.loan_type = make_loan_type()
+        self.client = api_client(make_user('borrower'))
+
+    def names(self, response):
+        return [row['name'] for row in response.data['results']]
+
+    def test_conditional_request_is_not_modified(self):
+        etag = self.client.get('/api/loan-types/')['ETag']
+        response = self.client.get('/api/loan-types/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_repeat_request_is_served_from_the_cache(self):
+        first = self.client.get('/api/loan-types/')
+        # A queryset update sends no signal, so the version stays put
+        LoanType.objects.update(name='Renamed')
+        second = self.client.get('/api/loan-types/')
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(self.names(second), ['Small business'])
+
+    def test_committed_write_invalidates(self):
+        etag = self.client.get('/api/loan-types/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.loan_type.name = 'Renamed'
+            self.loan_type.save()
+        response = self.client.get('/api/loan-types/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.names(response), ['Renamed'])
+
+    def test_version_is_not_bumped_before_commit(self):
+        etag = self.client.get('/api/loan-types/')['ETag']
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.loan_type.name = 'Renamed'
+            self.loan_type.save()
+            # Until the commit, readers keep seeing the old version
+            self.assertEqual(self.client.get('/api/loan-types/')['ETag'], etag)
+        self.assertTrue(callbacks)
+
+
+# === Transition events ===
+class EventFeedTests(TestCase):
+    def setUp(self):
+        self.client = api_client(make_loan_officer().user)
+
+    def record(self, object_id, topic='applicant'):
+        with transaction.atomic():
+            return events.record(events.event(topic, object_id, 'bank_status', 'verified', 'pending'))[0]
+
+    def test_feed_follows_the_cursor(self):
+        self.record(1)
+        self.record(2, topic='loan_application')
+        self.record(3)
+
+        first = list(events.feed(limit=1))
+        self.assertEqual([e.object_id for e in first], [1])
+        rest = list(events.feed(events.cursor(first[0])))
+        self.assertEqual([e.object_id for e in rest], [2, 3])
+        self.assertEqual([e.object_id for e in events.feed(topics=['applicant'])], [1, 3])
+        self.assertEqual(list(events.feed(events.cursor(rest[-1]))), [])
+
+    def test_rolled_back_change_records_nothing(self):
+        with self.assertRaises(ZeroDivisionError), transaction.atomic():
+            events.record(events.event('applicant', 1, 'bank_status', 'verified', 'pending'))
+            1 / 0
+        self.assertEqual(list(events.feed()), [])
+
+    def test_endpoint_pages_with_next(self):
+        self.record(1)
+        self.record(2)
+        response = self.client.get('/api/events/', {'limit': 1})
+        self.assertEqual([e['object_id'] for e in response.json()['results']], [1])
+        response = self.client.get('/api/events/', {'since': response.json()['next']})
+        self.assertEqual([e['object_id'] for e in response.json()['results']], [2])
+
+    def test_long_poll_returns_an_event_that_arrives_while_waiting(self):
+        async def sleep(seconds):
+            await sync_to_async(self.record)(7)
+
+        since = events.cursor(self.record(1))
+        with mock.patch.object(async_views, 'asyncio', SimpleNamespace(sleep=sleep)):
+            response = self.client.get('/api/events/', {'since': since, 'wait': 5})
+        body = response.json()
+        self.assertEqual([e['object_id'] for e in body['results']], [7])
+        self.assertNotEqual(body['next'], since)
+
+    @mock.patch.object(async_views, 'EVENTS_POLL_INTERVAL', 0.05)
+    def test_long_poll_gives_up_after_the_wait(self):
+        response = self.client.get('/api/events/', {'since': '0', 'wait': 1})
+        self.assertEqual(response.json(), {'next': '0', 'results': []})
+
+    def test_bad_cursor_and_other_roles(self):
+        self.assertEqual(self.client.get('/api/events/', {'since': 'x'}).status_code, 400)
+        self.assertEqual(api_client(make_user('borrower')).get('/api/events/').status_code, 403)
+
+
+class EventVisibilityTests(TransactionTestCase):
+    def test_event_waits_for_an_older_open_transaction(self):
+        # A writer that took its transaction id first but has not committed
+        other = connections.create_connection('default')
+        try:
+            other.set_autocommit(False)
+            with other.cursor() as cursor:
+                cursor.execute(
+                    "INSERT INTO empowerment_app_transitionevent"
+                    " (topic, object_id, kind, old_value, new_value, data, created_at)"
+                    " VALUES ('applicant', 1, 'bank_status', 'pending', 'verified', '{}', now())"
+                )
+            events.record(events.event('applicant', 2, 'bank_status', 'verified', 'pending'))
+
+            # Showing event 2 now would move the cursor past event 1 for good
+            self.assertEqual(list(events.feed()), [])
+            other.commit()
+            self.assertEqual([e.object_id for e in events.feed()], [1, 2])
+        finally:
+            other.close()
+
+
+# === Request profiling ===
+class ProfilingTests(SimpleTestCase):
+    def sample(self, total_ms, sql_count=0, size=0):
+        return (total_ms, sql_count, 1.5, 2.0, 0.5, size)
+
+    def test_route_stats(self):
+        stats = profiling.RouteStats()
+        for total_ms in (3, 30, 20000):
+            stats.add(self.sample(total_ms, sql_count=2))
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(stats.sums['sql_count'], 6)
+        # Cumulative buckets, as Prometheus expects; 20s is only in +Inf
+        self.assertEqual(dict(zip(profiling.BUCKETS_MS, stats.buckets)), {
+            5: 1, 10: 1, 25: 1, 50: 2, 100: 2, 250: 2, 500: 2, 1000: 2, 2500: 2, 5000: 2, 10000: 2,
+        })
+
+    def test_summary(self):
+        registry = profiling.PerfRegistry()
+        for total_ms in (10, 20, 30):
+            registry.record('GET', '/api/loans/', self.sample(total_ms, size=100))
+        registry.record('POST', '/api/loans/', self.sample(5))
+
+        [get, post] = sorted(registry.summary(), key=lambda r: r['method'])
+        self.assertEqual((get['count'], get['recent']), (3, 3))
+        self.assertEqual(get['mean']['total_ms'], 20)
+        self.assertEqual(get['p50']['total_ms'], 20)
+        self.assertEqual(get['mean']['bytes'], 100)
+        self.assertEqual(get['histogram_ms']['+Inf'], 3)
+        self.assertEqual(post['count'], 1)
+
+        registry.reset()
+        self.assertEqual(registry.summary(), [])
+
+    def test_prometheus(self):
+        registry = profiling.PerfRegistry()
+        registry.record('GET', '/api/"odd"/', self.sample(7, sql_count=4))
+        text = registry.prometheus()
+        labels = 'method="GET",route="/api/\\"odd\\"/"'
+        self.assertIn(f'empowerment_request_duration_seconds_bucket{{{labels},le="0.005"}} 0', text)
+        self.assertIn(f'empowerment_request_duration_seconds_bucket{{{labels},le="0.01"}} 1', text)
+        self.assertIn(f'empowerment_request_duration_seconds_count{{{labels}}} 1', text)
+        self.assertIn(f'empowerment_sql_queries_total{{{labels}}} 4.0', text)
+        self.assertTrue(text.endswith('\n'))
+
+    @override_settings(PERF_PROFILING=True)
+    def test_middleware_records_sync_requests(self):
+        profiling.registry.reset()
+        middleware = profiling.ProfilingMiddleware(lambda request: HttpResponse(b'abc'))
+        self.assertFalse(iscoroutinefunction(middleware))
+        middleware(RequestFactory().get('/'))
+        [route] = profiling.registry.summary()
+        self.assertEqual(route['mean']['bytes'], 3)
+
+    @override_settings(PERF_PROFILING=True)
+    async def test_middleware_stays_async(self):
+        async def view(request):
+            return HttpResponse(b'abcd')
+
+        profiling.registry.reset()
+        middleware = profiling.ProfilingMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        await middleware(RequestFactory().get('/'))
+        [route] = profiling.registry.summary()
+        self.assertEqual(route['mean']['bytes'], 4)
+
+
+# === Admin dashboard counters ===
+class AdminStatsTests(TestCase):
+    def setUp(self):
+        self.loan_type = make_loan_type()
+        self.applicant = make_applicant('borrower')
+        self.business = make_business(self.applicant)
+
+    def counts(self, dimension):
+        return {
+            (s.key, s.decision): s.count
+            for s in LoanApplicationStat.objects.filter(dimension=dimension) if s.count
+        }
+
+    def all_counts(self):
+        return {(s.dimension, s.key, s.decision): s.count for s in LoanApplicationStat.objects.all() if s.count}
+
+    def test_create(self):
+        application = make_application(self.business, self.loan_type)
+        month = application.created_at.strftime('%Y-%m')
+        self.assertEqual(self.counts('total'), {('', 'pending'): 1})
+        self.assertEqual(self.counts('loan_type'), {(str(self.loan_type.pk), 'pending'): 1})
+        self.assertEqual(self.counts('region'), {('Mjini Magharibi', 'pending'): 1})
+        self.assertEqual(self.counts('ward'), {('Kikwajuni', 'pending'): 1})
+        self.assertEqual(self.counts('month'), {(month, 'pending'): 1})
+
+    def test_decision_change(self):
+        application = make_application(self.business, self.loan_type)
+        application.decision = 'approved'
+        application.save()
+        self.assertEqual(self.counts('total'), {('', 'approved'): 1})
+        self.assertEqual(self.counts('ward'), {('Kikwajuni', 'approved'): 1})
+
+    def test_decision_change_after_the_applicant_moved(self):
+        application = make_application(self.business, self.loan_type)
+        Applicant.objects.filter(pk=self.applicant.pk).update(ward='Malindi')
+        application = LoanApplication.objects.get(pk=application.pk)
+        application.decision = 'rejected'
+        application.save()
+        # Moved within the bucket it was counted under; Malindi never had it
+        self.assertEqual(self.counts('ward'), {('Kikwajuni', 'rejected'): 1})
+
+    def test_delete(self):
+        application = make_application(self.business, self.loan_type)
+        application.delete()
+        self.assertEqual(self.all_counts(), {})
+
+    def test_bump_is_one_statement(self):
+        keys = admin_stats.stat_keys(make_application(self.business, self.loan_type))
+        with self.assertNumQueries(1):
+            admin_stats.bump(keys, ('pending', -1), ('approved', 1))
+        self.assertEqual(self.counts('total'), {('', 'approved'): 1})
+
+    def test_rebuild_matches_the_live_counters(self):
+        make_application(self.business, self.loan_type)
+        other = make_business(make_applicant('other', ward='Malindi'))
+        make_application(other, self.loan_type, decision='approved').delete()
+        make_application(other, None, decision='rejected')
+        # bulk_create sends no signals, so only the rebuild counts this one
+        [uncounted] = LoanApplication.objects.bulk_create([LoanApplication(
+            applicant=other.applicant, business=other, loan_type=self.loan_type,
+            amount_requested=Decimal('1000'), purpose='Stock', repayment_period=6,
+        )])
+        expected = self.all_counts()
+        for dimension, key in admin_stats.stat_keys(uncounted):
+            expected[(dimension, key, 'pending')] = expected.get((dimension, key, 'pending'), 0) + 1
+
+        admin_stats.rebuild_admin_stats()
+
+        self.assertEqual(self.all_counts(), expected)
+        self.assertFalse(LoanApplication.objects.filter(counted_under=[]).exists())
+
+
+# === Bulk sheha actions ===
+class BulkVerifyTests(TestCase):
+    databases = {'default', 'bankdb'}
+
+    def setUp(self):
+        cache.clear()
+        self.sheha = make_sheha()
+        other_sheha = make_sheha('Malindi')
+        self.notifications = [self.notify(self.sheha, f"borrower_{i}") for i in range(2)]
+        self.elsewhere = self.notify(other_sheha, 'borrower_elsewhere')
+        self.client = api_client(self.sheha.user)
+
+    def notify(self, sheha, username):
+        applicant = make_applicant(username, sheha=sheha)
+        make_business(applicant)
+        return Notification.objects.create(sheha=sheha, applicant=applicant, name=applicant.name, village=applicant.village)
+
+    def bulk_verify(self, ids):
+        return self.client.post('/api/notifications/bulk-verify/', {'ids': ids}, format='json')
+
+    @mock.patch('empowerment_app.views.notify_user')
+    def test_results_per_id(self, notify_user):
+        mine = [n.pk for n in self.notifications]
+        response = self.bulk_verify([*mine, self.elsewhere.pk, 999999])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['verified'], 2)
+        self.assertEqual(response.data['results'], [
+            {'id': mine[0], 'status': 'verified', 'bank_status': 'verified'},
+            {'id': mine[1], 'status': 'verified', 'bank_status': 'verified'},
+            # Another sheha's notification is out of scope, as is a missing id
+            {'id': self.elsewhere.pk, 'status': 'not_found'},
+            {'id': 999999, 'status': 'not_found'},
+        ])
+        self.assertEqual(Notification.objects.get(pk=self.elsewhere.pk).status, 'pending')
+        self.assertEqual(TransitionEvent.objects.filter(kind='sheha_verified').count(), 2)
+        # One realtime push per verified applicant
+        self.assertEqual(
+            sorted(call.args[0] for call in notify_user.call_args_list),
+            sorted(n.applicant.user_id for n in self.notifications),
+        )
+
+    def test_already_handled_ids_are_not_found(self):
+        self.bulk_verify([self.notifications[0].pk])
+        response = self.bulk_verify([self.notifications[0].pk])
+        self.assertEqual(response.data['verified'], 0)
+        self.assertEqual(response.data['results'], [{'id': self.notifications[0].pk, 'status': 'not_found'}])
+
+    def test_id_limit(self):
+        self.assertEqual(self.bulk_verify(list(range(1, 502))).status_code, 400)
+        self.assertEqual(self.bulk_verify([]).status_code, 400)
+        self.assertEqual(self.bulk_verify(list(range(1, 501))).status_code, 200)
+
+    def test_bulk_reject_is_scoped_to_the_sheha(self):
+        response = self.client.post('/api/notifications/bulk-reject/', {
+            'ids': [self.notifications[0].pk, self.elsewhere.pk], 'reason': 'Not resident',
+        }, format='json')
+        self.assertEqual(response.data['rejected'], 1)
+        self.assertEqual(Notification.objects.get(pk=self.elsewhere.pk).status, 'pending')
+        self.assertEqual(Notification.objects.get(pk=self.notifications[0].pk).status, 'rejected')
+
+
+# === Passport photos ===
+def make_jpeg(size=(40, 20), color='red', orientation=None):
+    image = Image.new('RGB', size, color)
+    exif = Image.Exif()
+    exif[0x010F] = 'PhoneMaker'
+    if orientation:
+        exif[0x0112] = orientation
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+class MediaRootMixin:
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media.name))
+        self.media_root = media.name
+
+
+class NormaliseTests(MediaRootMixin, SimpleTestCase):
+    def test_strips_exif_after_applying_orientation(self):
+        # Orientation 6: stored landscape, shown rotated 90 degrees
+        photo = images.normalise(BytesIO(make_jpeg(orientation=6)))
+        with Image.open(photo) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (20, 40))
+            self.assertEqual(dict(image.getexif()), {})
+            self.assertNotIn('exif', image.info)
+
+    def test_named_by_content_hash(self):
+        photo = images.normalise(BytesIO(make_jpeg()))
+        photo.seek(0)
+        self.assertEqual(photo.name, f"{hashlib.sha256(photo.read()).hexdigest()}.jpg")
+        self.assertTrue(images.is_normalised(images.passport_upload_to(None, photo.name)))
+        self.assertEqual(images.normalise(BytesIO(make_jpeg())).name, photo.name)
+
+    def test_large_photos_are_downscaled(self):
+        photo = images.normalise(BytesIO(make_jpeg(size=(images.MAX_DIMENSION * 2, images.MAX_DIMENSION))))
+        with Image.open(photo) as image:
+            self.assertEqual(image.size, (images.MAX_DIMENSION, images.MAX_DIMENSION // 2))
+
+    def test_duplicates_are_stored_once(self):
+        photo = images.normalise(BytesIO(make_jpeg()))
+        name = images.passport_upload_to(None, photo.name)
+        self.assertEqual(images.passport_storage.save(name, photo), name)
+        self.assertEqual(images.passport_storage.save(name, images.normalise(BytesIO(make_jpeg()))), name)
+        self.assertEqual(os.listdir(os.path.dirname(images.passport_storage.path(name))), [os.path.basename(name)])
+
+
+@mock.patch('empowerment_app.signals.schedule_thumbnails')
+class PassportUploadTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.applicant = make_applicant('photographed')
+
+    def upload(self, applicant, **kwargs):
+        applicant.passport_size = SimpleUploadedFile('me.jpg', make_jpeg(**kwargs), content_type='image/jpeg')
+        with self.captureOnCommitCallbacks(execute=True):
+            applicant.save()
+
+    def test_upload_is_normalised_and_queued(self, schedule):
+        self.upload(self.applicant)
+        self.assertTrue(images.is_normalised(self.applicant.passport_size.name))
+        self.assertFalse(self.applicant.passport_thumbnails_ready)
+        schedule.assert_called_once_with(self.applicant.pk)
+
+    def test_same_photo_is_stored_once(self, schedule):
+        other = make_applicant('lookalike')
+        self.upload(self.applicant)
+        self.upload(other)
+        self.assertEqual(other.passport_size.name, self.applicant.passport_size.name)
+        self.assertEqual(len(os.listdir(os.path.dirname(self.applicant.passport_size.path))), 1)
+
+    def test_saves_that_keep_the_photo_queue_nothing(self, schedule):
+        self.upload(self.applicant)
+        schedule.reset_mock()
+
+        # A legacy row whose thumbnails were never built
+        applicant = Applicant.objects.get(pk=self.applicant.pk)
+        applicant.phone = '+255700000009'
+        with self.captureOnCommitCallbacks(execute=True):
+            applicant.save()
+            applicant.save(update_fields=['phone'])
+            Applicant.objects.only('id', 'phone').get(pk=applicant.pk).save()
+        schedule.assert_not_called()
+
+        self.upload(applicant, color='blue')
+        schedule.assert_called_once_with(applicant.pk)
+
+
+class BuildThumbnailsTests(MediaRootMixin, TestCase):
+    @mock.patch('empowerment_app.signals.schedule_thumbnails')
+    def setUp(self, schedule):
+        super().setUp()
+        self.applicant = make_applicant('photographed')
+        self.applicant.passport_size = SimpleUploadedFile('me.jpg', make_jpeg(size=(600, 400)), content_type='image/jpeg')
+        self.applicant.save()
+
+    def test_builds_every_size_and_flags_ready(self):
+        self.assertTrue(images.build_applicant_thumbnails(self.applicant.pk))
+
+        photo = self.applicant.passport_size
+        for size in images.THUMBNAIL_SIZES:
+            with photo.storage.open(images.thumbnail_name(photo.name, size)) as thumbnail, Image.open(thumbnail) as image:
+                self.assertEqual(image.size, (size, size))
+        self.applicant.refresh_from_db()
+        self.assertTrue(self.applicant.passport_thumbnails_ready)
+        self.assertEqual(set(images.thumbnail_urls(self.applicant.passport_size, True)), {str(s) for s in images.THUMBNAIL_SIZES})
+
+    def test_photo_replaced_while_building_stays_pending(self):
+        built_from = self.applicant.passport_size.name
+        with mock.patch.object(images, 'build_thumbnails', side_effect=lambda photo: Applicant.objects.filter(
+            pk=self.applicant.pk,
+        ).update(passport_size='passport_photos/ab/replaced.jpg')):
+            self.assertTrue(images.build_applicant_thumbnails(self.applicant.pk))
+        self.applicant.refresh_from_db()
+        self.assertNotEqual(self.applicant.passport_size.name, built_from)
+        self.assertFalse(self.applicant.passport_thumbnails_ready)
+
+    def test_nothing_to_build(self):
+        self.assertFalse(images.build_applicant_thumbnails(make_applicant('no_photo').pk))
+        self.assertFalse(images.build_applicant_thumbnails(0))
+
+
+# === Websockets ===
+class Socket(ApplicationCommunicator):
+    """
+    ws/notifications/ through the full ASGI stack. channels.testing's
+    WebsocketCommunicator would do the same but pulls in daphne.
+    """
+
+    def __init__(self, token):
+        from women_youth_empowerment.asgi import application
+
+        super().__init__(application, {
+            'type': 'websocket', 'path': '/ws/notifications/', 'query_string': f"token={token}".encode(),
+            'headers': [], 'subprotocols': [],
+        })
+
+    async def connect(self):
+        await self.send_input({'type': 'websocket.connect'})
+        return (await self.receive_output(1))['type'] == 'websocket.accept'
+
+    async def receive_json(self):
+        return json.loads((await self.receive_output(1))['text'])
+
+    async def disconnect(self):
+        await self.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await self.wait(1)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class NotificationSocketTests(TransactionTestCase):
+    # database_sync_to_async closes old connections, which a TestCase
+    # transaction does not survive
+
+    async def connect(self, user):
+        socket = Socket(RoleRefreshToken.for_user(user).access_token)
+        connected = await socket.connect()
+        if connected:
+            self.addAsyncCleanup(socket.disconnect)
+        return socket, connected
+
+    def register(self, ward):
+        client = api_client(make_user('newcomer'))
+        return client.post('/api/applicants/', {
+            'name': 'Newcomer', 'age': 25, 'gender': 'Female', 'marital_status': 'Single',
+            'region': 'Mjini Magharibi', 'district': 'Mjini', 'ward': ward, 'village': 'Mwembeladu',
+            'phone': '+255700000004',
+        })
+
+    async def test_new_applicant_reaches_only_their_wards_sheha(self):
+        here, there = await sync_to_async(make_sheha)('Kikwajuni'), await sync_to_async(make_sheha)('Malindi')
+        here_socket, connected = await self.connect(await sync_to_async(lambda: here.user)())
+        self.assertTrue(connected)
+        there_socket, connected = await self.connect(await sync_to_async(lambda: there.user)())
+        self.assertTrue(connected)
+
+        response = await sync_to_async(self.register)('Kikwajuni')
+        self.assertEqual(response.status_code, 201)
+
+        message = await here_socket.receive_json()
+        self.assertEqual(message['event'], 'new_applicant')
+        self.assertEqual(message['applicant_id'], response.data['id'])
+        self.assertTrue(await there_socket.receive_nothing())
+
+    async def test_inactive_user_is_refused(self):
+        user = await sync_to_async(make_user)('deactivated', is_active=False)
+        _, connected = await self.connect(user)
+        self.assertFalse(connected)
+
+    async def test_invalid_token_is_refused(self):
+        self.assertFalse(await Socket('garbage').connect())
+
+
+# === Loan scoring ===
+def score(rules=None, **columns):
+    inputs = {
+        'sales': 1000, 'expenses': 500, 'amount': 1000, 'period': 6, 'annual_income': 10000, 'type_max': 5000,
+    }
+    inputs.update(columns)
+    scores, comments = scoring.compute_scores(**{k: np.array([v], dtype=float) for k, v in inputs.items()}, rules=rules)
+    return int(scores[0]), comments[0]
+
+
+class ComputeScoresTests(SimpleTestCase):
+    def test_every_feature_at_good(self):
+        self.assertEqual(score(), (100, "Score 100/100. No risk flags."))
+
+    def test_missing_inputs_earn_nothing(self):
+        # Without sales neither the margin nor the installment cover is known
+        self.assertEqual(score(sales=np.nan), (
+            40, "Score 40/100. Low profit margin; Monthly profit barely covers the installment.",
+        ))
+        self.assertEqual(score(type_max=np.nan)[0], 90)
+
+    def test_division_by_zero_earns_nothing(self):
+        with np.errstate(all='raise'):
+            # Only the loan type ratio and the period still count
+            self.assertEqual(score(sales=0, annual_income=0)[0], 20)
+
+    def test_weights_are_normalised_to_100(self):
+        doubled = {name: (weight * 2, bad, good) for name, (weight, bad, good) in scoring.DEFAULT_RULES.items()}
+        for columns in [{}, {'sales': 700}, {'period': 24}, {'amount': 4000}]:
+            with self.subTest(**columns):
+                self.assertEqual(score(doubled, **columns), score(scoring.DEFAULT_RULES, **columns))
+        self.assertEqual(score({'repayment_period': (3, 36, 6)}, period=6)[0], 100)
+
+    def test_comment_threshold(self):
+        rules = {'repayment_period': (1, 36, 6)}
+        # (21 - 36) / (6 - 36) is exactly COMMENT_THRESHOLD
+        self.assertEqual(score(rules, period=21), (50, "Score 50/100. No risk flags."))
+        self.assertEqual(score(rules, period=22), (47, "Score 47/100. Long repayment period."))
+
+    def test_settings_override_the_default_rules(self):
+        with self.settings(LOAN_SCORING_RULES={'repayment_period': (1, 36, 6)}):
+            self.assertEqual(score(sales=np.nan)[0], 100)
+        self.assertEqual(scoring.get_rules(), scoring.DEFAULT_RULES)
+
+
+class RescoreTests(TestCase):
+    def setUp(self):
+        business = make_business(make_applicant('borrower'))
+        loan_type = make_loan_type()
+        self.pending = [make_application(business, loan_type) for _ in range(3)]
+        self.decided = make_application(
+            business, loan_type, decision='approved', system_comment='Approved by the committee', repayment_period=36,
+        )
+        LoanApplication.objects.update(score=0, system_comment='stale')
+        LoanApplication.objects.filter(pk=self.decided.pk).update(system_comment='Approved by the committee')
+
+    def test_rescores_in_chunks(self):
+        progress = []
+        self.assertEqual(scoring.rescore(chunk_size=3, on_chunk=progress.append), 4)
+        self.assertEqual(progress, [3, 4])
+
+        for application in LoanApplication.objects.filter(pk__in=[a.pk for a in self.pending]):
+            self.assertEqual((application.score, application.system_comment), (96, "Score 96/100. No risk flags."))
+        # A decided application keeps the comment it was decided with
+        self.decided.refresh_from_db()
+        self.assertEqual((self.decided.score, self.decided.system_comment), (88, 'Approved by the committee'))
+
+    def test_queryset_limits_what_is_rescored(self):
+        self.assertEqual(scoring.rescore(LoanApplication.objects.filter(decision='pending')), 3)
+        self.decided.refresh_from_db()
+        self.assertEqual(self.decided.score, 0)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('rescore_loan_applications', '--pending-only', '--chunk-size', '2', stdout=out)
+        self.assertIn('Rescored 3 applications', out.getvalue())
+        self.assertEqual(set(LoanApplication.objects.filter(decision='pending').values_list('score', flat=True)), {96})
+
+
+# === Bank verification ===
+class VerifyApplicantsTests(TestCase):
+    databases = {'default', 'bankdb'}
+
+    def setUp(self):
+        self.clean = make_applicant('clean')
+        make_business(self.clean)
+        self.no_business = make_applicant('no_business')
+        # Rejected if any one of their accounts has an active loan
+        self.indebted = make_applicant('indebted')
+        make_business(self.indebted)
+        make_business(self.indebted, bank_no='ACC-LOAN')
+        MockBankLoan.objects.using('bankdb').create(bank_no='ACC-LOAN', applicant_name='indebted', has_active_loan=True)
+        self.paid_off = make_applicant('paid_off')
+        business = make_business(self.paid_off)
+        MockBankLoan.objects.using('bankdb').create(bank_no=business.bank_no, applicant_name='paid_off')
+        self.applicants = [self.clean, self.no_business, self.indebted, self.paid_off]
+
+    def test_statuses(self):
+        expected = {
+            self.clean.pk: 'verified', self.no_business.pk: 'no business found',
+            self.indebted.pk: 'rejected', self.paid_off.pk: 'verified',
+        }
+        self.assertEqual(verify_applicants(self.applicants), expected)
+
+        stored = dict(Applicant.objects.values_list('pk', 'bank_status'))
+        self.assertEqual(stored, expected)
+        self.assertEqual(
+            set(Applicant.objects.filter(is_verified_by_bank=True).values_list('pk', flat=True)),
+            {self.clean.pk, self.paid_off.pk},
+        )
+        self.assertEqual(TransitionEvent.objects.filter(kind='bank_status').count(), 4)
+
+        # Unchanged statuses log nothing the second time
+        verify_applicants(Applicant.objects.all())
+        self.assertEqual(TransitionEvent.objects.filter(kind='bank_status').count(), 4)
+
+    def test_one_business_and_one_bank_query_per_chunk(self):
+        with CaptureQueriesContext(connections['default']) as default, \
+                CaptureQueriesContext(connections['bankdb']) as bankdb:
+            verify_applicants(self.applicants, chunk_size=2)
+
+        self.assertEqual(len(bankdb.captured_queries), 2)
+        business_reads = [q for q in default.captured_queries if q['sql'].startswith('SELECT') and 'empowerment_app_business' in q['sql']]
+        self.assertEqual(len(business_reads), 2)
+
+    def test_chunk_without_businesses_skips_the_bank(self):
+        with CaptureQueriesContext(connections['bankdb']) as bankdb:
+            self.assertEqual(verify_applicants([self.no_business]), {self.no_business.pk: 'no business found'})
+        self.assertEqual(len(bankdb.captured_queries), 0)
+
+    def test_reverify_command(self):
+        Applicant.objects.exclude(pk=self.paid_off.pk).update(is_verified_by_sheha=True)
+        out = StringIO()
+        call_command('reverify_bank_status', '--chunk-size', '2', stdout=out)
+
+        self.assertEqual(out.getvalue().count('Verified up to applicant'), 2)
+        self.assertIn('Bank re-verification done (no business found: 1, rejected: 1, verified: 1).', out.getvalue())
+        # Only sheha-verified applicants are re-checked
+        self.assertEqual(Applicant.objects.get(pk=self.paid_off.pk).bank_status, 'pending')
+        self.assertEqual(Applicant.objects.get(pk=self.indebted.pk).bank_status, 'rejected')
+
+    def test_reverify_command_with_nothing_to_do(self):
+        out = StringIO()
+        call_command('reverify_bank_status', stdout=out)
+        self.assertIn('nothing to do', out.getvalue())
+
+
+# === Pagination ===
+class PaginationTests(TestCase):
+    def setUp(self):
+        self.applicants = [make_applicant(f"applicant_{i}") for i in range(5)]
+        self.staff = api_client(make_user('staff', is_staff=True))
+        self.clerk = api_client(make_user('clerk'))
+
+    def test_cursor_mode_walks_every_row_once(self):
+        url, seen = '/api/applicants/?pagination=cursor&page_size=2', []
+        while url:
+            data, estimated, counted = self.list_queries(self.clerk, url)
+            self.assertEqual((estimated, counted), (False, False))
+            self.assertNotIn('count', data)
+            seen += [row['id'] for row in data['results']]
+            url = data['next']
+        self.assertEqual(seen, sorted((a.pk for a in self.applicants), reverse=True))
+
+    def test_a_cursor_implies_cursor_mode(self):
+        first = self.clerk.get('/api/applicants/?pagination=cursor&page_size=2').data
+        cursor = first['next'].split('cursor=')[1].split('&')[0]
+        page = self.clerk.get(f'/api/applicants/?cursor={cursor}&page_size=2').data
+        self.assertEqual([row['id'] for row in page['results']], [a.pk for a in self.applicants[2:0:-1]])
+        self.assertIsNotNone(page['previous'])
+
+    def test_page_size_is_capped(self):
+        with mock.patch.object(StandardPagination, 'max_page_size', 3), \
+                mock.patch.object(KeysetPagination, 'max_page_size', 3):
+            self.assertEqual(len(self.clerk.get('/api/applicants/?page_size=1000').data['results']), 3)
+            self.assertEqual(len(self.staff.get('/api/applicants/?page_size=1000').data['results']), 3)
+            self.assertEqual(len(self.clerk.get('/api/applicants/?pagination=cursor&page_size=1000').data['results']), 3)
+
+    def list_queries(self, client, url):
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        sql = ' '.join(q['sql'] for q in queries.captured_queries)
+        return response.data, 'reltuples' in sql, 'COUNT(*)' in sql
+
+    @mock.patch('empowerment_app.pagination.ESTIMATE_THRESHOLD', 1)
+    def test_staff_get_an_estimate_on_unfiltered_lists_only(self):
+        with connections['default'].cursor() as cursor:
+            cursor.execute('ANALYZE empowerment_app_applicant')
+
+        data, estimated, counted = self.list_queries(self.staff, '/api/applicants/')
+        self.assertEqual((estimated, counted), (True, False))
+        self.assertEqual(data['count'], 5)
+
+        # Filtered lists and other users count exactly
+        data, estimated, counted = self.list_queries(self.staff, '/api/applicants/?name=applicant_1')
+        self.assertEqual((estimated, counted, data['count']), (False, True, 1))
+        data, estimated, counted = self.list_queries(self.clerk, '/api/applicants/')
+        self.assertEqual((estimated, counted, data['count']), (False, True, 5))
+
+    def test_small_tables_are_counted(self):
+        data, estimated, counted = self.list_queries(self.staff, '/api/applicants/')
+        self.assertEqual((estimated, counted, data['count']), (True, True, 5))
+
+    def test_estimate_only_applies_to_querysets(self):
+        self.assertEqual(EstimatedCountPaginator(list(range(7)), 2).count, 7)
+
+
+# === Search ===
+class SearchTests(TestCase):
+    def setUp(self):
+        self.sheha = make_sheha()
+        self.other_sheha = make_sheha('Malindi')
+        self.asha = make_applicant('asha', sheha=self.sheha, name='Asha Juma')
+        self.ashaki = make_applicant('ashaki', sheha=self.sheha, name='Ashaki')
+        self.ashaki_long = make_applicant('ashaki_long', sheha=self.sheha, name='Ashaki Mwanahawa')
+        make_applicant('zuhura', sheha=self.sheha, name='Zuhura')
+        self.elsewhere = make_applicant('asha_elsewhere', sheha=self.other_sheha, name='Asha Said')
+        for applicant in [self.asha, self.elsewhere]:
+            make_business(applicant)
+
+    def search(self, user, q, **params):
+        return api_client(user).get('/api/search/', {'q': q, **params})
+
+    def test_full_text_matches_rank_above_partial_ones(self):
+        response = self.search(make_loan_officer().user, 'asha')
+        self.assertEqual(response.status_code, 200)
+        # Whole-word matches first, then substring matches by similarity
+        self.assertEqual(
+            [row['id'] for row in response.data['applicants']],
+            [self.asha.pk, self.elsewhere.pk, self.ashaki.pk, self.ashaki_long.pk],
+        )
+        ranks = [row['rank'] for row in response.data['applicants']]
+        self.assertLess(max(ranks[2:]), min(ranks[:2]))
+
+    def test_businesses_match_on_bank_number(self):
+        bank_no = Business.objects.get(applicant=self.asha).bank_no
+        response = self.search(make_user('admin', is_staff=True), bank_no)
+        self.assertEqual([row['bank_no'] for row in response.data['businesses']], [bank_no])
+
+    def test_sheha_only_sees_their_ward(self):
+        response = self.search(self.sheha.user, 'asha')
+        ids = [row['id'] for row in response.data['applicants']]
+        self.assertEqual(ids, [self.asha.pk, self.ashaki.pk, self.ashaki_long.pk])
+        self.assertEqual([row['applicant_id'] for row in response.data['businesses']], [self.asha.pk])
+
+        response = self.search(self.other_sheha.user, 'asha')
+        self.assertEqual([row['id'] for row in response.data['applicants']], [self.elsewhere.pk])
+
+    def test_limit_and_validation(self):
+        officer = make_loan_officer().user
+        self.assertEqual(len(self.search(officer, 'asha', limit=1).data['applicants']), 1)
+        self.assertEqual(self.search(officer, 'a').status_code, 400)
+        # Applicants cannot search other applicants
+        self.assertEqual(self.search(self.asha.user, 'asha').status_code, 403)
+
+
+# === Business map (PostGIS) ===
+def tile_of(lng, lat, z):
+    """Web Mercator x/y of the z-level tile containing the point."""
+    n = 2 ** z
+    lat_rad = math.radians(lat)
+    return int((lng + 180) / 360 * n), int((1 - math.asinh(math.tan(lat_rad)) / math.pi) / 2 * n)
+
+
+class BusinessMapTests(TestCase):
+    ZANZIBAR_BBOX = '39.1,-6.3,39.4,-6.0'
+
+    def setUp(self):
+        self.sheha = make_sheha()
+        self.other_sheha = make_sheha('Malindi')
+        # Three shops a few hundred metres apart in Stone Town, one in Mombasa
+        self.market = self.place('market', self.sheha, 39.190, -6.160)
+        self.harbour = self.place('harbour', self.sheha, 39.192, -6.162)
+        self.fort = self.place('fort', self.other_sheha, 39.195, -6.161)
+        self.mombasa = self.place('mombasa', self.sheha, 39.66, -4.04)
+        self.officer = api_client(make_loan_officer().user)
+
+    def place(self, username, sheha, lng, lat):
+        business = make_business(make_applicant(username, sheha=sheha))
+        business.location = Point(lng, lat, srid=4326)
+        business.save(update_fields=['location'])
+        return business
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return sorted(f['properties']['id'] for f in response.data['features'])
+
+    def test_bbox(self):
+        response = self.officer.get('/api/map/businesses/bbox/', {'bbox': self.ZANZIBAR_BBOX, 'zoom': 14})
+        self.assertEqual(self.ids(response), sorted([self.market.pk, self.harbour.pk, self.fort.pk]))
+        market = next(f for f in response.data['features'] if f['properties']['id'] == self.market.pk)
+        lng, lat = market['geometry']['coordinates']
+        self.assertAlmostEqual(lng, 39.190)
+        self.assertAlmostEqual(lat, -6.160)
+
+    def test_bbox_is_scoped_to_the_sheha(self):
+        response = api_client(self.sheha.user).get('/api/map/businesses/bbox/', {'bbox': self.ZANZIBAR_BBOX})
+        self.assertEqual(self.ids(response), sorted([self.market.pk, self.harbour.pk]))
+
+    def test_bad_bbox(self):
+        for bbox in ['39.1,-6.3,39.4', '39.4,-6.3,39.1,-6.0', 'a,b,c,d', '']:
+            with self.subTest(bbox=bbox):
+                self.assertEqual(self.officer.get('/api/map/businesses/bbox/', {'bbox': bbox}).status_code, 400)
+
+    def test_clusters_below_the_cluster_zoom(self):
+        response = self.officer.get('/api/map/businesses/bbox/', {'bbox': '38,-8,41,-3', 'zoom': 5})
+        self.assertEqual(response.status_code, 200)
+        # Stone Town falls in one grid cell, Mombasa in another
+        counts = sorted(f['properties']['count'] for f in response.data['features'])
+        self.assertEqual(counts, [1, 3])
+
+    def test_nearby_within_radius_nearest_first(self):
+        response = self.officer.get('/api/map/businesses/nearby/', {'lat': -6.160, 'lng': 39.190, 'radius': 400})
+        features = response.data['features']
+        self.assertEqual([f['properties']['id'] for f in features], [self.market.pk, self.harbour.pk])
+        distances = [f['properties']['distance'] for f in features]
+        self.assertAlmostEqual(distances[0], 0, places=3)
+        # About 313 m on the spheroid
+        self.assertTrue(300 < distances[1] < 330, distances[1])
+
+        response = api_client(self.other_sheha.user).get(
+            '/api/map/businesses/nearby/', {'lat': -6.160, 'lng': 39.190, 'radius': 1000},
+        )
+        self.assertEqual(self.ids(response), [self.fort.pk])
+        self.assertEqual(self.officer.get('/api/map/businesses/nearby/', {'lat': -6.16}).status_code, 400)
+
+    def test_vector_tiles(self):
+        z = 12
+        x, y = tile_of(39.19, -6.16, z)
+        response = self.officer.get(f'/api/map/businesses/tiles/{z}/{x}/{y}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        # Protobuf keeps the layer name and string properties as plain bytes
+        self.assertIn(b'businesses', response.content)
+        self.assertIn(b'market shop', response.content)
+        self.assertNotIn(b'mombasa shop', response.content)
+
+        tile = api_client(self.other_sheha.user).get(f'/api/map/businesses/tiles/{z}/{x}/{y}/').content
+        self.assertIn(b'fort shop', tile)
+        self.assertNotIn(b'market shop', tile)
+
+        self.assertEqual(self.officer.get(f'/api/map/businesses/tiles/{z}/0/0/').content, b'')
+        self.assertEqual(self.officer.get(f'/api/map/businesses/tiles/{z}/{2 ** z}/0/').status_code, 400)
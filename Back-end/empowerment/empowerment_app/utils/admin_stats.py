@@ -0,0 +1,135 @@
+from django.db import connections, router, transaction
+
+from empowerment_app.models import LoanApplication, LoanApplicationStat, LoanType
+
+DECISIONS = ('approved', 'pending', 'rejected')
+
+# counted_under for every application that has none yet (bulk-created
+# rows), from the same values stat_keys() reads
+FILL_COUNTED_UNDER_SQL = """
+UPDATE empowerment_app_loanapplication la
+SET counted_under = jsonb_build_array(
+    jsonb_build_array('total', ''),
+    jsonb_build_array('loan_type', COALESCE(la.loan_type_id::text, '')),
+    jsonb_build_array('region', a.region),
+    jsonb_build_array('ward', a.ward),
+    jsonb_build_array('month', COALESCE(to_char(la.created_at, 'YYYY-MM'), ''))
+)
+FROM empowerment_app_applicant a
+WHERE a.id = la.applicant_id AND la.counted_under = '[]'::jsonb
+"""
+
+COUNT_SQL = """
+SELECT k->>0, k->>1, la.decision, COUNT(*)
+FROM empowerment_app_loanapplication la, jsonb_array_elements(la.counted_under) k
+GROUP BY 1, 2, 3
+"""
+
+
+def stat_keys(application):
+    """(dimension, key) pairs a new application is counted under."""
+    applicant = application.applicant
+    created_at = application.created_at
+    return [
+        ('total', ''),
+        ('loan_type', str(application.loan_type_id or '')),
+        ('region', applicant.region),
+        ('ward', applicant.ward),
+        ('month', created_at.strftime('%Y-%m') if created_at else ''),
+    ]
+
+
+def counted_under(application):
+    """The pairs an existing application was counted under."""
+    if application.counted_under:
+        return [tuple(pair) for pair in application.counted_under]
+    return stat_keys(application)
+
+
+def bump(keys, *changes):
+    """
+    Apply each (decision, delta) in `changes` to the counters under
+    `keys`, creating missing ones, in a single statement.
+    """
+    rows = [(dimension, key, decision, delta) for decision, delta in changes for dimension, key in keys]
+    if not rows:
+        return
+    table = LoanApplicationStat._meta.db_table
+    values = ', '.join(['(%s, %s, %s, %s)'] * len(rows))
+    with connections[router.db_for_write(LoanApplicationStat)].cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (dimension, key, decision, count) VALUES {values} "
+            f"ON CONFLICT (dimension, key, decision) DO UPDATE SET count = {table}.count + excluded.count",
+            [value for row in rows for value in row],
+        )
+
+
+def rebuild_admin_stats():
+    """
+    Recompute all counters from LoanApplication (backfill / repair), each
+    application under the keys it is counted under.
+    """
+    with transaction.atomic():
+        with connections[router.db_for_write(LoanApplication)].cursor() as cursor:
+            cursor.execute(FILL_COUNTED_UNDER_SQL)
+            cursor.execute(COUNT_SQL)
+            rows = [
+                LoanApplicationStat(dimension=dimension, key=key, decision=decision, count=n)
+                for dimension, key, decision, n in cursor.fetchall()
+            ]
+        LoanApplicationStat.objects.all().delete()
+        LoanApplicationStat.objects.bulk_create(rows)
+    return len(rows)
+
+
+def _decision_row(counts):
+    row = {decision: counts.get(decision, 0) for decision in DECISIONS}
+    row['total'] = sum(counts.values())
+    return row
+
+
+def get_admin_stats():
+    """Dashboard payload built from the counters table (two queries)."""
+    grouped = {}
+    for stat in LoanApplicationStat.objects.all():
+        bucket = grouped.setdefault(stat.dimension, {}).setdefault(stat.key, {})
+        bucket[stat.decision] = bucket.get(stat.decision, 0) + stat.count
+
+    by_decision = _decision_row(grouped.get('total', {}).get('', {}))
+    total = by_decision['total']
+
+    loan_type_ids = [key for key in grouped.get('loan_type', {}) if key]
+    names = dict(LoanType.objects.filter(id__in=loan_type_ids).values_list('id', 'name'))
+
+    by_loan_type = []
+    for key, counts in grouped.get('loan_type', {}).items():
+        loan_type_id = int(key) if key else None
+        by_loan_type.append({
+            'loan_type': loan_type_id,
+            'name': names.get(loan_type_id, 'Unspecified'),
+            **_decision_row(counts),
+        })
+
+    def by_key(dimension, label):
+        return sorted(
+            ({label: key, **_decision_row(counts)} for key, counts in grouped.get(dimension, {}).items()),
+            key=lambda row: row[label],
+        )
+
+    monthly = [
+        {'month': row['month'], 'count': row['total'], 'approved': row['approved']}
+        for row in by_key('month', 'month')
+    ]
+
+    return {
+        'total': total,
+        'approved': by_decision['approved'],
+        'rejected': by_decision['rejected'],
+        'pending': by_decision['pending'],
+        'percentage': round(by_decision['approved'] * 100 / total) if total else 0,
+        'by_decision': by_decision,
+        'by_loan_type': by_loan_type,
+        'by_region': by_key('region', 'region'),
+        'by_ward': by_key('ward', 'ward'),
+        'monthly': monthly,
+    }
@@ -1,26 +1,100 @@
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
 from bank_app.models import MockBankLoan
-from empowerment_app.models import Business
+from empowerment_app.models import Applicant, Business
+from empowerment_app.utils import events, http_cache
+
+BANK_DB = 'bankdb'
+CHUNK_SIZE = 1000
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def verify_applicants(applicants, chunk_size=CHUNK_SIZE):
+    """
+    Bank-verify many applicants at once.
+
+    Per chunk this runs one Business query, one MockBankLoan `bank_no__in`
+    query on bankdb and one bulk_update, instead of three round-trips per
+    applicant. An applicant is rejected if any of their businesses' bank
+    accounts has an active loan; a changed status is logged as a
+    bank_status event in the bulk_update's transaction. Returns
+    {applicant_id: bank_status}.
+    """
+    applicants = list(applicants)
+    results = {}
+
+    for chunk in _chunks(applicants, chunk_size):
+        bank_nos = {}
+        for applicant_id, bank_no in Business.objects.filter(
+            applicant_id__in=[a.pk for a in chunk]
+        ).values_list('applicant_id', 'bank_no'):
+            bank_nos.setdefault(applicant_id, []).append(bank_no)
+
+        all_bank_nos = {no for nos in bank_nos.values() for no in nos}
+        active = set(
+            MockBankLoan.objects.using(BANK_DB).filter(
+                bank_no__in=all_bank_nos,
+                has_active_loan=True,
+            ).values_list('bank_no', flat=True)
+        ) if all_bank_nos else set()
+
+        changed = []
+        for applicant in chunk:
+            previous = applicant.bank_status
+            nos = bank_nos.get(applicant.pk)
+            if not nos:
+                applicant.is_verified_by_bank = False
+                applicant.bank_status = 'no business found'
+            elif active.intersection(nos):
+                applicant.is_verified_by_bank = False
+                applicant.bank_status = 'rejected'
+            else:
+                applicant.is_verified_by_bank = True
+                applicant.bank_status = 'verified'
+            results[applicant.pk] = applicant.bank_status
+            if applicant.bank_status != previous:
+                changed.append(events.event('applicant', applicant.pk, 'bank_status', applicant.bank_status, previous))
+
+        with transaction.atomic():
+            Applicant.objects.bulk_update(chunk, ['is_verified_by_bank', 'bank_status'])
+            events.record(*changed)
+        # bulk_update sends no post_save, so expire cached /applicants/me/ here
+        http_cache.bump(*(f"applicant:{a.pk}" for a in chunk))
+
+    return results
+
 
 def perform_bank_verification(applicant):
-    try:
-        business = Business.objects.get(applicant=applicant)
-        bank_no = business.bank_no
-
-        loan = MockBankLoan.objects.using('bankdb').filter(
-            bank_no=bank_no,
-            has_active_loan=True
-        ).first()
-
-        if loan:
-            applicant.is_verified_by_bank = False
-            applicant.bank_status = 'rejected'
-        else:
-            applicant.is_verified_by_bank = True
-            applicant.bank_status = 'verified'
-
-    except Business.DoesNotExist:
-        applicant.is_verified_by_bank = False
-        applicant.bank_status = 'no business found'
-
-    applicant.save(update_fields=["is_verified_by_bank", "bank_status"])
-    return applicant.bank_status
+    return verify_applicants([applicant])[applicant.pk]
+
+
+async def averify_applicant(applicant_id):
+    """verify_applicants() for one applicant from an async view."""
+    bank_nos = [
+        no async for no in Business.objects.filter(applicant_id=applicant_id).values_list('bank_no', flat=True)
+    ]
+
+    if not bank_nos:
+        verified, bank_status = False, 'no business found'
+    elif await MockBankLoan.objects.using(BANK_DB).filter(bank_no__in=bank_nos, has_active_loan=True).aexists():
+        verified, bank_status = False, 'rejected'
+    else:
+        verified, bank_status = True, 'verified'
+
+    await sync_to_async(_save_bank_status)(applicant_id, verified, bank_status)
+    return bank_status
+
+
+def _save_bank_status(applicant_id, verified, bank_status):
+    # There is no async atomic(); the update and its event need one
+    with transaction.atomic():
+        previous = Applicant.objects.select_for_update().values_list('bank_status', flat=True).get(pk=applicant_id)
+        Applicant.objects.filter(pk=applicant_id).update(is_verified_by_bank=verified, bank_status=bank_status)
+        if bank_status != previous:
+            events.record(events.event('applicant', applicant_id, 'bank_status', bank_status, previous))
+    http_cache.bump(f"applicant:{applicant_id}")
@@ -0,0 +1,411 @@
+import json
+import random
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.contrib.gis.geos import Point
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+from bank_app.models import MockBankLoan
+from empowerment_app.models import (
+    Applicant, Business, CustomUser, LoanApplication, LoanExpenseItem, LoanOfficer, LoanType,
+    Notification, Sheha,
+)
+from empowerment_app.principal import RoleRefreshToken
+from empowerment_app.utils.admin_stats import rebuild_admin_stats
+
+# Everything the generator creates is tagged so it can be found and cleared
+PREFIX = 'bench_'
+BANK_PREFIX = 'BENCH'
+BANK_DB = 'bankdb'
+
+# Rows per unit of --scale
+VOLUMES = {
+    'shehas': 50,
+    'applicants': 5000,
+    'applications_per_applicant': 2,
+    'expenses_per_application': 3,
+    'bank_loans': 5000,
+}
+LOAN_TYPES = [
+    ('Micro', Decimal('1000000')),
+    ('Small business', Decimal('5000000')),
+    ('Agriculture', Decimal('3000000')),
+    ('Youth start-up', Decimal('2000000')),
+    ('Women group', Decimal('4000000')),
+]
+BATCH = 2000
+
+# Zanzibar, roughly
+LAT_RANGE = (-6.5, -5.7)
+LNG_RANGE = (39.1, 39.6)
+
+
+def clear():
+    """Delete everything seed() created (users cascade to their profiles)."""
+    MockBankLoan.objects.using(BANK_DB).filter(bank_no__startswith=BANK_PREFIX).delete()
+    LoanType.objects.filter(name__startswith=PREFIX).delete()
+    CustomUser.objects.filter(username__startswith=PREFIX).delete()
+
+
+def seed(scale=1, seed=42, on_step=None):
+    """
+    Deterministic benchmark data: shehas, applicants with a business
+    each, loan applications with expenses, pending notifications and
+    MockBankLoans (a third of them active). Returns row counts.
+    """
+    rng = random.Random(seed)
+    step = on_step or (lambda message: None)
+    password = make_password('benchmark')
+
+    def users(kind, count):
+        return CustomUser.objects.bulk_create(
+            [CustomUser(username=f"{PREFIX}{kind}_{i}", name=f"{kind} {i}", password=password) for i in range(count)],
+            batch_size=BATCH,
+        )
+
+    n_shehas = max(1, VOLUMES['shehas'] * scale)
+    n_applicants = VOLUMES['applicants'] * scale
+
+    loan_types = LoanType.objects.bulk_create(
+        [LoanType(name=f"{PREFIX}{name}", max_amount=amount) for name, amount in LOAN_TYPES]
+    )
+
+    shehas = Sheha.objects.bulk_create([
+        Sheha(user=user, name=user.name, age=rng.randint(35, 70), gender=rng.choice(['Male', 'Female']),
+              phone=f"+2557{rng.randint(10000000, 99999999)}", ward=f"{PREFIX}ward_{i}",
+              email=f"sheha{i}@example.com")
+        for i, user in enumerate(users('sheha', n_shehas))
+    ], batch_size=BATCH)
+    step(f"{len(shehas)} shehas")
+
+    officer_user = users('officer', 1)[0]
+    LoanOfficer.objects.create(user=officer_user, name='Benchmark Officer', gender='Female', age=40,
+                               office='HQ', email='officer@example.com', phone='+255700000000')
+
+    applicants = Applicant.objects.bulk_create([
+        Applicant(user=user, name=user.name, age=rng.randint(18, 60), gender=rng.choice(['Male', 'Female']),
+                  marital_status='Single', region='Mjini Magharibi', district='Mjini',
+                  ward=sheha.ward, village=f"Village {rng.randint(1, 400)}",
+                  phone=f"+2557{rng.randint(10000000, 99999999)}", sheha=sheha)
+        for user, sheha in zip(users('applicant', n_applicants), (rng.choice(shehas) for _ in range(n_applicants)))
+    ], batch_size=BATCH)
+    step(f"{len(applicants)} applicants")
+
+    businesses = Business.objects.bulk_create([
+        Business(applicant=a, name=f"Business {a.pk}", type=rng.choice(['Retail', 'Farming', 'Tailoring', 'Food']),
+                 anual_income=Decimal(rng.randrange(2_000_000, 30_000_000, 1000)),
+                 bank_no=f"{BANK_PREFIX}{a.pk:08d}",
+                 location=Point(rng.uniform(*LNG_RANGE), rng.uniform(*LAT_RANGE), srid=4326))
+        for a in applicants
+    ], batch_size=BATCH)
+    step(f"{len(businesses)} businesses")
+
+    # Half the applicants are still waiting for their sheha
+    pending = applicants[: len(applicants) // 2]
+    Notification.objects.bulk_create([
+        Notification(sheha_id=a.sheha_id, applicant=a, name=a.name, village=a.village) for a in pending
+    ], batch_size=BATCH)
+    step(f"{len(pending)} notifications")
+
+    now = timezone.now()
+    applications = []
+    for business in businesses:
+        for _ in range(VOLUMES['applications_per_applicant']):
+            loan_type = rng.choice(loan_types)
+            sales = Decimal(rng.randrange(200_000, 3_000_000, 1000))
+            applications.append(LoanApplication(
+                loan_type=loan_type, applicant_id=business.applicant_id, business=business,
+                amount_requested=min(loan_type.max_amount, (business.anual_income * Decimal('0.5')).quantize(Decimal('1'))),
+                purpose='Stock and equipment', repayment_period=rng.choice([6, 12, 18, 24]),
+                monthly_sales=sales, monthly_expenses=(sales * Decimal(rng.uniform(0.4, 0.9))).quantize(Decimal('1')),
+                decision=rng.choices(['pending', 'approved', 'rejected'], [6, 3, 1])[0],
+                score=rng.randint(20, 95),
+            ))
+    applications = LoanApplication.objects.bulk_create(applications, batch_size=BATCH)
+    # auto_now_add ignores explicit values, so spread created_at afterwards
+    for application in applications:
+        application.created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+    LoanApplication.objects.bulk_update(applications, ['created_at'], batch_size=BATCH)
+    step(f"{len(applications)} loan applications")
+
+    expenses = LoanExpenseItem.objects.bulk_create([
+        LoanExpenseItem(loan_application=application, item=item, description=item,
+                        amount=Decimal(rng.randrange(10_000, 500_000, 1000)))
+        for application in applications
+        for item in rng.sample(['Rent', 'Stock', 'Transport', 'Wages', 'Utilities'], VOLUMES['expenses_per_application'])
+    ], batch_size=BATCH)
+    step(f"{len(expenses)} expense items")
+
+    bank_loans = MockBankLoan.objects.using(BANK_DB).bulk_create([
+        MockBankLoan(bank_no=b.bank_no, applicant_name=f"Business {b.pk}", has_active_loan=rng.random() < 0.33,
+                     loan_amount=Decimal(rng.randrange(0, 5_000_000, 1000)))
+        for b in businesses[: VOLUMES['bank_loans'] * scale]
+    ], batch_size=BATCH)
+    step(f"{len(bank_loans)} bank loans")
+
+    # bulk_create skips the stat signals
+    rebuild_admin_stats()
+    return {
+        'shehas': len(shehas), 'applicants': len(applicants), 'businesses': len(businesses),
+        'notifications': len(pending), 'loan_applications': len(applications),
+        'expenses': len(expenses), 'bank_loans': len(bank_loans),
+    }
+
+
+# === Scenarios ===
+def _auth(user):
+    return {'HTTP_AUTHORIZATION': f"Bearer {RoleRefreshToken.for_user(user).access_token}"}
+
+
+def _photo():
+    buffer = BytesIO()
+    Image.new('RGB', (600, 800), (180, 140, 120)).save(buffer, 'JPEG')
+    return SimpleUploadedFile('passport.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+class Scenario:
+    """One API flow: setup() prepares per-iteration inputs, call(i) makes one request."""
+    name = ''
+    endpoint = ''
+
+    def __init__(self, client, iterations, rng):
+        self.client = client
+        self.iterations = iterations
+        self.rng = rng
+
+    def setup(self):
+        pass
+
+    def call(self, i):
+        raise NotImplementedError
+
+
+class Registration(Scenario):
+    name = 'applicant_registration'
+    endpoint = 'POST /api/applicants/'
+
+    def setup(self):
+        password = make_password('benchmark')
+        users = CustomUser.objects.bulk_create([
+            CustomUser(username=f"{PREFIX}new_{time.time_ns()}_{i}", name=f"new {i}", password=password)
+            for i in range(self.iterations)
+        ])
+        wards = list(Sheha.objects.filter(ward__startswith=PREFIX).values_list('ward', flat=True))
+        self.inputs = [(_auth(user), self.rng.choice(wards)) for user in users]
+
+    def call(self, i):
+        headers, ward = self.inputs[i]
+        return self.client.post('/api/applicants/', {
+            'name': f"New applicant {i}", 'age': 30, 'gender': 'Female', 'marital_status': 'Single',
+            'region': 'Mjini Magharibi', 'district': 'Mjini', 'ward': ward, 'village': 'Benchmark',
+            'phone': '+255712345678', 'passport_size': _photo(),
+        }, **headers)
+
+
+class ShehaVerification(Scenario):
+    name = 'sheha_verification'
+    endpoint = 'POST /api/notifications/{id}/verify/'
+
+    def setup(self):
+        notifications = list(
+            Notification.objects.filter(sheha__ward__startswith=PREFIX, is_verified_by_sheha=False)
+            .select_related('sheha__user')[: self.iterations]
+        )
+        if len(notifications) < self.iterations:
+            raise ValueError("Not enough pending notifications; seed a larger --scale.")
+        tokens = {}
+        self.inputs = []
+        for notification in notifications:
+            user = notification.sheha.user
+            if user.pk not in tokens:
+                tokens[user.pk] = _auth(user)
+            self.inputs.append((notification.pk, tokens[user.pk]))
+
+    def call(self, i):
+        pk, headers = self.inputs[i]
+        return self.client.post(f'/api/notifications/{pk}/verify/', **headers)
+
+
+class LoanSubmission(Scenario):
+    name = 'loan_submission'
+    endpoint = 'POST /api/loan-applications/'
+
+    def setup(self):
+        applicants = list(
+            Applicant.objects.filter(user__username__startswith=PREFIX, business__isnull=False)
+            .select_related('user').distinct()[: self.iterations]
+        )
+        loan_types = list(LoanType.objects.filter(name__startswith=PREFIX).values_list('pk', flat=True))
+        self.inputs = [(_auth(a.user), self.rng.choice(loan_types)) for a in applicants]
+
+    def call(self, i):
+        headers, loan_type = self.inputs[i % len(self.inputs)]
+        return self.client.post('/api/loan-applications/', {
+            'loan_type': loan_type, 'amount_requested': '500000', 'purpose': 'Stock',
+            'repayment_period': 12, 'monthly_sales': '900000', 'monthly_expenses': '400000',
+            'expenses': [
+                {'item': 'Stock', 'description': 'Stock', 'amount': '300000'},
+                {'item': 'Rent', 'description': 'Rent', 'amount': '100000'},
+            ],
+        }, content_type='application/json', **headers)
+
+
+class ReviewListing(Scenario):
+    name = 'officer_review_listing'
+    endpoint = 'GET /api/loan-review/'
+
+    def setup(self):
+        self.headers = _auth(LoanOfficer.objects.select_related('user').get(user__username=f"{PREFIX}officer_0").user)
+
+    def call(self, i):
+        return self.client.get('/api/loan-review/', {'page': i % 20 + 1}, **self.headers)
+
+
+SCENARIOS = [Registration, ShehaVerification, LoanSubmission, ReviewListing]
+
+
+def _latency_summary(latencies):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'mean_ms': round(float(np.mean(latencies)), 2),
+    }
+
+
+def run(iterations=100, warmup=5, seed=42, only=None, host='localhost'):
+    """
+    Run each scenario sequentially through the full Django stack and
+    return per-endpoint latency percentiles, throughput and query counts.
+    """
+    rng = random.Random(seed)
+    client = Client(HTTP_HOST=host)
+    results = {}
+    for scenario_class in SCENARIOS:
+        if only and scenario_class.name not in only:
+            continue
+        scenario = scenario_class(client, iterations + warmup, rng)
+        scenario.setup()
+
+        for i in range(warmup):
+            scenario.call(i)
+
+        latencies, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for i in range(warmup, warmup + iterations):
+            with ExitStack() as stack:
+                captured = [stack.enter_context(CaptureQueriesContext(c)) for c in connections.all()]
+                start = time.perf_counter()
+                response = scenario.call(i)
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(sum(len(c) for c in captured))
+            if response.status_code >= 400:
+                errors += 1
+        elapsed = time.perf_counter() - started
+
+        results[scenario.name] = {
+            'endpoint': scenario.endpoint,
+            'iterations': iterations,
+            'errors': errors,
+            **_latency_summary(latencies),
+            'throughput_rps': round(iterations / elapsed, 1),
+            'queries_mean': round(float(np.mean(queries)), 1),
+            'queries_max': int(max(queries)),
+        }
+    return {
+        'databases': {alias: connections[alias].vendor for alias in connections},
+        'iterations': iterations,
+        'seed': seed,
+        'scenarios': results,
+    }
+
+
+def connection_overhead(iterations=100, seed=42, host='localhost'):
+    """
+    Sheha verification (which touches default and bankdb) timed twice:
+    with every connection closed before each request, as with
+    CONN_MAX_AGE=0 and no pool, and with connections kept. Under DB_POOL
+    closing hands the connection back to the pool, so the first mode
+    measures a pool checkout instead of a handshake.
+
+    Closing connections rules out one outer transaction, so each request
+    gets its own on every database and is rolled back straight after; as
+    with run(), on_commit work is skipped. Both modes verify the same
+    notifications.
+    """
+    scenario = ShehaVerification(Client(HTTP_HOST=host), iterations, random.Random(seed))
+    scenario.setup()
+    aliases = [alias for alias in connections if connections[alias].vendor == 'postgresql']
+
+    connect_ms = {alias: [] for alias in aliases}
+    for alias in aliases:
+        for _ in range(min(iterations, 20)):
+            connections[alias].close()
+            start = time.perf_counter()
+            connections[alias].ensure_connection()
+            connect_ms[alias].append((time.perf_counter() - start) * 1000)
+
+    modes = {}
+    for mode, reconnect in (('reconnect', True), ('reuse', False)):
+        latencies = []
+        for i in range(iterations):
+            if reconnect:
+                connections.close_all()
+            # Started before the atomic blocks, which are what connect
+            start = time.perf_counter()
+            with ExitStack() as stack:
+                for alias in aliases:
+                    stack.enter_context(transaction.atomic(using=alias))
+                scenario.call(i)
+                latencies.append((time.perf_counter() - start) * 1000)
+                for alias in aliases:
+                    transaction.set_rollback(True, using=alias)
+        modes[mode] = _latency_summary(latencies)
+
+    return {
+        'endpoint': scenario.endpoint,
+        'iterations': iterations,
+        'pooled': {alias: connections[alias].pool is not None for alias in aliases},
+        'connect_ms': {alias: round(float(np.mean(v)), 2) for alias, v in connect_ms.items()},
+        'modes': modes,
+        'saved_ms_p50': round(modes['reconnect']['p50_ms'] - modes['reuse']['p50_ms'], 2),
+    }
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Regressions against a baseline: p95 slower by more than `tolerance`, or more queries."""
+    regressions = []
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current['queries_max'] > previous['queries_max']:
+            regressions.append(f"{name}: queries {previous['queries_max']} -> {current['queries_max']}")
+        if current['errors'] > previous['errors']:
+            regressions.append(f"{name}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
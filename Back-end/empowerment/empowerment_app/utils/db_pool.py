@@ -0,0 +1,43 @@
+from django.db import connections
+
+# psycopg_pool counters reported per alias (all cumulative except the
+# first three, which are current values)
+STATS = (
+    ('pool_size', 'size'),
+    ('pool_available', 'available'),
+    ('requests_waiting', 'waiting'),
+    ('requests_num', 'requests'),
+    ('requests_queued', 'queued'),
+    ('requests_wait_ms', 'wait_ms'),
+    ('requests_errors', 'timeouts'),
+    ('connections_num', 'connections_opened'),
+    ('connections_lost', 'connections_lost'),
+    ('returns_bad', 'returns_bad'),
+)
+GAUGES = {'size', 'available', 'waiting'}
+
+
+def pool_stats():
+    """{alias: stats} for every alias running a psycopg connection pool."""
+    stats = {}
+    for alias in connections:
+        # Only the PostgreSQL backend has .pool, and it is None without OPTIONS['pool']
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is None:
+            continue
+        raw = pool.get_stats()
+        row = {name: raw.get(key, 0) for key, name in STATS}
+        row['wait_ms_mean'] = round(row['wait_ms'] / row['requests'], 2) if row['requests'] else 0.0
+        stats[alias] = row
+    return stats
+
+
+def prometheus():
+    lines = []
+    stats = pool_stats()
+    for _, name in STATS:
+        metric = f"empowerment_db_pool_{name}" + ('' if name in GAUGES else '_total')
+        lines.append(f"# TYPE {metric} {'gauge' if name in GAUGES else 'counter'}")
+        for alias, row in stats.items():
+            lines.append(f'{metric}{{alias="{alias}"}} {row[name]}')
+    return '\n'.join(lines) + '\n' if stats else ''
@@ -0,0 +1,80 @@
+from django.db import router, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from empowerment_app.models import TransitionEvent
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+# Ids come from a sequence and are handed out before commit, so a reader
+# going by id could see event 8 before event 7 commits and skip it for
+# good. Instead the feed runs in (txid, id) order and only shows events
+# whose transaction is older than every transaction still running: those
+# have all finished, and anything committing later has a larger txid. A
+# long-running writer holds the feed back until it ends; it never makes
+# a reader skip an event. The reader's own transaction, if it wrote any,
+# is always visible to itself.
+VISIBLE_TXID = RawSQL("pg_snapshot_xmin(pg_current_snapshot())::text::bigint", [])
+OWN_TXID = RawSQL("pg_current_xact_id_if_assigned()::text::bigint", [])
+START = '0'
+
+
+def event(topic, object_id, kind, new_value, old_value='', actor=None, **data):
+    """An unsaved TransitionEvent for record()."""
+    return TransitionEvent(
+        topic=topic,
+        object_id=object_id,
+        kind=kind,
+        old_value='' if old_value is None else str(old_value),
+        new_value='' if new_value is None else str(new_value),
+        actor_id=getattr(actor, 'pk', actor),
+        data=data,
+    )
+
+
+def sheha_verified(applicant_id, actor, notification_id):
+    return event(
+        'applicant', applicant_id, 'sheha_verified', 'verified', 'pending', actor,
+        notification_id=notification_id,
+    )
+
+
+def record(*events):
+    """
+    Append events in the caller's transaction. Call this inside the
+    transaction.atomic() block that makes the change, so the change and
+    its events commit or roll back together.
+    """
+    if not events:
+        return []
+    using = router.db_for_write(TransitionEvent)
+    # No savepoint inside the caller's block, just its transaction
+    with transaction.atomic(using=using, savepoint=False):
+        return TransitionEvent.objects.using(using).bulk_create(events)
+
+
+def cursor(event):
+    """The `since` that continues the feed after `event`."""
+    return f"{event.txid}-{event.pk}"
+
+
+def parse_cursor(value):
+    """(txid, id) from a cursor; ValueError if it is not one."""
+    if value in ('', START):
+        return 0, 0
+    txid, _, pk = value.partition('-')
+    return int(txid), int(pk)
+
+
+def feed(since=START, limit=DEFAULT_LIMIT, topics=None):
+    """Events after the cursor `since`, in (txid, id) order; see cursor()."""
+    txid, pk = parse_cursor(since)
+    # Read from the primary: a lagging replica would hand out a stale cursor
+    queryset = TransitionEvent.objects.using(router.db_for_write(TransitionEvent)).filter(
+        Q(txid__gt=txid) | Q(txid=txid, id__gt=pk),
+        Q(txid__lt=VISIBLE_TXID) | Q(txid=OWN_TXID),
+    )
+    if topics:
+        queryset = queryset.filter(topic__in=topics)
+    return queryset.order_by('txid', 'id')[:min(limit, MAX_LIMIT)]
@@ -0,0 +1,66 @@
+import csv
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object whose write() just returns the line for streaming."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset, columns, filename):
+    """
+    Stream `queryset` as CSV without building model instances.
+
+    `columns` is a list of (header, field lookup) pairs; rows come from
+    values_list() through a server-side cursor, so memory stays flat
+    however many rows there are.
+    """
+    writer = csv.writer(Echo())
+    rows = queryset.values_list(*[field for _, field in columns]).iterator(chunk_size=CHUNK_SIZE)
+
+    def generate():
+        yield writer.writerow([header for header, _ in columns])
+        for row in rows:
+            yield writer.writerow(row)
+
+    stamp = timezone.now().strftime('%Y%m%d-%H%M')
+    response = StreamingHttpResponse(generate(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}-{stamp}.csv"'
+    return response
+
+
+LOAN_APPLICATION_COLUMNS = [
+    ('id', 'id'),
+    ('created_at', 'created_at'),
+    ('applicant_id', 'applicant_id'),
+    ('applicant_name', 'applicant__name'),
+    ('region', 'applicant__region'),
+    ('ward', 'applicant__ward'),
+    ('business_name', 'business__name'),
+    ('bank_no', 'business__bank_no'),
+    ('loan_type', 'loan_type__name'),
+    ('amount_requested', 'amount_requested'),
+    ('repayment_period', 'repayment_period'),
+    ('monthly_sales', 'monthly_sales'),
+    ('monthly_expenses', 'monthly_expenses'),
+    ('score', 'score'),
+    ('decision', 'decision'),
+    ('reviewed_at', 'reviewed_at'),
+]
+
+REPAYMENT_COLUMNS = [
+    ('id', 'id'),
+    ('date', 'date'),
+    ('day', 'day'),
+    ('time', 'time'),
+    ('amount', 'amount'),
+    ('business_id', 'business_id'),
+    ('business_name', 'business__name'),
+    ('bank_no', 'business__bank_no'),
+]
@@ -0,0 +1,136 @@
+from django.db import connection
+
+from empowerment_app.models import Applicant, Business
+
+# At zoom levels below this, points are aggregated into grid clusters
+CLUSTER_MAX_ZOOM = 12
+# Roughly how many grid cells across the screen width when clustering
+CLUSTER_CELLS = 64
+MAX_POINTS = 5000
+MAX_RADIUS_M = 50000
+
+TABLE = Business._meta.db_table
+APPLICANT_TABLE = Applicant._meta.db_table
+
+
+def _ward_filter(sheha_id, alias=TABLE):
+    """Extra WHERE clause limiting a sheha to businesses in their ward."""
+    if sheha_id is None:
+        return '', []
+    return (
+        f" AND {alias}.applicant_id IN (SELECT id FROM {APPLICANT_TABLE} WHERE sheha_id = %s)",
+        [sheha_id],
+    )
+
+
+def parse_bbox(value):
+    """'minLng,minLat,maxLng,maxLat' -> tuple of floats, or ValueError."""
+    parts = [float(v) for v in value.split(',')]
+    if len(parts) != 4:
+        raise ValueError("bbox needs four numbers")
+    min_lng, min_lat, max_lng, max_lat = parts
+    if not (-180 <= min_lng < max_lng <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise ValueError("bbox is out of range")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def _fetch(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [col[0] for col in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def bbox_query(bbox, sheha_id=None):
+    """(sql, params) of businesses_in_bbox, also EXPLAINed by check_query_plans."""
+    # `&&` against the envelope is answered by the GiST index on location
+    ward_sql, ward_params = _ward_filter(sheha_id)
+    return (
+        f"""
+        SELECT id, name, type, ST_X(location::geometry) AS lng, ST_Y(location::geometry) AS lat
+        FROM {TABLE}
+        WHERE location && ST_MakeEnvelope(%s, %s, %s, %s, 4326)::geography{ward_sql}
+        LIMIT %s
+        """,
+        [*bbox, *ward_params, MAX_POINTS],
+    )
+
+
+def businesses_in_bbox(bbox, sheha_id=None):
+    return _fetch(*bbox_query(bbox, sheha_id))
+
+
+def clusters_in_bbox(bbox, sheha_id=None):
+    """Server-side grid clustering (ST_SnapToGrid) sized to the bbox width."""
+    cell = (bbox[2] - bbox[0]) / CLUSTER_CELLS
+    ward_sql, ward_params = _ward_filter(sheha_id)
+    return _fetch(
+        f"""
+        SELECT COUNT(*) AS count,
+               ST_X(ST_Centroid(ST_Collect(location::geometry))) AS lng,
+               ST_Y(ST_Centroid(ST_Collect(location::geometry))) AS lat
+        FROM {TABLE}
+        WHERE location && ST_MakeEnvelope(%s, %s, %s, %s, 4326)::geography{ward_sql}
+        GROUP BY ST_SnapToGrid(location::geometry, %s)
+        """,
+        [*bbox, *ward_params, cell],
+    )
+
+
+def near_query(lat, lng, radius_m, limit=100, sheha_id=None):
+    """(sql, params) of businesses_near, also EXPLAINed by check_query_plans."""
+    ward_sql, ward_params = _ward_filter(sheha_id)
+    origin = "ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography"
+    return (
+        f"""
+        SELECT id, name, type, ST_X(location::geometry) AS lng, ST_Y(location::geometry) AS lat,
+               ST_Distance(location, {origin}) AS distance
+        FROM {TABLE}
+        WHERE ST_DWithin(location, {origin}, %s){ward_sql}
+        ORDER BY distance
+        LIMIT %s
+        """,
+        [lng, lat, lng, lat, radius_m, *ward_params, limit],
+    )
+
+
+def businesses_near(lat, lng, radius_m, limit=100, sheha_id=None):
+    """Businesses within radius_m metres, nearest first (distance in metres)."""
+    return _fetch(*near_query(lat, lng, radius_m, limit, sheha_id))
+
+
+def business_tile(z, x, y, sheha_id=None):
+    """Mapbox vector tile (bytes) for tile z/x/y, built by ST_AsMVT."""
+    ward_sql, ward_params = _ward_filter(sheha_id, alias='b')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH bounds AS (
+                SELECT ST_TileEnvelope(%s, %s, %s) AS geom
+            ),
+            features AS (
+                SELECT b.id, b.name, b.type,
+                       ST_AsMVTGeom(ST_Transform(b.location::geometry, 3857), bounds.geom) AS geom
+                FROM {TABLE} b, bounds
+                WHERE b.location && ST_Transform(bounds.geom, 4326)::geography{ward_sql}
+            )
+            SELECT ST_AsMVT(features.*, 'businesses') FROM features
+            """,
+            [z, x, y, *ward_params],
+        )
+        tile = cursor.fetchone()[0]
+    return bytes(tile) if tile else b''
+
+
+def feature_collection(rows, properties):
+    return {
+        'type': 'FeatureCollection',
+        'features': [
+            {
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [row['lng'], row['lat']]},
+                'properties': {key: row[key] for key in properties},
+            }
+            for row in rows
+        ],
+    }
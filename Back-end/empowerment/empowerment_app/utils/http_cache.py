@@ -0,0 +1,128 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+# Any configured cache alias; versions and bodies must live in a cache that
+# every worker shares (locmem only works for a single process)
+CACHE_ALIAS = getattr(settings, 'HTTP_CACHE_ALIAS', 'default')
+BODY_TIMEOUT = getattr(settings, 'HTTP_CACHE_TIMEOUT', 60 * 60)
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(resource):
+    return f"http_version:{resource}"
+
+
+def resource_versions(resources):
+    """
+    Version of each resource: the time of its last change in ms. A
+    resource the cache has forgotten starts a new version now, so lost
+    versions can only cause a miss, never a stale hit.
+    """
+    keys = {_version_key(r): r for r in resources}
+    found = _cache().get_many(keys)
+    now = int(time.time() * 1000)
+    missing = {key: now for key in keys if key not in found}
+    if missing:
+        _cache().set_many(missing, None)
+        found.update(missing)
+    return [found[_version_key(r)] for r in resources]
+
+
+def bump(*resources):
+    """
+    Mark resources as changed once the current transaction commits (at
+    once outside one). Bumping before the commit would let a concurrent
+    GET cache the old rows under the new version.
+    """
+    transaction.on_commit(lambda: _bump(resources))
+
+
+def _bump(resources):
+    now = int(time.time() * 1000)
+    cache = _cache()
+    found = cache.get_many([_version_key(r) for r in resources])
+    # Strictly increasing even if two writes land in the same millisecond
+    cache.set_many({
+        _version_key(r): max(now, found.get(_version_key(r), 0) + 1) for r in resources
+    }, None)
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return etag in parse_etags(if_none_match) or if_none_match.strip() == '*'
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and last_modified <= since
+
+
+class ConditionalCacheMixin:
+    """
+    ETag/Last-Modified and a server-side body cache for read-mostly
+    ViewSets. The ETag comes from the version counters of
+    `cache_resources` (bumped by signals), so a conditional request is
+    answered with 304, and a repeated one from the cache, without
+    touching the database or the serializer.
+    """
+    cache_resources = ()
+    cache_actions = ('list', 'retrieve')
+
+    def get_cache_resources(self):
+        return self.cache_resources
+
+    def get_cache_scope(self):
+        # Responses that differ per user should return the user id here
+        return ''
+
+    def list(self, request, *args, **kwargs):
+        if 'list' not in self.cache_actions:
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        if 'retrieve' not in self.cache_actions:
+            return super().retrieve(request, *args, **kwargs)
+        return self.conditional_response(request, super().retrieve, *args, **kwargs)
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return handler(request, *args, **kwargs)
+
+        resources = list(self.get_cache_resources())
+        versions = resource_versions(resources)
+        fingerprint = '|'.join([
+            request.get_full_path(),
+            self.get_cache_scope(),
+            getattr(request, 'accepted_media_type', '') or '',
+            *(f"{r}={v}" for r, v in zip(resources, versions)),
+        ])
+        etag = '"%s"' % hashlib.md5(fingerprint.encode()).hexdigest()
+        last_modified = max(versions) // 1000 if versions else int(time.time())
+
+        if _not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            body_key = f"http_body:{etag}"
+            data = _cache().get(body_key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                _cache().set(body_key, response.data, BODY_TIMEOUT)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # Browsers keep the copy but must revalidate it every time
+        response['Cache-Control'] = 'private, no-cache'
+        return response
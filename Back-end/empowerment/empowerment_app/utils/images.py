@@ -0,0 +1,133 @@
+import hashlib
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import close_old_connections
+from PIL import Image, ImageOps
+
+from empowerment_app.utils import http_cache
+
+logger = logging.getLogger(__name__)
+
+# Longest side of the stored original, JPEG quality, and square thumbnail
+# edge lengths in pixels (100 is what the admin and notification list show)
+MAX_DIMENSION = getattr(settings, 'PASSPORT_MAX_DIMENSION', 1024)
+JPEG_QUALITY = getattr(settings, 'PASSPORT_JPEG_QUALITY', 82)
+THUMBNAIL_SIZES = getattr(settings, 'PASSPORT_THUMBNAIL_SIZES', (100, 300))
+SMALL_THUMBNAIL = str(min(THUMBNAIL_SIZES))
+
+PASSPORT_DIR = 'passport_photos'
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='thumbnails')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File names are hashes of the content, so a file that already exists
+    under a name holds the same bytes: saving it again is skipped.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+
+passport_storage = ContentAddressedStorage()
+
+
+def get_passport_storage():
+    return passport_storage
+
+
+def passport_upload_to(instance, filename):
+    # Shard by the first two hash characters to keep directories small
+    return f"{PASSPORT_DIR}/{filename[:2]}/{filename}"
+
+
+def is_normalised(name):
+    return bool(name) and name.startswith(f"{PASSPORT_DIR}/") and len(os.path.basename(name)) == 68
+
+
+def _encode(image):
+    buffer = BytesIO()
+    # A fresh encode carries no EXIF/XMP/ICC data unless it is passed in
+    image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def normalise(fileobj):
+    """
+    Upright, metadata-free, recompressed JPEG of an uploaded image as a
+    ContentFile named by its SHA-256, so identical photos share one file.
+    """
+    fileobj.seek(0)
+    with Image.open(fileobj) as image:
+        # Apply the EXIF orientation before the EXIF block is dropped
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        image.thumbnail((MAX_DIMENSION, MAX_DIMENSION))
+        data = _encode(image)
+    return ContentFile(data, name=f"{hashlib.sha256(data).hexdigest()}.jpg")
+
+
+def thumbnail_name(name, size):
+    return f"{PASSPORT_DIR}/thumbs/{size}/{os.path.basename(name)}"
+
+
+def thumbnail_urls(fieldfile, ready):
+    """{size: url} once thumbnails are built; None before that."""
+    if not fieldfile or not ready:
+        return None
+    return {str(size): fieldfile.storage.url(thumbnail_name(fieldfile.name, size)) for size in THUMBNAIL_SIZES}
+
+
+def build_thumbnails(fieldfile):
+    storage = fieldfile.storage
+    with storage.open(fieldfile.name) as source, Image.open(source) as image:
+        image = image.convert('RGB')
+        for size in THUMBNAIL_SIZES:
+            name = thumbnail_name(fieldfile.name, size)
+            if not storage.exists(name):
+                storage.save(name, ContentFile(_encode(ImageOps.fit(image, (size, size)))))
+
+
+def build_applicant_thumbnails(applicant_id):
+    """Build thumbnails for one applicant and flag them ready."""
+    from empowerment_app.models import Applicant
+
+    applicant = Applicant.objects.filter(pk=applicant_id).only('passport_size').first()
+    if applicant is None or not applicant.passport_size:
+        return False
+    build_thumbnails(applicant.passport_size)
+    # Only flag the photo the thumbnails were built from; queryset update
+    # keeps the save signals out of it
+    updated = Applicant.objects.filter(pk=applicant_id, passport_size=applicant.passport_size.name).update(
+        passport_thumbnails_ready=True,
+    )
+    if updated:
+        http_cache.bump(f"applicant:{applicant_id}")
+    return True
+
+
+def _run(applicant_id):
+    try:
+        build_applicant_thumbnails(applicant_id)
+    except Exception:
+        # build_passport_images picks up whatever is still not ready
+        logger.exception("Building thumbnails for applicant %s failed", applicant_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_thumbnails(applicant_id):
+    """Build thumbnails off the request thread."""
+    _executor.submit(_run, applicant_id)
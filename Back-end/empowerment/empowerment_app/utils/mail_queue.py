@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from empowerment_app.models import OutgoingEmail
+
+BATCH_SIZE = getattr(settings, 'EMAIL_QUEUE_BATCH_SIZE', 50)
+MAX_ATTEMPTS = getattr(settings, 'EMAIL_QUEUE_MAX_ATTEMPTS', 5)
+# Retry after 30s, 1m, 2m, 4m ... capped at one hour
+BACKOFF_BASE = getattr(settings, 'EMAIL_QUEUE_BACKOFF_SECONDS', 30)
+BACKOFF_MAX = 3600
+
+
+def queue_email(subject, message, recipient_list, from_email=None):
+    """Store an email for the background worker; never talks to SMTP."""
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        message=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to='\n'.join(recipient_list),
+    )
+
+
+async def aqueue_email(subject, message, recipient_list, from_email=None):
+    return await OutgoingEmail.objects.acreate(
+        subject=subject,
+        message=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to='\n'.join(recipient_list),
+    )
+
+
+def queue_emails(emails, from_email=None):
+    """Queue many (subject, message, recipient_list) emails with one INSERT."""
+    return OutgoingEmail.objects.bulk_create([
+        OutgoingEmail(
+            subject=subject,
+            message=message,
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            to='\n'.join(recipient_list),
+        )
+        for subject, message, recipient_list in emails
+    ])
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX))
+
+
+def dispatch_pending(batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS):
+    """
+    Send one batch of due emails over a single SMTP connection.
+
+    Rows are locked with SKIP LOCKED so several workers can run side by
+    side. Returns (sent, failed) counts for the batch.
+    """
+    now = timezone.now()
+    sent = failed = 0
+
+    with transaction.atomic():
+        batch = list(
+            OutgoingEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if not batch:
+            return 0, 0
+
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as e:
+            # Server unreachable: push the whole batch back
+            for email in batch:
+                _mark_failure(email, e, now, max_attempts)
+            OutgoingEmail.objects.bulk_update(batch, ['status', 'attempts', 'next_attempt_at', 'last_error'])
+            return 0, len(batch)
+
+        try:
+            for email in batch:
+                message = EmailMessage(
+                    subject=email.subject,
+                    body=email.message,
+                    from_email=email.from_email,
+                    to=email.to.splitlines(),
+                    connection=connection,
+                )
+                try:
+                    connection.send_messages([message])
+                except Exception as e:
+                    _mark_failure(email, e, now, max_attempts)
+                    failed += 1
+                else:
+                    email.status = 'sent'
+                    email.sent_at = timezone.now()
+                    email.attempts += 1
+                    email.last_error = ''
+                    sent += 1
+        finally:
+            connection.close()
+
+        OutgoingEmail.objects.bulk_update(
+            batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'],
+        )
+
+    return sent, failed
+
+
+def _mark_failure(email, error, now, max_attempts):
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = 'failed'
+    else:
+        email.next_attempt_at = now + backoff(email.attempts)
@@ -0,0 +1,51 @@
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def assert_max_queries(limit, using='default'):
+    """
+    Fail if the wrapped block runs more than `limit` queries.
+
+    Use it in tests together with a ViewSet's `query_budget`, e.g.
+    `with assert_max_queries(LoanApplicationViewSet.query_budget['list']): ...`
+    """
+    with CaptureQueriesContext(connections[using]) as ctx:
+        yield ctx
+    if len(ctx) > limit:
+        sql = '\n'.join(q['sql'] for q in ctx.captured_queries)
+        raise QueryBudgetExceeded(f"{len(ctx)} queries executed, budget is {limit}:\n{sql}")
+
+
+class QueryBudgetMixin:
+    """
+    ViewSet mixin declaring the max number of queries per action
+    (authentication included). When QUERY_BUDGET_CHECKS is on (defaults
+    to DEBUG) every request is counted and overruns are logged.
+    """
+    query_budget = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        if not getattr(settings, 'QUERY_BUDGET_CHECKS', settings.DEBUG):
+            return super().dispatch(request, *args, **kwargs)
+
+        with CaptureQueriesContext(connections['default']) as ctx:
+            response = super().dispatch(request, *args, **kwargs)
+
+        limit = self.query_budget.get(getattr(self, 'action', None))
+        if limit is not None and len(ctx) > limit:
+            logger.warning(
+                "Query budget exceeded for %s.%s: %d queries (budget %d)",
+                self.__class__.__name__, self.action, len(ctx), limit,
+            )
+        return response
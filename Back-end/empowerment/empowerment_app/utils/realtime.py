@@ -0,0 +1,43 @@
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from empowerment_app.consumers import sheha_group, user_group
+
+
+def push(group, message):
+    """Send `message` to a websocket group once the current transaction commits."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    def send():
+        async_to_sync(channel_layer.group_send)(group, {
+            'type': 'send_notification',
+            'message': message,
+        })
+
+    transaction.on_commit(send)
+
+
+def notify_sheha(sheha_id, message):
+    push(sheha_group(sheha_id), message)
+
+
+def notify_user(user_id, message):
+    push(user_group(user_id), message)
+
+
+async def apush(group, message):
+    """push() for async views: there is no transaction to wait for."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    await channel_layer.group_send(group, {
+        'type': 'send_notification',
+        'message': message,
+    })
+
+
+async def anotify_user(user_id, message):
+    await apush(user_group(user_id), message)
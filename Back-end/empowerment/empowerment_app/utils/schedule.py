@@ -0,0 +1,159 @@
+import calendar
+import re
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db.models import DecimalField, ExpressionWrapper, F, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+from empowerment_app.models import RepaymentSchedule
+
+DEFAULT_ANNUAL_RATE = Decimal(str(getattr(settings, 'LOAN_DEFAULT_ANNUAL_RATE', 18)))
+DEFAULT_METHOD = getattr(settings, 'LOAN_DEFAULT_SCHEDULE_METHOD', 'declining')
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def parse_duration_months(text):
+    """'12', '12 months', '2 years' -> months; None if there is no number."""
+    match = re.search(r'\d+', text or '')
+    if not match:
+        return None
+    months = int(match.group())
+    if 'year' in text.lower():
+        months *= 12
+    return months
+
+
+def add_months(start, months):
+    month = start.month - 1 + months
+    year = start.year + month // 12
+    month = month % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def compute_installments(principal, annual_rate, term, grace, declining):
+    """
+    Monthly amounts due for many loans at once.
+
+    All arguments are equally sized sequences (annual_rate in percent,
+    declining as booleans). Grace months are interest only; the principal
+    is then repaid over the remaining months, either as a flat-rate
+    installment (interest on the original amount) or an annuity on the
+    declining balance. Amounts are rounded to cents with the rounding
+    difference put on the last installment, so each row adds up to the
+    loan's exact total. Returns an (n_loans, max_term) array, zero-padded.
+    """
+    principal = np.asarray(principal, dtype=float)
+    rate = np.asarray(annual_rate, dtype=float) / 100 / 12
+    term = np.asarray(term, dtype=int)
+    grace = np.minimum(np.asarray(grace, dtype=int), term - 1)
+    declining = np.asarray(declining, dtype=bool)
+
+    n = np.maximum(term - grace, 1)
+    interest_only = principal * rate
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annuity = np.where(rate > 0, principal * rate / (1 - (1 + rate) ** -n), principal / n)
+    flat = principal / n + principal * rate
+    payment = np.where(declining, annuity, flat)
+
+    months = np.arange(term.max() if len(term) else 0)[None, :]
+    installments = np.where(
+        months < grace[:, None],
+        interest_only[:, None],
+        np.where(months < term[:, None], payment[:, None], 0.0),
+    )
+    rounded = np.round(installments, 2)
+    if len(term):
+        rows = np.arange(len(term))
+        rounded[rows, term - 1] += np.round(installments.sum(axis=1), 2) - rounded.sum(axis=1)
+    return np.round(rounded, 2)
+
+
+def build_schedules(loans, method=DEFAULT_METHOD, annual_rate=DEFAULT_ANNUAL_RATE,
+                    term_months=None, grace_months=0, start_date=None):
+    """
+    Unsaved RepaymentSchedule objects for `loans`, computed in one pass.
+
+    The term defaults to the loan's `duration` text and the start to its
+    approval date. Loans without a usable term are skipped.
+    """
+    plans = []
+    for loan in loans:
+        term = term_months or parse_duration_months(loan.duration)
+        if term:
+            plans.append((loan, term))
+    if not plans:
+        return []
+
+    grid = compute_installments(
+        [float(loan.amount) for loan, _ in plans],
+        [float(annual_rate)] * len(plans),
+        [term for _, term in plans],
+        [grace_months] * len(plans),
+        [method == 'declining'] * len(plans),
+    )
+    cumulative = np.round(np.cumsum(grid, axis=1), 2)
+
+    schedules = []
+    for row, (loan, term) in enumerate(plans):
+        amounts = [Decimal(f"{v:.2f}") for v in grid[row, :term]]
+        totals = [Decimal(f"{v:.2f}") for v in cumulative[row, :term]]
+        schedules.append(RepaymentSchedule(
+            loan=loan,
+            method=method,
+            annual_rate=annual_rate,
+            term_months=term,
+            grace_months=grace_months,
+            start_date=start_date or loan.approval_date,
+            installments=amounts,
+            cumulative_due=totals,
+            total_due=totals[-1],
+        ))
+    return schedules
+
+
+def schedule_rows(schedule):
+    return [
+        {
+            'number': number,
+            'due_date': add_months(schedule.start_date, number),
+            'amount': amount,
+            'cumulative_due': cumulative,
+        }
+        for number, (amount, cumulative) in enumerate(
+            zip(schedule.installments, schedule.cumulative_due), start=1
+        )
+    ]
+
+
+def with_arrears(queryset=None, as_of=None):
+    """
+    Annotate schedules with due_to_date, paid and arrears in the same
+    query: the amount due is read from cumulative_due by the number of
+    installments fallen due, and paid is the loan's share of its
+    business's repayments from the loan_paid() SQL function (installments
+    due soonest first, across the business's loans; see migration 0051),
+    as the portfolio views use it.
+    """
+    as_of = as_of or date.today()
+    queryset = queryset if queryset is not None else RepaymentSchedule.objects.all()
+    table = RepaymentSchedule._meta.db_table
+
+    due_to_date = RawSQL(
+        f"""COALESCE({table}.cumulative_due[LEAST(GREATEST((
+                EXTRACT(YEAR FROM age(%s::date, {table}.start_date)) * 12
+                + EXTRACT(MONTH FROM age(%s::date, {table}.start_date)))::int, 0),
+            {table}.term_months)], 0)""",
+        [as_of, as_of],
+        output_field=MONEY,
+    )
+    paid = RawSQL(f"loan_paid({table}.loan_id, %s::date)", [as_of], output_field=MONEY)
+    return queryset.annotate(
+        due_to_date=due_to_date,
+        paid=Coalesce(paid, Value(Decimal('0')), output_field=MONEY),
+    ).annotate(
+        arrears=ExpressionWrapper(F('due_to_date') - F('paid'), output_field=MONEY),
+    )
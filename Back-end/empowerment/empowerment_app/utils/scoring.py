@@ -0,0 +1,143 @@
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+from empowerment_app.models import LoanApplication
+
+# feature: (weight, bad, good). A value at `bad` scores 0, at `good`
+# scores 1, linear in between (good may be below bad for "lower is better").
+# Override with LOAN_SCORING_RULES in settings.
+DEFAULT_RULES = {
+    'profit_margin': (30, 0.0, 0.4),        # (sales - expenses) / sales
+    'repayment_cover': (30, 1.0, 3.0),      # monthly profit / monthly installment
+    'income_ratio': (20, 0.7, 0.2),         # amount requested / annual income
+    'loan_type_ratio': (10, 1.0, 0.5),      # amount requested / loan type max
+    'repayment_period': (10, 36, 6),        # months
+}
+
+COMMENTS = {
+    'profit_margin': "Low profit margin",
+    'repayment_cover': "Monthly profit barely covers the installment",
+    'income_ratio': "Amount is high compared to annual income",
+    'loan_type_ratio': "Amount is close to the loan type maximum",
+    'repayment_period': "Long repayment period",
+}
+# Below this a feature is mentioned in system_comment
+COMMENT_THRESHOLD = 0.5
+
+SCORE_FIELDS = (
+    'id', 'monthly_sales', 'monthly_expenses', 'amount_requested',
+    'repayment_period', 'business__anual_income', 'loan_type__max_amount',
+)
+
+
+def get_rules():
+    return getattr(settings, 'LOAN_SCORING_RULES', DEFAULT_RULES)
+
+
+def _array(values):
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=float)
+
+
+def compute_scores(sales, expenses, amount, period, annual_income, type_max, rules=None):
+    """
+    Vectorised scoring over equally sized arrays (NaN = missing).
+    Returns (scores as int array, list of comment strings).
+    """
+    rules = rules or get_rules()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        profit = sales - expenses
+        installment = amount / period
+        features = {
+            'profit_margin': profit / sales,
+            'repayment_cover': profit / installment,
+            'income_ratio': amount / annual_income,
+            'loan_type_ratio': amount / type_max,
+            'repayment_period': period,
+        }
+
+    total_weight = sum(weight for weight, _, _ in rules.values())
+    score = np.zeros(len(amount))
+    normalised = {}
+    for name, (weight, bad, good) in rules.items():
+        values = np.where(np.isfinite(features[name]), features[name], np.nan)
+        # Missing or nonsensical data earns nothing for that feature
+        norm = np.nan_to_num(np.clip((values - bad) / (good - bad), 0, 1), nan=0.0)
+        normalised[name] = norm
+        score += weight * norm
+
+    scores = np.rint(score * 100 / total_weight).astype(int)
+
+    comments = []
+    for i in range(len(scores)):
+        weak = [COMMENTS[name] for name, norm in normalised.items() if norm[i] < COMMENT_THRESHOLD]
+        comments.append(f"Score {scores[i]}/100. " + ("; ".join(weak) + "." if weak else "No risk flags."))
+    return scores, comments
+
+
+def score_instances(applications):
+    """Score LoanApplication instances in memory (used before saving new ones)."""
+    applications = list(applications)
+    scores, comments = compute_scores(
+        _array(a.monthly_sales for a in applications),
+        _array(a.monthly_expenses for a in applications),
+        _array(a.amount_requested for a in applications),
+        _array(a.repayment_period for a in applications),
+        _array(a.business.anual_income for a in applications),
+        _array(a.loan_type.max_amount if a.loan_type_id else None for a in applications),
+    )
+    for application, score, comment in zip(applications, scores, comments):
+        application.score = int(score)
+        application.system_comment = comment
+    return applications
+
+
+def _write_scores(ids, scores, comments):
+    if connection.vendor == 'postgresql':
+        # One UPDATE ... FROM unnest() per chunk instead of a huge CASE
+        table = LoanApplication._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {table} AS la
+                SET score = v.score,
+                    system_comment = CASE WHEN la.decision = 'pending' THEN v.comment ELSE la.system_comment END
+                FROM unnest(%s::bigint[], %s::integer[], %s::text[]) AS v(id, score, comment)
+                WHERE la.id = v.id
+                """,
+                [ids, scores, comments],
+            )
+        return
+
+    objs = LoanApplication.objects.in_bulk(ids)
+    for pk, score, comment in zip(ids, scores, comments):
+        obj = objs.get(pk)
+        if obj is None:
+            continue
+        obj.score = score
+        if obj.decision == 'pending':
+            obj.system_comment = comment
+    LoanApplication.objects.bulk_update(objs.values(), ['score', 'system_comment'])
+
+
+def rescore(queryset=None, chunk_size=5000, on_chunk=None):
+    """
+    Recompute score (and system_comment for still-pending applications)
+    in chunks: one values_list read and one UPDATE per chunk.
+    """
+    queryset = (queryset if queryset is not None else LoanApplication.objects.all()).order_by('id')
+    done = 0
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).values_list(*SCORE_FIELDS)[:chunk_size])
+        if not rows:
+            break
+        columns = list(zip(*rows))
+        ids = [int(pk) for pk in columns[0]]
+        scores, comments = compute_scores(*(_array(col) for col in columns[1:]))
+        _write_scores(ids, [int(s) for s in scores], comments)
+        done += len(ids)
+        last_id = ids[-1]
+        if on_chunk:
+            on_chunk(done)
+    return done
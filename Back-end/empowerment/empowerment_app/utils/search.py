@@ -0,0 +1,52 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db.models import Q
+from django.db.models.functions import Upper
+
+from empowerment_app.models import Applicant, Business
+
+# Must stay identical to the GinIndex expressions on the models,
+# otherwise PostgreSQL cannot use the index.
+APPLICANT_VECTOR = SearchVector('name', 'village', 'ward', 'phone', config='simple')
+BUSINESS_VECTOR = SearchVector('name', 'bank_no', config='simple')
+
+MIN_QUERY_LENGTH = 2
+
+
+def _query(q):
+    return SearchQuery(q, config='simple', search_type='websearch')
+
+
+def search_applicants(q, queryset=None, limit=20):
+    """
+    Full-text match on name/village/ward/phone, plus trigram substring
+    match on name and phone for partial words. Ranked best first.
+    """
+    query = _query(q)
+    queryset = queryset if queryset is not None else Applicant.objects.all()
+    return (
+        queryset
+        .annotate(
+            document=APPLICANT_VECTOR,
+            rank=SearchRank(APPLICANT_VECTOR, query),
+            similarity=TrigramSimilarity(Upper('name'), q.upper()),
+        )
+        .filter(Q(document=query) | Q(name__icontains=q) | Q(phone__icontains=q))
+        .order_by('-rank', '-similarity', 'id')
+        .values('id', 'name', 'village', 'ward', 'phone', 'rank', 'similarity')[:limit]
+    )
+
+
+def search_businesses(q, queryset=None, limit=20):
+    query = _query(q)
+    queryset = queryset if queryset is not None else Business.objects.all()
+    return (
+        queryset
+        .annotate(
+            document=BUSINESS_VECTOR,
+            rank=SearchRank(BUSINESS_VECTOR, query),
+            similarity=TrigramSimilarity(Upper('name'), q.upper()),
+        )
+        .filter(Q(document=query) | Q(name__icontains=q) | Q(bank_no__icontains=q))
+        .order_by('-rank', '-similarity', 'id')
+        .values('id', 'name', 'bank_no', 'type', 'applicant_id', 'rank', 'similarity')[:limit]
+    )
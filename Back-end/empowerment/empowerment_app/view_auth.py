@@ -1,5 +1,5 @@
 from empowerment_app.serializer import *
-from empowerment_app.models import CustomUser, Applicant, Sheha, LoanOfficer
+from empowerment_app.models import CustomUser
 
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
@@ -7,6 +7,7 @@ from rest_framework.decorators import action
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth import authenticate
+from empowerment_app.principal import RoleRefreshToken, resolve_roles
 
 
 # ✅ User Registration View
@@ -36,7 +37,7 @@ class UserViewSet(viewsets.ModelViewSet):
         user.is_superuser = False
         user.save()
 
-        refresh = RefreshToken.for_user(user)
+        refresh = RoleRefreshToken.for_user(user)
 
         return Response({
             'message': 'User registered successfully',
@@ -66,14 +67,8 @@ class AuthViewSet(viewsets.ViewSet):
             return Response({"error": "Invalid or expired token"}, status=status.HTTP_400_BAD_REQUEST)
 
 def get_user_role(user):
-    if Sheha.objects.filter(user=user).exists():
-        return 'sheha'
-    elif LoanOfficer.objects.filter(user=user).exists():
-        return 'loan_officer'
-    elif user.is_staff or user.is_superuser:
-        return 'admin'
-    else:
-        return 'user'
+    # sheha > loan_officer > admin > user, cached per user
+    return resolve_roles(user)['role']
 
 class CustomLoginView(TokenObtainPairView):
     def post(self, request, *args, **kwargs):
@@ -85,8 +80,9 @@ class CustomLoginView(TokenObtainPairView):
         if user is None:
             return Response({'detail': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        refresh = RefreshToken.for_user(user)
-        role = get_user_role(user)
+        # Role and profile ids travel in the token as claims
+        refresh = RoleRefreshToken.for_user(user)
+        role = refresh['role']
 
         return Response({
             'refresh': str(refresh),
@@ -1,5 +1,5 @@
 from django.forms import ValidationError
-from bank_app.models import MockBankLoan
+from django.http import HttpResponse
 from empowerment_app.models import *
 from empowerment_app.serializer import *
 from .models import *
@@ -9,39 +9,45 @@ from rest_framework.decorators import action
 from empowerment_app.filters import ApplicantFilter
 from rest_framework import viewsets,permissions
 from rest_framework.permissions import IsAuthenticated, SAFE_METHODS, BasePermission
-from .filters import ApplicantFilter  
-from django.core.mail import send_mail
+from .filters import ApplicantFilter, LoanApplicationFilter, RepaymentFilter
 from rest_framework import status
+from empowerment_app.utils.query_budget import QueryBudgetMixin
+from empowerment_app.pagination import FlexiblePaginationMixin
+from empowerment_app.principal import get_principal
+from empowerment_app.utils.admin_stats import get_admin_stats
+from empowerment_app.utils.bank_verification import perform_bank_verification, verify_applicants
+from empowerment_app.utils.mail_queue import queue_email, queue_emails
+from empowerment_app.utils import events, http_cache
+from empowerment_app.utils.realtime import notify_sheha, notify_user
+from empowerment_app.utils.search import MIN_QUERY_LENGTH, search_applicants, search_businesses
+from empowerment_app.utils.export import LOAN_APPLICATION_COLUMNS, REPAYMENT_COLUMNS, stream_csv
+from empowerment_app.utils import schedule as schedules
+from empowerment_app.utils import geo
+from empowerment_app.utils.http_cache import ConditionalCacheMixin
+from empowerment_app.profiling import registry as perf_registry
+from empowerment_app.utils import db_pool
+from django.conf import settings
+from django.db import transaction
+from django_filters.rest_framework import DjangoFilterBackend
 
 
 
-# === Utility Function: Shared Bank Verification ===
-def perform_bank_verification(applicant):
-    try:
-        business = Business.objects.get(applicant=applicant)
-        bank_no = business.bank_no
-        existing_loan = MockBankLoan.objects.filter(bank_no=bank_no, has_active_loan=True).first()
-
-        if existing_loan:
-            applicant.is_verified_by_bank = False
-            applicant.bank_status = 'rejected'
-        else:
-            applicant.is_verified_by_bank = True
-            applicant.bank_status = 'verified'
-
-    except Business.DoesNotExist:
-        applicant.is_verified_by_bank = False
-        applicant.bank_status = 'no business found'
-
-    applicant.save(update_fields=["is_verified_by_bank", "bank_status"])
-    return applicant.bank_status
-
 # === Applicant View ===
-class ApplicantViewSet(viewsets.ModelViewSet):
+class ApplicantViewSet(ConditionalCacheMixin, FlexiblePaginationMixin, viewsets.ModelViewSet):
     queryset = Applicant.objects.all()
     serializer_class = ApplicantSerializer
     filterset_class = ApplicantFilter
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ('-id',)
+    estimated_count = True
+    # Only /applicants/me/ is served through the conditional cache
+    cache_actions = ()
+
+    def get_cache_resources(self):
+        return [f"applicant:{get_principal(self.request).applicant_id}"]
+
+    def get_cache_scope(self):
+        return str(self.request.user.pk)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -62,26 +68,36 @@ class ApplicantViewSet(viewsets.ModelViewSet):
             pass
 
         if applicant.sheha:
-            Notification.objects.create(
+            notification = Notification.objects.create(
                 sheha=applicant.sheha,
                 applicant=applicant,
                 name=applicant.name,
                 village=applicant.village,
-                passport_size=applicant.passport_size
             )
+            # Only the sheha of this ward gets the websocket push
+            notify_sheha(applicant.sheha.id, {
+                'event': 'new_applicant',
+                'notification_id': notification.id,
+                'applicant_id': applicant.id,
+                'name': applicant.name,
+                'village': applicant.village,
+            })
             if applicant.sheha.email:
-                send_mail(
+                # Delivered by the send_queued_emails worker
+                queue_email(
                     subject='New Applicant Notification',
                     message=f'Dear {applicant.sheha.user.username},\n\nA new applicant from {applicant.village} has registered. Please review their info.\n\nThank you.',
                     from_email='noreply@yourdomain.com',
                     recipient_list=[applicant.sheha.email],
-                    fail_silently=True,
                 )
 
     @action(detail=False, methods=['get'], url_path='me')
     def get_current_applicant(self, request):
+        return self.conditional_response(request, self._current_applicant)
+
+    def _current_applicant(self, request):
         try:
-            applicant = Applicant.objects.get(user=request.user)
+            applicant = Applicant.objects.get(pk=get_principal(request).applicant_id)
             serializer = self.get_serializer(applicant)
             return Response(serializer.data)
         except Applicant.DoesNotExist:
@@ -103,68 +119,143 @@ class BusinessViewSet(viewsets.ModelViewSet):
             perform_bank_verification(applicant)
 
 
-class ShehaViewSet(viewsets.ModelViewSet):
+class ShehaViewSet(ConditionalCacheMixin, viewsets.ModelViewSet):
     queryset = Sheha.objects.all()
     serializer_class = ShehaCreateSerializer
     permission_classes = [permissions.IsAdminUser] 
+    cache_resources = ('shehas',)
    
 class LoanViewSet(viewsets.ModelViewSet):
-    queryset = Loan.objects.all()
+    queryset = Loan.objects.select_related('business', 'loan_officer')
     serializer_class = LoanSerializer
     permission_classes = [IsAuthenticated]
 
+    @action(detail=True, methods=['get', 'post'], url_path='schedule')
+    def schedule(self, request, pk=None):
+        loan = self.get_object()
+
+        if request.method == 'POST':
+            if not (request.user.is_staff or get_principal(request).is_loan_officer):
+                return Response({"detail": "Only staff or loan officers can generate schedules."}, status=status.HTTP_403_FORBIDDEN)
+            params = ScheduleRequestSerializer(data=request.data)
+            params.is_valid(raise_exception=True)
+            built = schedules.build_schedules([loan], **{
+                'method': schedules.DEFAULT_METHOD,
+                'annual_rate': schedules.DEFAULT_ANNUAL_RATE,
+                **params.validated_data,
+            })
+            if not built:
+                return Response({"detail": "Loan duration has no month count; pass term_months."}, status=status.HTTP_400_BAD_REQUEST)
+            RepaymentSchedule.objects.filter(loan=loan).delete()
+            built[0].save()
+
+        schedule = schedules.with_arrears(RepaymentSchedule.objects.filter(loan=loan)).first()
+        if schedule is None:
+            return Response({"detail": "No schedule for this loan."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'loan': loan.id,
+            'method': schedule.method,
+            'annual_rate': schedule.annual_rate,
+            'term_months': schedule.term_months,
+            'grace_months': schedule.grace_months,
+            'start_date': schedule.start_date,
+            'total_due': schedule.total_due,
+            'due_to_date': schedule.due_to_date,
+            'paid': schedule.paid,
+            'arrears': max(schedule.arrears, 0),
+            'installments': schedules.schedule_rows(schedule),
+        }, status=status.HTTP_201_CREATED if request.method == 'POST' else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='arrears', permission_classes=[permissions.IsAdminUser])
+    def arrears(self, request):
+        # One query for the whole page: due and paid are computed in SQL
+        queryset = schedules.with_arrears(
+            RepaymentSchedule.objects.select_related('loan__business')
+        ).filter(arrears__gt=0).order_by('-arrears').values(
+            'loan_id', 'loan__business_id', 'loan__business__name',
+            'total_due', 'due_to_date', 'paid', 'arrears',
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(list(queryset))
+
 class LoanOfficerViewSet(viewsets.ModelViewSet):
     queryset = LoanOfficer.objects.all()
     serializer_class = LoanOfficerSerializer
     permission_classes = [permissions.IsAdminUser]
 
-class RepaymentViewSet(viewsets.ModelViewSet):
-    queryset = Repayment.objects.all()
+class RepaymentViewSet(FlexiblePaginationMixin, viewsets.ModelViewSet):
+    queryset = Repayment.objects.select_related('business')
     serializer_class = RepaymentSerializer
+    # Filtering is opt-in per viewset; list and export share these filters
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = RepaymentFilter
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ('-id',)
+    estimated_count = True
+
+    @action(detail=False, methods=['get'], url_path='export', permission_classes=[permissions.IsAdminUser])
+    def export(self, request):
+        queryset = self.filter_queryset(Repayment.objects.order_by('id'))
+        return stream_csv(queryset, REPAYMENT_COLUMNS, 'repayments')
 
 # === Notification View ===
-class NotificationViewSet(viewsets.ModelViewSet):
+BANK_STATUS_MESSAGES = {
+    'verified': 'approved',
+    'rejected': 'rejected due to existing loan',
+    'no business found': 'rejected (no business info)'
+}
+
+class NotificationViewSet(FlexiblePaginationMixin, viewsets.ModelViewSet):
     queryset = Notification.objects.all()
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Notification.objects.filter(
-            sheha__user=self.request.user,
-            is_verified_by_sheha=False
+        sheha_id = get_principal(self.request).sheha_id
+        if not sheha_id:
+            return Notification.objects.none()
+        # The photo is the applicant's, so join it in for the serializer
+        return Notification.objects.select_related('applicant').filter(
+            sheha_id=sheha_id,
+            is_verified_by_sheha=False,
+            status='pending',
         ).order_by('-created_at')
 
     @action(detail=True, methods=['post'])
     def verify(self, request, pk=None):
         notification = self.get_object()
-        notification.is_read = True
-        notification.is_verified_by_sheha = True
-        notification.save()
-
-        applicant = notification.applicant
-        applicant.is_verified_by_sheha = True
-        applicant.is_verified = True
-        applicant.save(update_fields=["is_verified_by_sheha", "is_verified"])
-
-        # Trigger centralized bank verification
-        bank_status = perform_bank_verification(applicant)
+        with transaction.atomic():
+            notification.is_read = True
+            notification.is_verified_by_sheha = True
+            notification.status = 'verified'
+            notification.save()
+
+            applicant = notification.applicant
+            applicant.is_verified_by_sheha = True
+            applicant.is_verified = True
+            applicant.save(update_fields=["is_verified_by_sheha", "is_verified"])
+            events.record(events.sheha_verified(applicant.pk, request.user, notification.pk))
+
+            # Trigger centralized bank verification
+            bank_status = perform_bank_verification(applicant)
+        notify_user(applicant.user_id, {
+            'event': 'sheha_verified',
+            'applicant_id': applicant.id,
+            'bank_status': bank_status,
+        })
 
         # Send email update
         if applicant.user.email:
-            status_map = {
-                'verified': 'approved',
-                'rejected': 'rejected due to existing loan',
-                'no business found': 'rejected (no business info)'
-            }
-            msg = status_map.get(bank_status, 'status unknown')
-
-            send_mail(
+            msg = BANK_STATUS_MESSAGES.get(bank_status, 'status unknown')
+
+            queue_email(
                 subject='Application Status',
                 message=f'Dear {applicant.name}, your application was approved by the Sheha. Bank verification: {msg}.',
                 from_email='noreply@yourdomain.com', 
                 recipient_list=[applicant.user.email],
-                fail_silently=True,
             )
 
         return Response({
@@ -172,6 +263,90 @@ class NotificationViewSet(viewsets.ModelViewSet):
             'bank_status': bank_status,
         }, status=status.HTTP_200_OK)
 
+    def _bulk_ids(self, request):
+        serializer = BulkNotificationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data
+
+    def _pending(self, ids):
+        # Locks the sheha's still-pending notifications among `ids`
+        return {
+            n.pk: n
+            for n in self.get_queryset().select_related('applicant__user')
+            .select_for_update(of=('self',)).filter(pk__in=ids)
+        }
+
+    @action(detail=False, methods=['post'], url_path='bulk-verify')
+    def bulk_verify(self, request):
+        ids = self._bulk_ids(request)['ids']
+        with transaction.atomic():
+            found = self._pending(ids)
+            applicants = [n.applicant for n in found.values()]
+            Notification.objects.filter(pk__in=list(found)).update(
+                is_read=True, is_verified_by_sheha=True, status='verified',
+            )
+            Applicant.objects.filter(pk__in=[a.pk for a in applicants]).update(
+                is_verified_by_sheha=True, is_verified=True,
+            )
+            events.record(*(events.sheha_verified(n.applicant_id, request.user, n.pk) for n in found.values()))
+            # One Business query and one bankdb query for the whole batch
+            bank_statuses = verify_applicants(applicants)
+            # Sent on commit, like the single verify's push
+            for a in applicants:
+                notify_user(a.user_id, {
+                    'event': 'sheha_verified',
+                    'applicant_id': a.pk,
+                    'bank_status': bank_statuses[a.pk],
+                })
+            queue_emails([
+                (
+                    'Application Status',
+                    f'Dear {a.name}, your application was approved by the Sheha. '
+                    f'Bank verification: {BANK_STATUS_MESSAGES.get(bank_statuses[a.pk], "status unknown")}.',
+                    [a.user.email],
+                )
+                for a in applicants if a.user.email
+            ], from_email='noreply@yourdomain.com')
+
+        results = [
+            {'id': pk, 'status': 'verified', 'bank_status': bank_statuses[found[pk].applicant_id]}
+            if pk in found else {'id': pk, 'status': 'not_found'}
+            for pk in ids
+        ]
+        return Response({'verified': len(found), 'results': results}, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk-reject')
+    def bulk_reject(self, request):
+        data = self._bulk_ids(request)
+        ids, reason = data['ids'], data.get('reason')
+        with transaction.atomic():
+            found = self._pending(ids)
+            applicants = [n.applicant for n in found.values()]
+            Notification.objects.filter(pk__in=list(found)).update(is_read=True, status='rejected')
+            Applicant.objects.filter(pk__in=[a.pk for a in applicants]).update(
+                is_verified_by_sheha=False, is_verified=False,
+            )
+            events.record(*(
+                events.event(
+                    'applicant', n.applicant_id, 'sheha_rejected', 'rejected', 'pending', request.user,
+                    notification_id=n.pk, reason=reason or '',
+                )
+                for n in found.values()
+            ))
+            http_cache.bump(*(f"applicant:{a.pk}" for a in applicants))
+            queue_emails([
+                (
+                    'Application Status',
+                    f'Dear {a.name}, your application was not approved by the Sheha.'
+                    + (f' Reason: {reason}' if reason else ''),
+                    [a.user.email],
+                )
+                for a in applicants if a.user.email
+            ], from_email='noreply@yourdomain.com')
+
+        results = [{'id': pk, 'status': 'rejected' if pk in found else 'not_found'} for pk in ids]
+        return Response({'rejected': len(found), 'results': results}, status=status.HTTP_200_OK)
+
 # === Admin/Read-Only Permission ===
 class IsAdminOrReadOnly(BasePermission):
     def has_permission(self, request, view):
@@ -180,25 +355,53 @@ class IsAdminOrReadOnly(BasePermission):
         return request.user and request.user.is_staff
     
 # =======LOANS=========
-class LoanTypeViewSet(viewsets.ReadOnlyModelViewSet): 
+def loan_application_queryset():
+    # Covers every relation LoanApplicationSerializer touches, so a page
+    # costs the same number of queries whatever its size.
+    return LoanApplication.objects.select_related(
+        'loan_type',
+        'applicant',
+        'applicant__sheha',
+        'business',
+        'business__applicant',
+    ).prefetch_related('expenses')
+
+# list/retrieve: user + count + rows + expenses, plus the pg_class row
+# estimate that staff lists try first (see EstimatedCountPagination)
+# create: user + loan type + business/applicant + insert + bulk expense
+# insert + counted_under + one stat counter upsert + event insert +
+# expenses read back, whatever the budget size. Checked in tests.py.
+LOAN_APPLICATION_QUERY_BUDGET = {'list': 5, 'retrieve': 3, 'create': 9}
+
+class LoanTypeViewSet(ConditionalCacheMixin, viewsets.ReadOnlyModelViewSet): 
     queryset = LoanType.objects.all()
     serializer_class = LoanTypeSerializer
     permission_classes = [IsAuthenticated]
+    cache_resources = ('loan_types',)
     
 
-class LoanApplicationViewSet(viewsets.ModelViewSet):
-    queryset = LoanApplication.objects.all()
+class LoanApplicationViewSet(QueryBudgetMixin, FlexiblePaginationMixin, viewsets.ModelViewSet):
+    queryset = loan_application_queryset()
     serializer_class = LoanApplicationSerializer
     permission_classes = [IsAuthenticated]
+    query_budget = LOAN_APPLICATION_QUERY_BUDGET
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = LoanApplicationFilter
+    estimated_count = True
 
     def create(self, request, *args, **kwargs):
-        # ✅ Pass request to serializer context
-        serializer = self.get_serializer(data=request.data, context={'request': request})
+        serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        application = serializer.save()  # Applicant is set inside serializer
+        application = serializer.save()  # Applicant, business and expenses in one transaction
         return Response(self.get_serializer(application).data, status=status.HTTP_201_CREATED)
 
+    def perform_update(self, serializer):
+        # A decision change and its transition event commit together
+        with transaction.atomic():
+            serializer.save()
+
     @action(detail=True, methods=['post'], url_path='approve')
+    @transaction.atomic
     def approve(self, request, pk=None):
         application = self.get_object()
         application.decision = 'approved'
@@ -209,6 +412,7 @@ class LoanApplicationViewSet(viewsets.ModelViewSet):
         return Response({'status': 'approved', 'application_id': application.id})
 
     @action(detail=True, methods=['post'], url_path='reject')
+    @transaction.atomic
     def reject(self, request, pk=None):
         application = self.get_object()
         application.decision = 'rejected'
@@ -217,8 +421,167 @@ class LoanApplicationViewSet(viewsets.ModelViewSet):
         application.reviewed_at = timezone.now()
         application.save()
         return Response({'status': 'rejected', 'application_id': application.id})
+
+    @action(detail=False, methods=['get'], url_path='export', permission_classes=[permissions.IsAdminUser])
+    def export(self, request):
+        # Plain queryset: values_list needs no select_related/prefetch
+        queryset = self.filter_queryset(LoanApplication.objects.order_by('id'))
+        return stream_csv(queryset, LOAN_APPLICATION_COLUMNS, 'loan-applications')
     
-class LoanReviewViewSet(viewsets.ModelViewSet):
-    queryset = LoanApplication.objects.all()
+class LoanReviewViewSet(QueryBudgetMixin, FlexiblePaginationMixin, viewsets.ModelViewSet):
+    queryset = loan_application_queryset()
     serializer_class = LoanApplicationSerializer
-    permission_classes = [IsAuthenticated]
\ No newline at end of file
+    permission_classes = [IsAuthenticated]
+    query_budget = LOAN_APPLICATION_QUERY_BUDGET
+    estimated_count = True
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+# === Admin Dashboard Stats ===
+class AdminStatsViewSet(viewsets.ViewSet):
+    permission_classes = [permissions.IsAdminUser]
+
+    def list(self, request):
+        # Served from LoanApplicationStat counters, not the applications table
+        return Response(get_admin_stats())
+
+
+# === Search ===
+class IsReviewer(BasePermission):
+    # Admins, shehas and loan officers
+    def has_permission(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return False
+        return get_principal(request).role in ('admin', 'sheha', 'loan_officer')
+
+
+class SearchViewSet(viewsets.ViewSet):
+    permission_classes = [IsReviewer]
+
+    def list(self, request):
+        q = request.query_params.get('q', '').strip()
+        if len(q) < MIN_QUERY_LENGTH:
+            return Response(
+                {"detail": f"Query must be at least {MIN_QUERY_LENGTH} characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            limit = 20
+
+        applicants = Applicant.objects.all()
+        businesses = Business.objects.all()
+        principal = get_principal(request)
+        if principal.is_sheha:
+            # A sheha only sees their own ward
+            applicants = applicants.filter(sheha_id=principal.sheha_id)
+            businesses = businesses.filter(applicant__sheha_id=principal.sheha_id)
+
+        return Response({
+            'applicants': list(search_applicants(q, applicants, limit)),
+            'businesses': list(search_businesses(q, businesses, limit)),
+        })
+
+
+# === Portfolio Analytics ===
+class AnalyticsViewSet(viewsets.ViewSet):
+    permission_classes = [permissions.IsAdminUser]
+
+    @action(detail=False, methods=['get'], url_path='portfolio')
+    def portfolio(self, request):
+        # Reads the pre-grouped portfolio_rollup materialized view only
+        rows = list(PortfolioRollup.objects.values(
+            'dimension', 'key', 'loans', 'disbursed', 'outstanding',
+            'outstanding_at_risk_30', 'loans_at_risk_30', 'refreshed_at',
+        ))
+        grouped = {}
+        refreshed_at = None
+        for row in rows:
+            refreshed_at = row.pop('refreshed_at')
+            outstanding = row['outstanding']
+            row['par_30'] = round(float(row['outstanding_at_risk_30'] / outstanding) * 100, 2) if outstanding else 0.0
+            grouped.setdefault(row.pop('dimension'), []).append(row)
+
+        total = (grouped.get('total') or [{}])[0]
+        total.pop('key', None)
+        return Response({
+            'refreshed_at': refreshed_at,
+            'total': total,
+            'by_region': grouped.get('region', []),
+            'by_ward': grouped.get('ward', []),
+            'by_loan_type': grouped.get('loan_type', []),
+            'by_gender': grouped.get('gender', []),
+        })
+
+
+# === Business Map ===
+class BusinessMapViewSet(viewsets.ViewSet):
+    permission_classes = [IsReviewer]
+
+    def _sheha_id(self, request):
+        principal = get_principal(request)
+        return principal.sheha_id if principal.is_sheha else None
+
+    @action(detail=False, methods=['get'], url_path='bbox')
+    def bbox(self, request):
+        # ?bbox=minLng,minLat,maxLng,maxLat&zoom=<int>
+        try:
+            bbox = geo.parse_bbox(request.query_params.get('bbox', ''))
+            zoom = int(request.query_params.get('zoom', geo.CLUSTER_MAX_ZOOM))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        sheha_id = self._sheha_id(request)
+        if zoom < geo.CLUSTER_MAX_ZOOM:
+            rows = geo.clusters_in_bbox(bbox, sheha_id)
+            return Response(geo.feature_collection(rows, ['count']))
+        rows = geo.businesses_in_bbox(bbox, sheha_id)
+        return Response(geo.feature_collection(rows, ['id', 'name', 'type']))
+
+    @action(detail=False, methods=['get'], url_path='nearby')
+    def nearby(self, request):
+        # ?lat=&lng=&radius=<metres>
+        try:
+            lat = float(request.query_params['lat'])
+            lng = float(request.query_params['lng'])
+            radius = min(float(request.query_params.get('radius', 1000)), geo.MAX_RADIUS_M)
+            limit = min(int(request.query_params.get('limit', 100)), 500)
+        except (KeyError, ValueError):
+            return Response({"detail": "lat and lng are required numbers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = geo.businesses_near(lat, lng, radius, limit, self._sheha_id(request))
+        return Response(geo.feature_collection(rows, ['id', 'name', 'type', 'distance']))
+
+    @action(detail=False, methods=['get'], url_path=r'tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)')
+    def tiles(self, request, z, x, y):
+        z, x, y = int(z), int(x), int(y)
+        if z > 22 or x >= 2 ** z or y >= 2 ** z:
+            return Response({"detail": "Tile out of range."}, status=status.HTTP_400_BAD_REQUEST)
+        tile = geo.business_tile(z, x, y, self._sheha_id(request))
+        return HttpResponse(tile, content_type='application/vnd.mapbox-vector-tile')
+
+
+# === Request Profiling ===
+class PerfViewSet(viewsets.ViewSet):
+    permission_classes = [permissions.IsAdminUser]
+
+    def list(self, request):
+        return Response({
+            'enabled': settings.PERF_PROFILING,
+            'sample_rate': settings.PERF_SAMPLE_RATE,
+            'routes': perf_registry.summary(),
+            'db_pools': db_pool.pool_stats(),
+        })
+
+    @action(detail=False, methods=['get'], url_path='metrics')
+    def metrics(self, request):
+        text = perf_registry.prometheus() + db_pool.prometheus()
+        return HttpResponse(text, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    @action(detail=False, methods=['post'], url_path='reset')
+    def reset(self, request):
+        perf_registry.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
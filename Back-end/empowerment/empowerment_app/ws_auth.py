@@ -0,0 +1,34 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+@database_sync_to_async
+def get_user(user_id):
+    # A deactivated account's unexpired token must not open a socket either
+    user = get_user_model().objects.filter(id=user_id, is_active=True).first()
+    return user or AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authenticate websockets with the same access token the REST API uses,
+    passed as `ws/notifications/?token=<access>`. Falls back to whatever
+    user the session middleware already put in the scope.
+    """
+
+    async def __call__(self, scope, receive, send):
+        token = parse_qs(scope.get('query_string', b'').decode()).get('token')
+        if token:
+            try:
+                access = AccessToken(token[0])
+                scope['user'] = await get_user(access[api_settings.USER_ID_CLAIM])
+            except (TokenError, KeyError):
+                scope['user'] = AnonymousUser()
+        return await super().__call__(scope, receive, send)
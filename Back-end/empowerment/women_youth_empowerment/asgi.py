@@ -11,23 +11,24 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-from channels.auth import AuthMiddlewareStack
-from channels.routing import ProtocolTypeRouter, URLRouter
-from django.core.asgi import get_asgi_application
-import empowerment_app
-
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'women_youth_empowerment.settings')
 
-application = get_asgi_application()
-
+# Load Django before importing anything that touches models
+django_asgi_app = get_asgi_application()
 
+from channels.auth import AuthMiddlewareStack
+from channels.routing import ProtocolTypeRouter, URLRouter
+from empowerment_app.ws_auth import JWTAuthMiddleware
+from women_youth_empowerment import routing
 
 
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
     "websocket": AuthMiddlewareStack(
-        URLRouter(
-            empowerment_app.routing.websocket_urlpatterns
+        JWTAuthMiddleware(
+            URLRouter(
+                routing.websocket_urlpatterns
+            )
         )
     ),
 })
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from datetime import timedelta
 import os
 from pathlib import Path
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -54,10 +55,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'empowerment_app',
     'corsheaders',
     'rest_framework',
     'rest_framework_simplejwt',
+    'django_filters',
     'channels',
     'django_extensions',
     'bank_app',
@@ -73,14 +76,26 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    
+    # Both remove themselves unless replicas / PERF_PROFILING are configured
+    'empowerment_app.replicas.ReplicaRoutingMiddleware',
+    'empowerment_app.profiling.ProfilingMiddleware',
 ]
 
+# Request profiling, read at /api/_perf/. A PERF_SAMPLE_RATE around 0.05
+# is cheap enough to leave on in production.
+PERF_PROFILING = config('PERF_PROFILING', default=False, cast=bool)
+PERF_SAMPLE_RATE = config('PERF_SAMPLE_RATE', default=1.0, cast=float)
+PERF_RING_SIZE = 1000
+
+# run_benchmarks compares against (and --save-baseline writes) this file;
+# it is machine-specific and not committed, see benchmarks/README.md
+BENCHMARK_BASELINE = BASE_DIR / 'benchmarks' / 'baseline.json'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'empowerment_app.pagination.StandardPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated', 
@@ -139,18 +154,106 @@ DATABASES = {
     }
 }
 
+# The mock bank only holds plain tables, so locally (and for benchmarks)
+# it can be a SQLite stand-in instead of a second PostgreSQL database.
+# `default` has no such option: it needs PostGIS, and migrations add
+# PostgreSQL functions, materialized views and trigram indexes.
+if config('BANKDB_SQLITE', default=False, cast=bool):
+    DATABASES['bankdb'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'bankdb.sqlite3',
+    }
+
+# Read replicas of `default`: REPLICA_HOSTS=db-replica-1,db-replica-2 adds
+# aliases replica_1, replica_2 with the primary's credentials. In tests
+# they mirror `default`.
+DATABASE_REPLICAS = []
+for number, host in enumerate(config('REPLICA_HOSTS', default='', cast=Csv()), start=1):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {**DATABASES['default'], 'HOST': host, 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+REPLICA_MAX_LAG_SECONDS = config('REPLICA_MAX_LAG_SECONDS', default=5, cast=int)
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+REPLICA_HEALTH_TTL = 5
+
+# Connection reuse for every PostgreSQL alias. This project is served over
+# ASGI, where persistent connections belong to whichever thread ran the
+# sync code and are never released, so Django advises against them:
+# CONN_MAX_AGE defaults to 0 and DB_POOL=1 is the way to reuse connections.
+# It switches to psycopg3's native pool (needs psycopg[pool]) with the
+# per-alias (min, max) sizes below. Set CONN_MAX_AGE only for a WSGI
+# deployment. Either way CONN_HEALTH_CHECKS pings a connection before reuse.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DB_POOL_SIZES = {
+    'default': (config('DB_POOL_MIN', default=2, cast=int), config('DB_POOL_MAX', default=10, cast=int)),
+    'bankdb': (config('BANKDB_POOL_MIN', default=1, cast=int), config('BANKDB_POOL_MAX', default=4, cast=int)),
+}
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=int)
+
+for alias, database in DATABASES.items():
+    if 'postg' not in database['ENGINE']:
+        continue
+    database['CONN_HEALTH_CHECKS'] = True
+    if DB_POOL:
+        # Replicas take the primary's sizes
+        min_size, max_size = DB_POOL_SIZES.get(alias, DB_POOL_SIZES['default'])
+        database['CONN_MAX_AGE'] = 0
+        database['OPTIONS'] = {
+            **database.get('OPTIONS', {}),
+            'pool': {'min_size': min_size, 'max_size': max_size, 'timeout': DB_POOL_TIMEOUT, 'name': alias},
+        }
+    else:
+        database['CONN_MAX_AGE'] = config('CONN_MAX_AGE', default=0, cast=int)
+
 # DATABASE_ROUTERS = ['empowerment_app.dbrouters.BankDBRouter']
-DATABASE_ROUTERS = ['bank_app.db_router.BankDBRouter']
+DATABASE_ROUTERS = [
+    'bank_app.db_router.BankDBRouter',
+    'empowerment_app.db_router.ReplicaRouter',
+]
 
 
 
 ASGI_APPLICATION = 'women_youth_empowerment.asgi.application'
 
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer'
+# Set REDIS_URL (e.g. redis://localhost:6379/0) when running more than one
+# ASGI worker; the in-memory layer only reaches sockets in the same process.
+REDIS_URL = config('REDIS_URL', default='')
+
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [REDIS_URL],
+            },
+        }
     }
-}
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer'
+        }
+    }
+
+# Server-side cache (role lookups, HTTP cache versions and bodies). Any
+# Django backend works: locmem or FileBasedCache locally, Redis whenever
+# REDIS_URL is set so every worker sees the same versions.
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+            'LOCATION': config('CACHE_LOCATION', default='empowerment'),
+        }
+    }
+HTTP_CACHE_ALIAS = 'default'
+HTTP_CACHE_TIMEOUT = 60 * 60
 
 
 
@@ -197,9 +300,6 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'empowerment_app.CustomUser'
 
 
-
-from decouple import config
-
 # Twilio
 # TWILIO_ACCOUNT_SID = config('TWILIO_ACCOUNT_SID')
 # TWILIO_AUTH_TOKEN = config('TWILIO_AUTH_TOKEN')
@@ -214,6 +314,15 @@ EMAIL_HOST_USER = 'bingulam09@gmail.com'
 EMAIL_HOST_PASSWORD = 'mbol fbvx phat oxaw'  
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Outbox worker (python manage.py send_queued_emails --loop)
+EMAIL_QUEUE_BATCH_SIZE = 50
+EMAIL_QUEUE_MAX_ATTEMPTS = 5
+EMAIL_QUEUE_BACKOFF_SECONDS = 30
+
+# Loan scoring uses utils/scoring.DEFAULT_RULES unless LOAN_SCORING_RULES
+# is set here, as a full feature -> (weight, bad, good) dict. After
+# changing it, run: python manage.py rescore_loan_applications
+
 GDAL_LIBRARY_PATH = '/usr/lib/x86_64-linux-gnu/libgdal.so.36'
 
 # # ================
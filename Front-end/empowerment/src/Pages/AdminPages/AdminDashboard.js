@@ -1,7 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import AdminNavbar from '../Components/AdminNavbar';
-import axios from 'axios';
 import {
   LineChart, Line, XAxis, YAxis, Tooltip,
   PieChart, Pie, Cell, ResponsiveContainer
@@ -16,13 +15,16 @@ const AdminDashboard = () => {
     percentage: 0
   });
 
+  const [monthly, setMonthly] = useState([]);
+
   useEffect(() => {
-    const fetchLoanApplications = async () => {
+    const fetchAdminStats = async () => {
       try {
         const token = localStorage.getItem('access_token');
         if (!token) throw new Error('No access token found');
 
-        const response = await fetch(`${process.env.REACT_APP_API_URL}/loan-applications/`, {
+        // Aggregated on the server, no need to download every application
+        const response = await fetch(`${process.env.REACT_APP_API_URL}/admin-stats/`, {
           headers: {
             Authorization: `Bearer ${token}`,
             'Content-Type': 'application/json',
@@ -35,47 +37,23 @@ const AdminDashboard = () => {
 
         const data = await response.json();
 
-        const applications = data.results || data;
-
-        // Count total applications
-        const totalApplications = data.count || applications.length;
-
-        // Count approved applications
-        const approvedApplications = applications.filter(app =>
-          app.decision?.toLowerCase() === 'approved'
-        ).length;
-
-        // Count rejected applications
-        const rejectedApplications = applications.filter(app =>
-          app.decision?.toLowerCase() === 'rejected'
-        ).length;
-
         setStats(prev => ({
           ...prev,
-          total: totalApplications,
-          approved: approvedApplications,
-          rejected: rejectedApplications,
-          percentage: totalApplications > 0 ? Math.round((approvedApplications / totalApplications) * 100) : 0,
+          total: data.total,
+          approved: data.approved,
+          rejected: data.rejected,
+          percentage: data.percentage,
         }));
+        setMonthly(data.monthly || []);
       } catch (error) {
-        console.error('Error fetching loan applications:', error);
+        console.error('Error fetching admin stats:', error);
       }
     };
 
-    fetchLoanApplications();
-
-    // Keep your existing axios call if needed for other stats (optional)
-    axios.get('/api/admin-stats/')
-      .then(res => setStats(prev => ({ ...prev, ...res.data })))
-      .catch(err => console.error(err));
+    fetchAdminStats();
   }, []);
 
-  const dataLine = [
-    { name: 'Jan', applicants: 30 },
-    { name: 'Feb', applicants: 45 },
-    { name: 'Mar', applicants: 35 },
-    { name: 'Apr', applicants: 50 },
-  ];
+  const dataLine = monthly.map(row => ({ name: row.month, applicants: row.count }));
 
   const dataPie = [
     { name: 'Approved', value: stats.approved },
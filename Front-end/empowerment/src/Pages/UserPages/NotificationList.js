@@ -125,7 +125,7 @@ const Notifications = () => {
                   <div className="my-2">
                     <p className="text-gray-700 mb-1 font-semibold">Passport Photo:</p>
                     <img
-                      src={notification.passport_size}
+                      src={notification.passport_thumbnail || notification.passport_size}
                       alt="Passport"
                       className="w-24 h-24 object-cover border rounded"
                     />